@@ -7,6 +7,8 @@ from treasure import Weapon, Spell, Potion, Treasure, TreasureType
 
 class BaseActor:
 
+    __slots__ = ("_level", "actor_symbol", "coordinates", "_alive", "_stats", "_experience")
+
     _level: int
     actor_symbol: str
     _alive: bool
@@ -39,6 +41,9 @@ class BaseActor:
 
 
 class Minion(BaseActor):
+
+    __slots__ = ()
+
     def __init__(self, level: int, coordinates) -> None:
         super().__init__(Constants.MINION_SYMBOL, coordinates)
         self._level = level
@@ -63,12 +68,17 @@ class Minion(BaseActor):
         attack_stat = getattr(self._stats, "_attack")
         return int(attack_stat * Constants.PERCENTAGE_PER_HIT)
 
+    def damage_profile(self) -> tuple:
+        return self.attack(), 0, None
+
     def __str__(self) -> str:
         return "Minion " + "level= " + str(self._level)
 
 
 class Hero(BaseActor):
 
+    __slots__ = ("_weapon", "_spell", "_backpack")
+
     _experience: int
     _weapon: Weapon
     _spell: Spell
@@ -101,6 +111,13 @@ class Hero(BaseActor):
         return ((getattr(self._stats, "_attack") * Constants.PERCENTAGE_PER_HIT) +
                 weapon_dmg + spell_dmg)
 
+    def damage_profile(self) -> tuple:
+        weapon_dmg: int = 0 if self._weapon is None else self._weapon._points
+        base_dmg = self._stats._attack * Constants.PERCENTAGE_PER_HIT + weapon_dmg
+        if self._spell is None:
+            return base_dmg, 0, None
+        return base_dmg, self._spell._points, self._spell._min_mana
+
     def equip_weapon(self, weapon: Weapon) -> None:
         self._backpack.remove_item(weapon)
         if self._weapon is not None:
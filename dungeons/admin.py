@@ -0,0 +1,55 @@
+import socketserver
+import threading
+
+from constants import Constants
+from event_log import EVENT_LOG
+from metrics import METRICS
+from profiling import Profiler
+from tracing import TRACER, TraceCommand
+
+
+class AdminRequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self) -> None:
+        line: str = self.rfile.readline(Constants.MAX_LINE_LENGTH).decode(errors="replace").strip()
+        if line.startswith("GET "):
+            self._handle_http(line.split(" ")[1])
+        else:
+            self.wfile.write(self.server.execute(line).encode())
+
+    def _handle_http(self, path: str) -> None:
+        while self.rfile.readline(Constants.MAX_LINE_LENGTH).strip():
+            pass
+        command: str = path.strip("/").replace("/", " ").replace("?", " ").replace("&", " ")
+        body: bytes = self.server.execute(command.replace("=", " ")).encode()
+        self.wfile.write(b"HTTP/1.0 200 OK\r\nContent-Type: text/plain; charset=utf-8\r\n" +
+                         f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+
+
+class AdminServer(socketserver.ThreadingTCPServer):
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    commands: dict
+
+    def __init__(self, port: int = Constants.ADMIN_PORT,
+                 profile_directory: str = Constants.PROFILE_DIRECTORY) -> None:
+        super().__init__((Constants.HOST, port), AdminRequestHandler)
+        self.commands = {"metrics": lambda arguments: METRICS.render(),
+                         "profile": Profiler(profile_directory).handle_command,
+                         "trace": TraceCommand(TRACER, profile_directory).handle_command}
+
+    def execute(self, line: str) -> str:
+        name, *arguments = line.split() or [""]
+        command = self.commands.get(name or "metrics")
+        if command is None:
+            return f"Unknown admin command {name}; available: {', '.join(sorted(self.commands))}\n"
+        try:
+            return command(arguments)
+        except ValueError as error:
+            return f"Invalid arguments for {name}: {error}\n"
+
+    def start(self) -> None:
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        EVENT_LOG.event("admin_listening", host=Constants.HOST, port=self.server_address[1])
@@ -0,0 +1,234 @@
+import argparse
+import json
+
+import numpy as np
+
+from constants import Constants
+from treasure import TreasureInitializer, TreasureType
+
+
+class FighterBatch:
+
+    health: np.ndarray
+    mana: np.ndarray
+    defense: np.ndarray
+    base_damage: np.ndarray
+    spell_points: np.ndarray
+    spell_mana: np.ndarray
+
+    def __init__(self, health, mana, defense, base_damage,
+                 spell_points=None, spell_mana=None) -> None:
+        self.health = np.asarray(health, dtype=np.float64)
+        self.mana = np.asarray(mana, dtype=np.float64)
+        self.defense = np.asarray(defense, dtype=np.float64)
+        self.base_damage = np.asarray(base_damage, dtype=np.float64)
+        size: int = len(self.health)
+        self.spell_points = (np.zeros(size) if spell_points is None
+                             else np.asarray(spell_points, dtype=np.float64))
+        self.spell_mana = (np.full(size, np.inf) if spell_mana is None
+                           else np.asarray(spell_mana, dtype=np.float64))
+
+    @staticmethod
+    def heroes(levels: np.ndarray, weapon_points: np.ndarray,
+               spell_points: np.ndarray, spell_mana: np.ndarray) -> "FighterBatch":
+        gained: np.ndarray = levels - Constants.HERO_START_LEVEL
+        attack: np.ndarray = Constants.ATTACK_START_STAT + gained * Constants.ATTACK_PER_LEVEL
+        return FighterBatch(
+            Constants.HEALTH_START_STAT + gained * Constants.HEALTH_PER_LEVEL,
+            Constants.MANA_START_STAT + gained * Constants.MANA_PER_LEVEL,
+            Constants.DEFENSE_START_STAT + gained * Constants.DEFENSE_PER_LEVEL,
+            attack * Constants.PERCENTAGE_PER_HIT + weapon_points,
+            spell_points, spell_mana)
+
+    @staticmethod
+    def minions(levels: np.ndarray) -> "FighterBatch":
+        bonus: np.ndarray = np.where(levels == 1, 0, levels * Constants.XP_PER_KILL_MINION)
+        attack: np.ndarray = Constants.ATTACK_START_STAT + bonus
+        return FighterBatch(Constants.HEALTH_START_STAT + bonus,
+                            Constants.MANA_START_STAT + bonus,
+                            Constants.DEFENSE_START_STAT + bonus,
+                            np.trunc(attack * Constants.PERCENTAGE_PER_HIT))
+
+
+class BalanceSimulator:
+
+    MAX_ROUNDS: int = 10_000
+
+    _rng: np.random.Generator
+    _weapons: list
+    _spells: list
+
+    def __init__(self, treasures_file_name: str = Constants.TREASURES_FILE_NAME,
+                 seed: int | None = None) -> None:
+        self._rng = np.random.default_rng(seed)
+        self._weapons = []
+        self._spells = []
+        with open(treasures_file_name) as f:
+            next(f)
+            for line in f:
+                if not line.strip():
+                    continue
+                treasure = TreasureInitializer.Factory(line.strip())
+                if treasure._treasure_type == TreasureType.WEAPON:
+                    self._weapons.append(treasure)
+                elif treasure._treasure_type == TreasureType.SPELL:
+                    self._spells.append(treasure)
+
+    @staticmethod
+    def simulate(attacker: FighterBatch, defender: FighterBatch) -> tuple:
+        size: int = len(attacker.health)
+        attacker_won: np.ndarray = np.zeros(size, dtype=bool)
+        rounds: np.ndarray = np.full(size, BalanceSimulator.MAX_ROUNDS, dtype=np.int64)
+        index: np.ndarray = np.arange(size)
+        a_health, a_mana, a_defense = (attacker.health.copy(), attacker.mana.copy(),
+                                       attacker.defense.copy())
+        d_health, d_mana, d_defense = (defender.health.copy(), defender.mana.copy(),
+                                       defender.defense.copy())
+        a_base, a_spell_points, a_spell_mana = (attacker.base_damage, attacker.spell_points,
+                                                attacker.spell_mana)
+        d_base, d_spell_points, d_spell_mana = (defender.base_damage, defender.spell_points,
+                                                defender.spell_mana)
+
+        for current_round in range(1, BalanceSimulator.MAX_ROUNDS + 1):
+            if len(index) == 0:
+                break
+            d_health, d_defense, a_mana = BalanceSimulator._hit(
+                a_base, a_spell_points, a_spell_mana, a_mana, d_health, d_defense)
+            finished: np.ndarray = d_health <= 0
+            attacker_won[index[finished]] = True
+            a_health, a_defense, d_mana = BalanceSimulator._hit(
+                d_base, d_spell_points, d_spell_mana, d_mana, a_health, a_defense,
+                ~finished)
+            finished |= a_health <= 0
+            rounds[index[finished]] = current_round
+            keep: np.ndarray = ~finished
+            index = index[keep]
+            a_health, a_mana, a_defense = a_health[keep], a_mana[keep], a_defense[keep]
+            d_health, d_mana, d_defense = d_health[keep], d_mana[keep], d_defense[keep]
+            a_base, a_spell_points, a_spell_mana = (a_base[keep], a_spell_points[keep],
+                                                    a_spell_mana[keep])
+            d_base, d_spell_points, d_spell_mana = (d_base[keep], d_spell_points[keep],
+                                                    d_spell_mana[keep])
+        return attacker_won, rounds
+
+    @staticmethod
+    def _hit(base_damage, spell_points, spell_mana, mana, health, defense,
+             mask=None) -> tuple:
+        casts: np.ndarray = spell_mana <= mana
+        if mask is not None:
+            casts &= mask
+        damage: np.ndarray = np.where(casts, base_damage + spell_points, base_damage)
+        with np.errstate(invalid="ignore"):
+            mana = np.where(casts, np.maximum(np.trunc(mana - spell_mana), 0), mana)
+        absorbed: np.ndarray = np.minimum(
+            np.trunc(damage * Constants.PERCENTAGE_DEFENSE_ABSORPTION), defense)
+        if mask is not None:
+            damage = np.where(mask, damage, 0)
+            absorbed = np.where(mask, absorbed, 0)
+        health = health - (damage - absorbed)
+        defense = defense - absorbed
+        return health, defense, mana
+
+    def _sample_loadouts(self, levels: np.ndarray) -> tuple:
+        size: int = len(levels)
+        weapon_points: np.ndarray = np.zeros(size)
+        spell_points: np.ndarray = np.zeros(size)
+        spell_mana: np.ndarray = np.full(size, np.inf)
+        for level in np.unique(levels):
+            fights: np.ndarray = np.flatnonzero(levels == level)
+            weapons: list = [weapon for weapon in self._weapons if weapon._level <= level]
+            spells: list = [spell for spell in self._spells if spell._level <= level]
+            weapon_choice: np.ndarray = self._rng.integers(0, len(weapons) + 1, len(fights))
+            spell_choice: np.ndarray = self._rng.integers(0, len(spells) + 1, len(fights))
+            weapon_table: np.ndarray = np.array([weapon._points for weapon in weapons] + [0])
+            spell_table: np.ndarray = np.array([spell._points for spell in spells] + [0])
+            mana_table: np.ndarray = np.array([spell._min_mana for spell in spells] + [np.inf])
+            weapon_points[fights] = weapon_table[weapon_choice]
+            spell_points[fights] = spell_table[spell_choice]
+            spell_mana[fights] = mana_table[spell_choice]
+        return weapon_points, spell_points, spell_mana
+
+    def _random_heroes(self, levels: np.ndarray) -> FighterBatch:
+        return FighterBatch.heroes(levels, *self._sample_loadouts(levels))
+
+    @staticmethod
+    def _summarize(attacker_won: np.ndarray, rounds: np.ndarray) -> dict:
+        won_rounds: np.ndarray = rounds[attacker_won]
+        return {"win_rate": float(attacker_won.mean()),
+                "mean_rounds": float(rounds.mean()),
+                "mean_rounds_to_kill": float(won_rounds.mean()) if len(won_rounds) else None,
+                "p95_rounds": float(np.percentile(rounds, 95))}
+
+    def hero_vs_minion(self, fights: int, max_hero_level: int) -> dict:
+        table: dict = {}
+        for hero_level in range(Constants.HERO_START_LEVEL, max_hero_level + 1):
+            for minion_level in range(1, Constants.MINION_MAX_LEVEL + 1):
+                heroes: FighterBatch = self._random_heroes(np.full(fights, hero_level))
+                minions: FighterBatch = FighterBatch.minions(np.full(fights, minion_level))
+                table[f"hero L{hero_level} vs minion L{minion_level}"] = self._summarize(
+                    *BalanceSimulator.simulate(heroes, minions))
+        return table
+
+    def weapon_vs_minion(self, fights: int) -> dict:
+        table: dict = {}
+        for weapon in self._weapons:
+            for minion_level in range(1, Constants.MINION_MAX_LEVEL + 1):
+                levels: np.ndarray = np.full(fights, weapon._level)
+                _, spell_points, spell_mana = self._sample_loadouts(levels)
+                heroes: FighterBatch = FighterBatch.heroes(
+                    levels, np.full(fights, weapon._points), spell_points, spell_mana)
+                minions: FighterBatch = FighterBatch.minions(np.full(fights, minion_level))
+                table[f"{weapon._name} vs minion L{minion_level}"] = self._summarize(
+                    *BalanceSimulator.simulate(heroes, minions))
+        return table
+
+    def hero_vs_hero(self, fights: int, max_hero_level: int) -> dict:
+        table: dict = {}
+        for attacker_level in range(Constants.HERO_START_LEVEL, max_hero_level + 1):
+            for defender_level in range(Constants.HERO_START_LEVEL, max_hero_level + 1):
+                attackers: FighterBatch = self._random_heroes(np.full(fights, attacker_level))
+                defenders: FighterBatch = self._random_heroes(np.full(fights, defender_level))
+                table[f"hero L{attacker_level} vs hero L{defender_level}"] = self._summarize(
+                    *BalanceSimulator.simulate(attackers, defenders))
+        return table
+
+
+def print_table(title: str, table: dict) -> None:
+    print(title)
+    print(f"{'matchup':<36}{'win rate':>10}{'rounds':>10}{'to kill':>10}{'p95':>8}")
+    for matchup, summary in table.items():
+        to_kill = summary["mean_rounds_to_kill"]
+        print(f"{matchup:<36}{summary['win_rate']:>10.3f}{summary['mean_rounds']:>10.2f}"
+              f"{'-' if to_kill is None else format(to_kill, '.2f'):>10}"
+              f"{summary['p95_rounds']:>8.0f}")
+    print()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Monte Carlo combat balance simulator")
+    parser.add_argument("--fights", type=int, default=100_000,
+                        help="fights simulated per matchup")
+    parser.add_argument("--max-level", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--treasures", default=Constants.TREASURES_FILE_NAME)
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="override a Constants value, e.g. PERCENTAGE_PER_HIT=0.4")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    for override in args.set:
+        name, value = override.split("=", 1)
+        setattr(Constants, name, type(getattr(Constants, name))(value))
+
+    simulator: BalanceSimulator = BalanceSimulator(args.treasures, args.seed)
+    results: dict = {
+        "hero vs minion": simulator.hero_vs_minion(args.fights, args.max_level),
+        "weapon vs minion": simulator.weapon_vs_minion(args.fights),
+        "hero vs hero": simulator.hero_vs_hero(args.fights, args.max_level),
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for title, table in results.items():
+            print_table(title, table)
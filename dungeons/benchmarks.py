@@ -0,0 +1,270 @@
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from actor import Hero, Minion
+from backpack import Backpack
+from combat import CombatEngine
+from constants import Constants
+from game_tactics import GameTactics, Direction
+from treasure import TreasureCatalog, TreasureInitializer
+
+
+def _write_benchmark_map(height: int, width: int, rng: random.Random,
+                         minions: float = 0.0, treasures: int = 0) -> str:
+    cells: list = ["#" if rng.random() < 0.1 else
+                   "M" if rng.random() < minions else "." for _ in range(height * width)]
+    free: list = [index for index, cell in enumerate(cells) if cell == "."]
+    for index in rng.sample(free, min(treasures, len(free))):
+        cells[index] = "T"
+    rows: list = ["".join(cells[row * width:(row + 1) * width]) for row in range(height)]
+    map_file = tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False)
+    map_file.write("\n".join(rows))
+    map_file.close()
+    return map_file.name
+
+
+def _benchmark_game(size: int, seed: int, minions: float = 0.0, treasures: int = 0) -> GameTactics:
+    rng: random.Random = random.Random(seed)
+    map_file_name: str = _write_benchmark_map(size, size, rng, minions, treasures)
+    try:
+        return GameTactics(map_file_name, seed=seed)
+    finally:
+        os.remove(map_file_name)
+
+
+def _spawn_heroes(game: GameTactics, count: int) -> list:
+    heroes: list = []
+    for symbol in range(1, count + 1):
+        hero: Hero = Hero(str(symbol), game.get_random_free_coordinates())
+        game.spawn_hero(hero)
+        heroes.append(hero)
+    return heroes
+
+
+def _timed(operations: int, started: float) -> float:
+    return operations / (time.perf_counter() - started)
+
+
+def bench_moves(moves: int = 200000, heroes: int = 9, size: int = 256, seed: int = 0) -> float:
+    game: GameTactics = _benchmark_game(size, seed)
+    players: list = _spawn_heroes(game, heroes)
+    directions: list = random.Random(seed).choices(list(Direction), k=moves)
+    started: float = time.perf_counter()
+    for index, direction in enumerate(directions):
+        game.move_hero(players[index % heroes], direction)
+    return _timed(moves, started)
+
+
+def bench_moves_terrain(moves: int = 50000, heroes: int = 9, size: int = 256,
+                        seed: int = 0) -> float:
+    game: GameTactics = _benchmark_game(size, seed, minions=0.05,
+                                        treasures=len(TreasureCatalog.load()))
+    players: list = _spawn_heroes(game, heroes)
+    directions: list = random.Random(seed).choices(list(Direction), k=moves)
+    started: float = time.perf_counter()
+    for index, direction in enumerate(directions):
+        hero: Hero = players[index % heroes]
+        game.move_hero(hero, direction)
+        if not hero.is_alive():
+            hero = players[index % heroes] = Hero(hero.actor_symbol,
+                                                  game.get_random_free_coordinates())
+            game.spawn_hero(hero)
+    return _timed(moves, started)
+
+
+def bench_render(renders: int = 200, heroes: int = 9, size: int = 256, seed: int = 0) -> float:
+    game: GameTactics = _benchmark_game(size, seed)
+    players: list = _spawn_heroes(game, heroes)
+    directions: list = random.Random(seed).choices(list(Direction), k=renders)
+    started: float = time.perf_counter()
+    for index, direction in enumerate(directions):
+        game.move_hero(players[index % heroes], direction)
+        game.display_map_bytes()
+    return _timed(renders, started)
+
+
+def bench_minion_fights(fights: int = 20000, seed: int = 0) -> float:
+    rng: random.Random = random.Random(seed)
+    pairs: list = [(Hero("1", None), Minion(rng.randint(1, Constants.MINION_MAX_LEVEL), None))
+                   for _ in range(fights)]
+    started: float = time.perf_counter()
+    for hero, minion in pairs:
+        CombatEngine.fight(hero, minion)
+    return _timed(fights, started)
+
+
+def bench_hero_fights(fights: int = 20000, size: int = 64, seed: int = 0) -> float:
+    game: GameTactics = _benchmark_game(size, seed)
+    catalog: TreasureCatalog = TreasureCatalog.load()
+    cells: list = [game.get_random_free_coordinates() for _ in range(256)]
+    pairs: list = []
+    for index in range(fights):
+        coordinates = cells[index % len(cells)]
+        first: Hero = Hero(f"a{index}", coordinates)
+        second: Hero = Hero(f"b{index}", coordinates)
+        if index % 2:
+            first.add_to_backpack(catalog.materialize(index % len(catalog), None))
+            game.hero_use_item_from_backpack(first, 0)
+        game.spawn_hero(first)
+        game.spawn_hero(second)
+        pairs.append((first, second))
+    started: float = time.perf_counter()
+    for first, second in pairs:
+        game.heroes_fight(first, second)
+    return _timed(fights, started)
+
+
+def bench_spawn(spawns: int = 20000, size: int = 256, occupancy: float = 0.0,
+                seed: int = 0) -> float:
+    game: GameTactics = _benchmark_game(size, seed)
+    occupants: int = int(game.display_map().count(".") * occupancy)
+    for index in range(occupants):
+        game.spawn_hero(Hero(str(index), game.get_random_free_coordinates()))
+    started: float = time.perf_counter()
+    for _ in range(spawns):
+        hero: Hero = Hero("S", game.get_random_free_coordinates())
+        game.spawn_hero(hero)
+        game._remove_hero_from_map(hero)
+    return _timed(spawns, started)
+
+
+def bench_backpack(cycles: int = 20000) -> float:
+    catalog: TreasureCatalog = TreasureCatalog.load()
+    items: list = [catalog.materialize(index, None) for index in range(len(catalog))]
+    backpack: Backpack = Backpack()
+    started: float = time.perf_counter()
+    for _ in range(cycles // Constants.MAX_CAPACITY_OF_BACKPACK):
+        for index in range(Constants.MAX_CAPACITY_OF_BACKPACK):
+            backpack.add_item(items[index % len(items)])
+        for index in range(Constants.MAX_CAPACITY_OF_BACKPACK):
+            backpack.remove_item(backpack.get_item(0))
+    return _timed(cycles // Constants.MAX_CAPACITY_OF_BACKPACK * Constants.MAX_CAPACITY_OF_BACKPACK,
+                  started)
+
+
+def bench_backpack_use(uses: int = 20000, seed: int = 0) -> float:
+    game: GameTactics = _benchmark_game(16, seed)
+    catalog: TreasureCatalog = TreasureCatalog.load()
+    hero: Hero = Hero("1", game.get_random_free_coordinates())
+    items: list = [catalog.materialize(index % len(catalog), None) for index in range(uses)]
+    started: float = time.perf_counter()
+    for item in items:
+        hero.add_to_backpack(item)
+        game.hero_use_item_from_backpack(hero, 0)
+        while hero.is_backpack_full():
+            hero.remove_from_backpack(0)
+    return _timed(uses, started)
+
+
+def bench_catalog_load(loads: int = 2000) -> float:
+    with open(Constants.TREASURES_FILE_NAME) as f:
+        lines: list = f.read().splitlines()[1:]
+    started: float = time.perf_counter()
+    for _ in range(loads):
+        TreasureCatalog.parse(lines)
+    return _timed(loads, started)
+
+
+def bench_treasure_factory(loads: int = 2000) -> float:
+    with open(Constants.TREASURES_FILE_NAME) as f:
+        lines: list = [line.strip() for line in f.read().splitlines()[1:] if line.strip()]
+    started: float = time.perf_counter()
+    for _ in range(loads):
+        for line in lines:
+            TreasureInitializer.Factory(line)
+    return _timed(loads, started)
+
+
+BENCHMARKS: dict = {
+    "move_free": (bench_moves, "moves", ("size", "players")),
+    "move_terrain": (bench_moves_terrain, "moves", ("size", "players")),
+    "render": (bench_render, "renders", ("size", "players")),
+    "fight_minion": (bench_minion_fights, "fights", ()),
+    "fight_hero": (bench_hero_fights, "fights", ()),
+    "spawn": (bench_spawn, "spawns", ("size", "occupancy")),
+    "backpack_add_remove": (bench_backpack, "cycles", ()),
+    "backpack_use": (bench_backpack_use, "uses", ()),
+    "catalog_load": (bench_catalog_load, "loads", ()),
+    "treasure_factory": (bench_treasure_factory, "loads", ()),
+}
+
+DEFAULT_OPERATIONS: dict = {
+    "move_free": 200000, "move_terrain": 50000, "render": 200, "fight_minion": 20000,
+    "fight_hero": 20000, "spawn": 20000, "backpack_add_remove": 20000,
+    "backpack_use": 20000, "catalog_load": 2000, "treasure_factory": 2000,
+}
+
+PARAMETER_NAMES: dict = {"size": "size", "players": "heroes", "occupancy": "occupancy"}
+
+
+def run_suite(names: list, grid: dict, repeat: int = 3, scale: float = 1.0) -> dict:
+    results: dict = {}
+    for name in names:
+        function, operations_name, parameters = BENCHMARKS[name]
+        operations: int = max(1, int(DEFAULT_OPERATIONS[name] * scale))
+        for values in itertools.product(*(grid[parameter] for parameter in parameters)):
+            arguments: dict = {PARAMETER_NAMES[parameter]: value
+                               for parameter, value in zip(parameters, values)}
+            label: str = ",".join(f"{parameter}={value}"
+                                  for parameter, value in zip(parameters, values))
+            key: str = f"{name}[{label}]" if label else name
+            results[key] = max(function(**{operations_name: operations}, **arguments)
+                               for _ in range(repeat))
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    regressions: list = []
+    for key, rate in results.items():
+        expected: float | None = baseline.get(key)
+        if expected and rate < expected * (1 - tolerance):
+            regressions.append((key, expected, rate))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Dungeons engine microbenchmarks")
+    parser.add_argument("--only", default=",".join(BENCHMARKS),
+                        help="comma separated benchmark names")
+    parser.add_argument("--sizes", default="64,256", help="comma separated map sizes")
+    parser.add_argument("--players", default="1,9", help="comma separated player counts")
+    parser.add_argument("--occupancy", default="0,0.5,0.9",
+                        help="comma separated fractions of free cells already occupied")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="multiply the operation count of every benchmark")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against results stored in this JSON file")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="write the results to --baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed slowdown against the baseline, as a fraction")
+    args = parser.parse_args()
+    grid: dict = {"size": [int(size) for size in args.sizes.split(",")],
+                  "players": [int(players) for players in args.players.split(",")],
+                  "occupancy": [float(occupancy) for occupancy in args.occupancy.split(",")]}
+    results: dict = run_suite(args.only.split(","), grid, args.repeat, args.scale)
+    for key, rate in results.items():
+        print(f"{key:>40}: {rate:>14,.0f} ops/s")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline) as f:
+            regressions: list = compare(results, json.load(f), args.tolerance)
+        for key, expected, rate in regressions:
+            print(f"REGRESSION {key}: {rate:,.0f} ops/s, baseline {expected:,.0f} ops/s "
+                  f"({rate / expected - 1:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"No benchmark slower than the baseline by more than {args.tolerance:.0%}")
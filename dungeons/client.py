@@ -26,7 +26,7 @@ with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         while True:
             client_input = input()
             if thread.is_alive():
-                s.sendall(client_input.encode())
+                s.sendall((client_input + "\n").encode())
             if client_input.lower() == "quit":
                 break
     except:
@@ -1,6 +1,19 @@
+import asyncio
+import collections
+import itertools
+import socket
+import threading
+import time
+
 from enum import Enum
 from constants import Constants
-from game_tactics import GameTactics, Hero, Coordinates, Messages, Direction
+from event_log import EVENT_LOG
+from game_tactics import GameTactics, Hero, Coordinates, Messages, Direction, WorldFullException
+from interest import InterestGrid, Viewport
+from map import Map
+from metrics import METRICS
+from player_registry import PlayerRegistry
+from protocol import MapFrame, LineFramer, BinaryFrame
 
 
 class CommandType(Enum):
@@ -14,6 +27,10 @@ class CommandType(Enum):
     REMOVE = "remove"
     SWAP = "swap"
     FIGHT = "fight"
+    DELTA = "delta"
+    RESYNC = "resync"
+    BINARY = "binary"
+    VIEWPORT = "viewport"
     QUIT = "quit"
     UNKNOWN = "unknown"
 
@@ -37,59 +54,292 @@ class Command:
                             else CommandType.UNKNOWN)
 
 
+class StreamConnection:
+
+    _writer: asyncio.StreamWriter
+
+    def __init__(self, writer: asyncio.StreamWriter) -> None:
+        self._writer = writer
+
+    def send(self, data: bytes) -> int:
+        self.sendall(data)
+        return len(data)
+
+    def sendall(self, data: bytes) -> None:
+        if self._writer.is_closing():
+            raise ConnectionResetError("Connection is closed")
+        if self._writer.transport.get_write_buffer_size() > Constants.MAX_WRITE_BUFFER:
+            self._writer.transport.abort()
+            raise ConnectionResetError("Client stopped reading its updates")
+        self._writer.write(data)
+
+    async def drain(self) -> None:
+        await self._writer.drain()
+
+    def shutdown(self, how: int) -> None:
+        self._writer.close()
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+class SocketConnection:
+
+    _socket: socket.socket
+    _outbox: collections.deque
+    _pending: int
+    _closing: bool
+    _ready: threading.Condition
+    _writer: threading.Thread
+
+    def __init__(self, sock: socket.socket) -> None:
+        self._socket = sock
+        self._outbox = collections.deque()
+        self._pending = 0
+        self._closing = False
+        self._ready = threading.Condition()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def recv(self, size: int) -> bytes:
+        return self._socket.recv(size)
+
+    def send(self, data: bytes) -> int:
+        self.sendall(data)
+        return len(data)
+
+    def sendall(self, data: bytes) -> None:
+        with self._ready:
+            if self._closing:
+                raise ConnectionResetError("Connection is closed")
+            if self._pending + len(data) > Constants.MAX_WRITE_BUFFER:
+                self._abort()
+                raise ConnectionResetError("Client stopped reading its updates")
+            self._outbox.append(data)
+            self._pending += len(data)
+            self._ready.notify()
+
+    def _abort(self) -> None:
+        self._closing = True
+        self._outbox.clear()
+        self._ready.notify()
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def _write_loop(self) -> None:
+        while True:
+            with self._ready:
+                while not self._outbox and not self._closing:
+                    self._ready.wait()
+                if not self._outbox:
+                    break
+                payload: bytes = b"".join(self._outbox)
+                self._outbox.clear()
+            try:
+                self._socket.sendall(payload)
+            except OSError:
+                break
+            with self._ready:
+                self._pending -= len(payload)
+        try:
+            self._socket.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+
+    def shutdown(self, how: int) -> None:
+        with self._ready:
+            self._closing = True
+            self._ready.notify()
+        try:
+            self._socket.shutdown(socket.SHUT_RD)
+        except OSError:
+            pass
+
+    def close(self) -> None:
+        with self._ready:
+            self._closing = True
+            self._ready.notify()
+        self._writer.join(Constants.WRITE_DRAIN_TIMEOUT)
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._socket.close()
+
+
 class ClientHandler:
 
     CLIENTS: dict = {}
-    CLIENT_SYMBOLS: list = [1, 2, 3, 4, 5, 6, 7, 8, 9]
+    HANDLERS: dict = {}
+    PLAYERS: PlayerRegistry = PlayerRegistry()
+    INTEREST: InterestGrid = InterestGrid()
+    JOURNAL = None
+    GAME_LOCK: threading.Lock = threading.Lock()
+    _SESSION_IDS = itertools.count(1)
+    COMMAND_LATENCY: dict = {
+        command_type: METRICS.histogram("command_seconds", "Time spent handling a command",
+                                        command=command_type.value)
+        for command_type in CommandType}
+    MAP_FRAMES = METRICS.counter("map_frames_sent", "Map frames queued for clients")
+    MAP_BYTES = METRICS.counter("map_bytes_sent", "Bytes of map frames queued for clients")
+    MESSAGES_SENT = METRICS.counter("messages_sent", "Text or binary messages queued for clients")
+    BYTES_SENT = METRICS.counter("bytes_sent", "Bytes written to client connections")
+
+    _delta_mode: bool
+    _binary_mode: bool
+    _last_frame: int
+    _framer: LineFramer
+    _outbox: list
+    _map_pending: bool
+    _viewport_size: tuple | None
+    _view_changes: dict
+    _last_message: str
 
-    def __init__(self, connection, game: GameTactics) -> None:
+    def __init__(self, connection, game: GameTactics, simulation=None) -> None:
         self.connection = connection
+        self.session_id = next(ClientHandler._SESSION_IDS)
         self._game = game
-        self._spawn_player()
+        self._simulation = simulation
+        self._delta_mode = False
+        self._binary_mode = False
+        self._last_frame = -1
+        self._framer = LineFramer()
+        self._outbox = []
+        self._map_pending = False
+        self._viewport_size = None
+        self._view_changes = {}
+        self._last_message = ""
+        if simulation is None:
+            self._spawn_player()
+        else:
+            simulation.submit(self, None)
 
     def _spawn_player(self) -> None:
-        ClientHandler.CLIENT_SYMBOLS.sort()
-        symbol = ClientHandler.CLIENT_SYMBOLS[0]
-        ClientHandler.CLIENT_SYMBOLS.remove(symbol)
-        coordinates: Coordinates = self._game.get_random_free_coordinates()
-        self.player: Hero = Hero(str(symbol), coordinates)
+        if ClientHandler.JOURNAL is not None:
+            ClientHandler.JOURNAL.record_spawn(self.session_id)
+        try:
+            coordinates: Coordinates = self._game.get_random_free_coordinates()
+            player_id: int = ClientHandler.PLAYERS.acquire()
+        except WorldFullException:
+            self.connection.sendall((Messages.WORLD_FULL + "\n").encode())
+            raise
+        self.player: Hero = (self._game.claim_restored_hero(str(player_id)) or
+                             Hero(str(player_id), coordinates))
         self._game.spawn_hero(self.player)
+        ClientHandler.PLAYERS.register(self.player, self.connection)
         ClientHandler.CLIENTS[self.connection] = self.player
-        self.connection.send(
-            ("Welcome to Dungeons! Your player " +
-             f"symbol is {self.player.actor_symbol}\n").encode())
+        ClientHandler.HANDLERS[self.connection] = self
+        self._send_msg("Welcome to Dungeons! Your player " +
+                       f"symbol is {self.player.actor_symbol}" +
+                       (f" (shown as {Map.WIDE_PLAYER_SYMBOL} on text maps)"
+                        if len(self.player.actor_symbol) > 1 else ""))
         self._send_updated_map()
+        ClientHandler._flush_all()
 
     def handle_client(self) -> None:
-        while True and self.player.is_alive():
-            client_input: str = self.connection.recv(
-                Constants.BUFFER_SIZE).decode()
-
-            command: Command = Command(client_input)
-            print(
-                f"player{self.player.actor_symbol};cmd:{command.commandType.name}-{command.argument}")
-
-            match command.commandType:
-                case (CommandType.LEFT |
-                      CommandType.RIGHT |
-                      CommandType.UP |
-                      CommandType.DOWN):
-                    self._move_player(command.commandType.name)
-                case CommandType.QUIT:
-                    self._disconnect_player(self.connection)
+        try:
+            while self.is_connected():
+                try:
+                    data: bytes = self.connection.recv(Constants.BUFFER_SIZE)
+                except OSError:
+                    data = b""
+                with ClientHandler.GAME_LOCK:
+                    if not self._handle_data(data):
+                        break
+        finally:
+            self.connection.close()
+
+    async def handle_client_async(self, reader: asyncio.StreamReader) -> None:
+        while self.is_connected():
+            data: bytes = await reader.read(Constants.BUFFER_SIZE)
+            if not self._handle_data(data):
+                break
+            await self.connection.drain()
+
+    def handle_client_queued(self) -> None:
+        try:
+            while True:
+                data: bytes = self.connection.recv(Constants.BUFFER_SIZE)
+                if not data:
                     break
-                case CommandType.BACKPACK:
-                    self._display_backpack()
-                case CommandType.STATS:
-                    self._display_stats()
-                case CommandType.USE:
-                    self._use_item(command.argument)
-                case CommandType.REMOVE:
-                    self._remove_item(command.argument)
-                case CommandType.SWAP | CommandType.FIGHT:
-                    self._interact_with_other_player(command)
-                case CommandType.UNKNOWN:
-                    self._send_msg(Messages.UNKNOWN_COMMAND)
+                for line in self._framer.feed(data):
+                    self._simulation.submit(self, Command(line))
+        except OSError:
+            pass
+        finally:
+            self._simulation.submit(self, Command(CommandType.QUIT.value))
+            self.connection.close()
+
+    def is_connected(self) -> bool:
+        return ClientHandler.HANDLERS.get(self.connection) is self
+
+    def _handle_data(self, data: bytes) -> bool:
+        if not self.is_connected():
+            return False
+        if not data:
+            self._handle_command(Command(CommandType.QUIT.value))
+            ClientHandler._flush_all()
+            return False
+        keep_connection: bool = True
+        for line in self._framer.feed(data):
+            keep_connection = self._handle_input(line)
+            if not keep_connection or not self.player.is_alive():
+                break
+        ClientHandler._flush_all()
+        return keep_connection
+
+    def _handle_input(self, client_input: str) -> bool:
+        return self._handle_command(Command(client_input))
+
+    def _handle_command(self, command: Command) -> bool:
+        if ClientHandler.JOURNAL is not None:
+            ClientHandler.JOURNAL.record_command(self.session_id, command)
+        self._last_message = ""
+        started: float = time.perf_counter()
+        keep_connection: bool = self._dispatch_command(command)
+        latency: float = time.perf_counter() - started
+        ClientHandler.COMMAND_LATENCY[command.commandType].observe(latency)
+        EVENT_LOG.command(self.player.actor_symbol, command.commandType.value,
+                          command.argument, self._last_message, latency)
+        return keep_connection
+
+    def _dispatch_command(self, command: Command) -> bool:
+        match command.commandType:
+            case (CommandType.LEFT |
+                  CommandType.RIGHT |
+                  CommandType.UP |
+                  CommandType.DOWN):
+                self._move_player(command.commandType.name)
+            case CommandType.QUIT:
+                self._disconnect_player(self.connection)
+                return False
+            case CommandType.BACKPACK:
+                self._display_backpack()
+            case CommandType.STATS:
+                self._display_stats()
+            case CommandType.USE:
+                self._use_item(command.argument)
+            case CommandType.REMOVE:
+                self._remove_item(command.argument)
+            case CommandType.SWAP | CommandType.FIGHT:
+                self._interact_with_other_player(command)
+            case CommandType.DELTA:
+                self._delta_mode = True
+                self._send_keyframe()
+            case CommandType.RESYNC:
+                self._send_keyframe()
+            case CommandType.BINARY:
+                self._send_msg(BinaryFrame.SWITCH_LINE.strip())
+                self._binary_mode = True
+                self._delta_mode = True
+                self._send_keyframe()
+            case CommandType.VIEWPORT:
+                self._set_viewport(command.argument)
+            case CommandType.UNKNOWN:
+                self._send_msg(Messages.UNKNOWN_COMMAND)
+        return True
 
     def _move_player(self, direction) -> None:
         direction: Direction = Direction[direction]
@@ -102,18 +352,176 @@ class ClientHandler:
             self._send_msg(game_msg)
 
     def _send_updated_map(self) -> None:
-        for client in ClientHandler.CLIENTS.keys():
-            client.send(self._game.display_map().encode())
+        for handler in ClientHandler.HANDLERS.values():
+            if handler._viewport_size is None:
+                handler._map_pending = True
+
+    @staticmethod
+    def _flush_all() -> None:
+        ClientHandler._route_view_changes()
+        for handler in list(ClientHandler.HANDLERS.values()):
+            handler._flush()
+        if ClientHandler.JOURNAL is not None:
+            ClientHandler.JOURNAL.flush()
+
+    @staticmethod
+    def _route_view_changes() -> None:
+        interest: InterestGrid = ClientHandler.INTEREST
+        subscribers: list = interest.get_subscribers()
+        if not subscribers:
+            return
+        game: GameTactics = subscribers[0]._game
+        changes: list | None = game.get_map_changes_since(interest.version)
+        interest.version = game.get_map_version()
+        if changes is None:
+            for handler in subscribers:
+                handler._send_keyframe()
+            return
+        for handler, cells in interest.route(changes).items():
+            handler._view_changes.update(cells)
+            handler._map_pending = True
+
+    def _flush(self) -> None:
+        if self._map_pending:
+            self._map_pending = False
+            queued: int = len(self._outbox)
+            self._queue_map_frame()
+            ClientHandler.MAP_FRAMES.increment(len(self._outbox) - queued)
+            ClientHandler.MAP_BYTES.increment(sum(map(len, self._outbox[queued:])))
+        if self._outbox:
+            payload: bytes = b"".join(self._outbox)
+            self._outbox.clear()
+            ClientHandler.BYTES_SENT.increment(len(payload))
+            try:
+                self.connection.sendall(payload)
+            except OSError:
+                pass
+
+    def _queue_map_frame(self) -> None:
+        if self._viewport_size is not None:
+            self._queue_view_frame()
+            return
+        if not self._delta_mode:
+            self._outbox.append(self._game.display_map_bytes())
+            return
+        changes: list | None = self._game.get_map_changes_since(
+            self._last_frame)
+        if changes is None:
+            self._send_keyframe()
+        elif changes:
+            self._last_frame = self._game.get_map_version()
+            if self._binary_mode:
+                self._outbox.append(BinaryFrame.encode_delta(
+                    self._last_frame, self._game.get_map_cells(changes)))
+            else:
+                self._outbox.append(MapFrame.encode_delta(
+                    self._last_frame, changes).encode())
+
+    def _queue_view_frame(self) -> None:
+        viewport: Viewport = Viewport.centered(
+            self.player.coordinates, *self._viewport_size, *self._game.get_map_size())
+        changes: list = list(self._view_changes.items())
+        self._view_changes.clear()
+        previous: Viewport | None = ClientHandler.INTEREST.get_viewport(self)
+        if viewport != previous:
+            if not ClientHandler.INTEREST:
+                ClientHandler.INTEREST.version = self._game.get_map_version()
+            ClientHandler.INTEREST.subscribe(self, viewport)
+            if self._delta_mode and viewport.can_scroll_from(previous):
+                self._send_view_scroll(viewport, previous, changes)
+            else:
+                self._send_view_keyframe(viewport)
+        elif changes and not self._delta_mode:
+            self._outbox.append(self._game.display_map_region(
+                viewport.top, viewport.left, viewport.height, viewport.width).encode())
+        elif changes:
+            self._last_frame = self._game.get_map_version()
+            if self._binary_mode:
+                self._outbox.append(BinaryFrame.encode_delta(
+                    self._last_frame, self._game.get_map_cells(changes)))
+            else:
+                self._outbox.append(MapFrame.encode_delta(
+                    self._last_frame, changes).encode())
+
+    def _send_view_keyframe(self, viewport: Viewport) -> None:
+        region: tuple = (viewport.top, viewport.left, viewport.height, viewport.width)
+        self._last_frame = self._game.get_map_version()
+        if self._binary_mode:
+            self._outbox.append(BinaryFrame.encode_view(
+                self._last_frame, *region,
+                self._game.get_map_region_tile_bytes(*region),
+                self._game.get_map_region_occupied_cells(*region)))
+        elif self._delta_mode:
+            self._outbox.append(MapFrame.encode_view(
+                self._last_frame, viewport.top, viewport.left,
+                self._game.display_map_region(*region)).encode())
+        else:
+            self._outbox.append(self._game.display_map_region(*region).encode())
+
+    def _send_view_scroll(self, viewport: Viewport, previous: Viewport, changes: list) -> None:
+        cells: list = [(coordinates, symbol) for coordinates, symbol in changes
+                       if viewport.contains(coordinates)]
+        cells += self._game.get_map_symbols(viewport.exposed_cells(previous))
+        self._last_frame = self._game.get_map_version()
+        if self._binary_mode:
+            self._outbox.append(BinaryFrame.encode_scroll(
+                self._last_frame, viewport.top, viewport.left, self._game.get_map_cells(cells)))
+        else:
+            self._outbox.append(MapFrame.encode_scroll(
+                self._last_frame, viewport.top, viewport.left, cells).encode())
+
+    def _set_viewport(self, argument: str) -> None:
+        if argument.lower() == "off":
+            self._viewport_size = None
+            ClientHandler.INTEREST.unsubscribe(self)
+            self._view_changes.clear()
+            if self._delta_mode:
+                self._send_keyframe()
+            else:
+                self._map_pending = True
+            return
+        try:
+            self._viewport_size = Viewport.parse_size(argument)
+        except ValueError:
+            self._send_msg(Messages.INVALID_ARGUMENT)
+            return
+        self._send_keyframe()
+
+    def _send_keyframe(self) -> None:
+        if self._viewport_size is not None:
+            ClientHandler.INTEREST.unsubscribe(self)
+            self._map_pending = True
+            return
+        self._last_frame = self._game.get_map_version()
+        if self._binary_mode:
+            self._outbox.append(BinaryFrame.encode_keyframe(
+                self._last_frame, *self._game.get_map_size(),
+                self._game.get_map_tile_bytes(),
+                self._game.get_map_occupied_cells()))
+        else:
+            self._outbox.append(MapFrame.encode_keyframe(
+                self._last_frame, self._game.display_map()).encode())
 
     def _disconnect_player(self, conn, msg="Goodbye") -> None:
-        player: Hero = ClientHandler.CLIENTS[conn]
-        symbol = player.actor_symbol
-        ClientHandler.CLIENT_SYMBOLS.append(int(symbol))
-        ClientHandler.CLIENTS.pop(conn)
-        conn.send((msg + "\n").encode())
+        player: Hero | None = ClientHandler.CLIENTS.pop(conn, None)
+        handler: ClientHandler | None = ClientHandler.HANDLERS.pop(conn, None)
+        if player is None or handler is None:
+            return
+        ClientHandler.PLAYERS.release(player)
+        handler._map_pending = False
+        ClientHandler.INTEREST.unsubscribe(handler)
+        handler._send_msg(msg)
+        handler._flush()
+        handler._close_input()
         self._game._remove_hero_from_map(player)
         self._send_updated_map()
 
+    def _close_input(self) -> None:
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
     def _display_backpack(self) -> None:
         game_msg: str = self.player.display_backpack()
         self._send_msg(game_msg)
@@ -144,9 +552,11 @@ class ClientHandler:
             self.player)
         if other_player_symbol == Messages.NOT_ON_SAME_SPOT:
             self._send_msg(Messages.NOT_ON_SAME_SPOT)
-        other_player_conn = [
-            i for i in ClientHandler.CLIENTS
-            if ClientHandler.CLIENTS[i].actor_symbol == other_player_symbol][0]
+            return
+        other_player_conn = ClientHandler.PLAYERS.get_connection(other_player_symbol)
+        if other_player_conn is None:
+            self._send_msg(Messages.NOT_ON_SAME_SPOT)
+            return
         if command.commandType == CommandType.SWAP:
             self._swap_item_with_player(other_player_conn, command.argument)
         else:
@@ -158,7 +568,7 @@ class ClientHandler:
             game_msg: str = self._game.swap_item(
                 self.player, other_player, int(index))
             if "swapped" in game_msg:
-                other_player_conn.send((game_msg + "\n").encode())
+                ClientHandler.HANDLERS[other_player_conn]._send_msg(game_msg)
                 self._send_msg(game_msg)
         except ValueError:
             self._send_msg(Messages.INVALID_ARGUMENT)
@@ -168,8 +578,8 @@ class ClientHandler:
         game_msg: str = self._game.heroes_fight(self.player, other_player)
         if "died" in game_msg:
             self._disconnect_player(self.connection, game_msg)
-            other_player_conn.send(
-                (Messages.PLAYER_KILLED_OTHER_PLAYER.format(str(self.player)) + "\n").encode())
+            ClientHandler.HANDLERS[other_player_conn]._send_msg(
+                Messages.PLAYER_KILLED_OTHER_PLAYER.format(killed=str(self.player)))
         else:
             self._disconnect_player(other_player_conn,
                                     Messages.PLAYER_KILLED.format(
@@ -177,4 +587,14 @@ class ClientHandler:
             self._send_msg(game_msg)
 
     def _send_msg(self, msg) -> None:
-        self.connection.send((msg + "\n").encode())
+        ClientHandler.MESSAGES_SENT.increment()
+        self._last_message = msg
+        if self._binary_mode:
+            self._outbox.append(BinaryFrame.encode_message(msg))
+        else:
+            self._outbox.append((msg + "\n").encode())
+
+
+METRICS.gauge("connections", "Connected players", lambda: len(ClientHandler.CLIENTS))
+METRICS.gauge("free_player_ids", "Player ids still available",
+              ClientHandler.PLAYERS.free_count)
@@ -0,0 +1,59 @@
+from constants import Constants
+
+
+class CombatEngine:
+
+    @staticmethod
+    def fight(attacker, defender) -> tuple:
+        attacker_stats = attacker._stats
+        defender_stats = defender._stats
+        attacker_health, attacker_mana, attacker_defense = (
+            attacker_stats._health, attacker_stats._mana, attacker_stats._defense)
+        defender_health, defender_mana, defender_defense = (
+            defender_stats._health, defender_stats._mana, defender_stats._defense)
+        attacker_base, attacker_spell_points, attacker_spell_mana = attacker.damage_profile()
+        defender_base, defender_spell_points, defender_spell_mana = defender.damage_profile()
+        absorption: float = Constants.PERCENTAGE_DEFENSE_ABSORPTION
+
+        rounds: int = 0
+        attacker_won: bool = False
+        while True:
+            rounds += 1
+            damage = attacker_base
+            if attacker_spell_mana is not None and attacker_spell_mana <= attacker_mana:
+                damage = attacker_base + attacker_spell_points
+                attacker_mana = int(attacker_mana - attacker_spell_mana)
+                if attacker_mana < 0:
+                    attacker_mana = 0
+            absorbed: int = int(damage * absorption)
+            if absorbed > defender_defense:
+                absorbed = defender_defense
+            defender_health = defender_health - (damage - absorbed)
+            defender_defense = defender_defense - absorbed
+            if defender_health <= 0:
+                defender_health = 0
+                attacker_won = True
+                break
+
+            damage = defender_base
+            if defender_spell_mana is not None and defender_spell_mana <= defender_mana:
+                damage = defender_base + defender_spell_points
+                defender_mana = int(defender_mana - defender_spell_mana)
+                if defender_mana < 0:
+                    defender_mana = 0
+            absorbed = int(damage * absorption)
+            if absorbed > attacker_defense:
+                absorbed = attacker_defense
+            attacker_health = attacker_health - (damage - absorbed)
+            attacker_defense = attacker_defense - absorbed
+            if attacker_health <= 0:
+                attacker_health = 0
+                break
+
+        attacker_stats._health, attacker_stats._mana, attacker_stats._defense = (
+            attacker_health, attacker_mana, attacker_defense)
+        defender_stats._health, defender_stats._mana, defender_stats._defense = (
+            defender_health, defender_mana, defender_defense)
+        attacker._alive = attacker_won
+        defender._alive = not attacker_won
+        return attacker_won, rounds
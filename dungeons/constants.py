@@ -21,9 +21,8 @@ class Constants:
     HERO_START_LEVEL: int = 1
     XP_PER_LEVEL: int = 15
 
-    MAP_WIDTH: int = 20
-    MAP_HEIGHT: int = 5
     MAP_FILE_NAME: str = "map.txt"
+    MAP_CHANGE_LOG_SIZE: int = 4096
     TREASURES_FILE_NAME = "TreasureItems.csv"
 
     TREASURE_LINE_SPLITTER: str = ";"
@@ -35,7 +34,29 @@ class Constants:
 
     HOST = '127.0.0.1'
     PORT = 6968
+    ADMIN_PORT = 6969
     BUFFER_SIZE = 1024
+    ASYNC_BACKLOG = 1024
+    MAX_WRITE_BUFFER = 1024 * 1024
+    WRITE_DRAIN_TIMEOUT = 2
+    MAX_LINE_LENGTH = 1024
+    SIMULATION_BATCH_SIZE = 256
+    MAX_PLAYERS = 65535
+    TICK_RATE = 20
+    VIEWPORT_HEIGHT = 11
+    VIEWPORT_WIDTH = 21
+    INTEREST_BUCKET_SIZE = 16
+    SNAPSHOT_INTERVAL = 60
+    JOURNAL_CHECKPOINT_INTERVAL = 10
+    PROFILE_DIRECTORY = "profiles"
+    PROFILE_SAMPLE_INTERVAL = 0.005
+    MAX_PROFILE_SECONDS = 300
+    PROFILE_SUMMARY_LINES = 20
+    TRACE_BUFFER_SIZE = 65536
+    LOG_BATCH_SIZE = 256
+    LOG_MAX_BYTES = 10 * 1024 * 1024
+    LOG_BACKUPS = 5
+    LOG_FLUSH_TIMEOUT = 2
 
     YOU_DIED: str = "You died"
     GOODBYE: str = "Goodbye\n"
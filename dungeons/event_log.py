@@ -0,0 +1,162 @@
+import atexit
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+from constants import Constants
+
+
+class EventLog:
+
+    _queue: queue.SimpleQueue
+    _thread: threading.Thread | None
+    _start_lock: threading.Lock
+    _rng: random.Random
+    _file_name: str | None
+    _file: object
+    _stream: object
+    _json_lines: bool
+    _max_bytes: int
+    _backups: int
+    _batch_size: int
+    _context: dict
+    sample_rate: float
+    enabled: bool
+
+    def __init__(self) -> None:
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._rng = random.Random()
+        self._file = None
+        self._context = {}
+        self.enabled = True
+        self.configure()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def configure(self, file_name: str | None = None, json_lines: bool = False,
+                  sample_rate: float = 1.0, max_bytes: int = Constants.LOG_MAX_BYTES,
+                  backups: int = Constants.LOG_BACKUPS,
+                  batch_size: int = Constants.LOG_BATCH_SIZE, stream=None) -> None:
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._file_name = file_name
+        self._stream = stream
+        self._json_lines = json_lines
+        self.sample_rate = sample_rate
+        self._max_bytes = max_bytes
+        self._backups = backups
+        self._batch_size = batch_size
+
+    def bind(self, **fields) -> None:
+        self._context = fields
+
+    def command(self, player: str, command: str, argument: str, outcome: str,
+                latency: float) -> None:
+        if not self.enabled or (self.sample_rate < 1 and self._rng.random() >= self.sample_rate):
+            return
+        self._put(("command", time.time(), {"player": player, "command": command,
+                                            "argument": argument, "outcome": outcome,
+                                            "latency_ms": latency * 1000}))
+
+    def event(self, event: str, **fields) -> None:
+        if self.enabled:
+            self._put((event, time.time(), fields))
+
+    def _put(self, record: tuple) -> None:
+        if self._thread is None:
+            self._start()
+        if self._context:
+            event, timestamp, fields = record
+            record = (event, timestamp, {**self._context, **fields})
+        self._queue.put(record)
+
+    def _after_fork(self) -> None:
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch: list = [self._queue.get()]
+            while len(batch) < self._batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            records: list = [record for record in batch if not isinstance(record, threading.Event)]
+            if records:
+                try:
+                    self._write(list(map(self._format, records)))
+                except OSError as error:
+                    sys.stderr.write(f"Event log write failed: {error}\n")
+            for record in batch:
+                if isinstance(record, threading.Event):
+                    record.set()
+
+    def _format(self, record: tuple) -> str:
+        event, timestamp, fields = record
+        if self._json_lines:
+            return json.dumps({"ts": timestamp, "event": event, **fields}) + "\n"
+        stamp: str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp))
+        details: str = " ".join(f"{name}={self._text_value(value)}"
+                                for name, value in fields.items())
+        return f"{stamp}.{int(timestamp % 1 * 1000):03d} {event} {details}".rstrip() + "\n"
+
+    @staticmethod
+    def _text_value(value) -> str:
+        if isinstance(value, float):
+            return f"{value:.3f}"
+        text: str = str(value)
+        if not text or " " in text or "\n" in text or "=" in text:
+            return json.dumps(text)
+        return text
+
+    def _write(self, lines: list) -> None:
+        if self._file_name is None:
+            stream = self._stream or sys.stdout
+            stream.write("".join(lines))
+            stream.flush()
+            return
+        if self._file is None:
+            self._file = open(self._file_name, "ab")
+        for line in lines:
+            data: bytes = line.encode()
+            if self._file.tell() and self._file.tell() + len(data) > self._max_bytes:
+                self._rotate()
+            self._file.write(data)
+        self._file.flush()
+
+    def _rotate(self) -> None:
+        self._file.close()
+        for index in range(self._backups - 1, 0, -1):
+            if os.path.exists(f"{self._file_name}.{index}"):
+                os.replace(f"{self._file_name}.{index}", f"{self._file_name}.{index + 1}")
+        if self._backups > 0:
+            os.replace(self._file_name, f"{self._file_name}.1")
+        else:
+            os.remove(self._file_name)
+        self._file = open(self._file_name, "ab")
+
+    def flush(self, timeout: float | None = None) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            return
+        written: threading.Event = threading.Event()
+        self._queue.put(written)
+        written.wait(timeout)
+
+
+EVENT_LOG: EventLog = EventLog()
+atexit.register(EVENT_LOG.flush, Constants.LOG_FLUSH_TIMEOUT)
@@ -1,93 +1,74 @@
-from map import Map, MapSymbols, Coordinates, Direction, InvalidMapCoordinatesException
+from map import (Map, MapSymbols, Coordinates, Direction, Tile, DIRECTION_OFFSETS,
+                 InvalidMapCoordinatesException, WorldFullException)
 from actor import Hero, Minion, Messages, Treasure
+from constants import Constants
+from combat import CombatEngine
+from metrics import METRICS
 
 
 class GameTactics:
 
+    FIGHTS = METRICS.counter("fights", "Fights simulated")
+    FIGHT_ROUNDS = METRICS.counter("fight_rounds", "Combat rounds simulated")
+
     _map: Map
+    _restored_heroes: dict
 
-    def __init__(self) -> None:
-        self._map = Map()
+    def __init__(self, map_file_name: str = Constants.MAP_FILE_NAME,
+                 game_map: Map | None = None, seed: int | None = None) -> None:
+        self._map = Map(map_file_name, seed) if game_map is None else game_map
+        self._restored_heroes = {}
 
     def move_hero(self, hero: Hero, direction: Direction) -> str:
         hero_current_coordinates: Coordinates = hero.coordinates
-        coordinates_after_movement: Coordinates = (Direction.coordinates_after_movement(
-            hero_current_coordinates, direction))
-        try:
-            symbol_after_movement: str = self._map.get_symbol(
-                coordinates_after_movement)
-        except InvalidMapCoordinatesException:
-            return Messages.INVALID_MOVE
-
-        is_map_symbol: bool = MapSymbols.is_valid_map_symbol(
-            symbol_after_movement)
-        if is_map_symbol:
-            match MapSymbols(symbol_after_movement):
-                case MapSymbols.FREE_SPOT:
-                    return self._move_hero_to_free_potition(hero, hero_current_coordinates, coordinates_after_movement)
-
-                case MapSymbols.OBSTACLE:
-                    return Messages.INVALID_MOVE
-
-                case MapSymbols.TREASURE:
-                    treasure: Treasure = self._map.get_object(
-                        coordinates_after_movement)
-                    return self._collect_treasure(hero, treasure)
-
-                case MapSymbols.MINION:
-                    minion: Minion = self._map.get_object(
-                        coordinates_after_movement)
-                    return self._fight_with_minion(hero, minion)
-        else:
-            self._change_previous_coordinates(hero, hero_current_coordinates)
-            self._map.change_symbol(coordinates_after_movement, hero.actor_symbol
-                                    + symbol_after_movement)
-            hero.coordinates = coordinates_after_movement
-            return Messages.SUCCESSFUL_MOVE
+        dx, dy = DIRECTION_OFFSETS[direction]
+        x: int = hero_current_coordinates.x + dx
+        y: int = hero_current_coordinates.y + dy
+
+        match self._map.get_tile_id(x, y):
+            case Tile.FREE_SPOT:
+                return self._move_hero_to_free_potition(hero, hero_current_coordinates,
+                                                        self._map.intern(x, y))
+
+            case Tile.TREASURE:
+                treasure: Treasure = self._map.get_object(self._map.intern(x, y))
+                return self._collect_treasure(hero, treasure)
+
+            case Tile.MINION:
+                minion: Minion = self._map.get_object(self._map.intern(x, y))
+                return self._fight_with_minion(hero, minion)
         return Messages.INVALID_MOVE
 
     def _move_hero_to_free_potition(self, hero: Hero,
                                     hero_current_coordinates: Coordinates,
                                     coordinates_after_movement: Coordinates) -> str:
         self._change_previous_coordinates(hero, hero_current_coordinates)
-        self._map.change_symbol(coordinates_after_movement, hero.actor_symbol)
+        self._map.add_actor(coordinates_after_movement, hero.actor_symbol)
         hero.coordinates = coordinates_after_movement
         return Messages.SUCCESSFUL_MOVE
 
     def _change_previous_coordinates(self, hero: Hero, hero_current_coordinates: Coordinates) -> None:
-        currentSymbol = self._map.get_symbol(hero_current_coordinates)
-        if currentSymbol == hero.actor_symbol:
-            self._map.change_symbol(
-                hero_current_coordinates, MapSymbols.FREE_SPOT.value)
-        else:
-            self._map.change_symbol(
-                hero_current_coordinates, currentSymbol.replace(hero.actor_symbol, ""))
+        self._map.remove_actor(hero_current_coordinates, hero.actor_symbol)
 
     def _collect_treasure(self, hero: Hero, treasure: Treasure) -> str:
         self._change_previous_coordinates(hero, hero.coordinates)
         message: str = hero.add_to_backpack(treasure)
-        if message == Messages.BACKPACK_FULL:
-            self._map.change_symbol(
-                treasure.coordinates, hero.actor_symbol + MapSymbols.TREASURE.value)
-        else:
-            self._map.change_symbol(treasure.coordinates, hero.actor_symbol)
+        if message != Messages.BACKPACK_FULL:
+            self._map.set_item(treasure.coordinates, None)
             self._map.remove_object(treasure.coordinates)
+        self._map.add_actor(treasure.coordinates, hero.actor_symbol)
         hero.coordinates = treasure.coordinates
         return message
 
     def _fight_with_minion(self, hero: Hero, minion: Minion) -> str:
         self._change_previous_coordinates(hero, hero.coordinates)
-        hero_won: bool = False
-        while True:
-            minion.take_damage(hero.attack())
-            if not minion.is_alive():
-                hero_won = True
-                break
-            hero.take_damage(minion.attack())
-            if not hero.is_alive():
-                break
+        hero_won, rounds = CombatEngine.fight(hero, minion)
+        GameTactics.FIGHTS.increment()
+        GameTactics.FIGHT_ROUNDS.increment(rounds)
         if hero_won:
-            self._map.change_symbol(minion.coordinates, hero.actor_symbol)
+            self._map.set_item(minion.coordinates, None)
+            self._map.remove_object(minion.coordinates)
+            self._map.add_actor(minion.coordinates, hero.actor_symbol)
             hero.coordinates = minion.coordinates
             xp: int = minion.give_xp()
             hero.increase_xp(xp)
@@ -119,8 +100,7 @@ class GameTactics:
             item: Treasure = hero.get_from_backpack(index)
             item.coordinates = hero.coordinates
             self._map.add_object_to_map(item.coordinates, item)
-            self._map.change_symbol(item.coordinates,
-                                    hero.actor_symbol + MapSymbols.TREASURE.value)
+            self._map.set_item(item.coordinates, MapSymbols.TREASURE.value)
             return hero.remove_from_backpack(index)
         except IndexError:
             return Messages.ITEM_NOT_FOUND_IN_BACKPACK
@@ -128,15 +108,9 @@ class GameTactics:
     def heroes_fight(self, hero1: Hero, hero2: Hero) -> str:
         if hero1.coordinates != hero2.coordinates:
             return Messages.NOT_ON_SAME_SPOT
-        hero1Won: bool = False
-        while True:
-            hero2.take_damage(hero1.attack())
-            if not hero2.is_alive():
-                hero1Won = True
-                break
-            hero1.take_damage(hero2.attack())
-            if not hero1.is_alive():
-                break
+        hero1Won, rounds = CombatEngine.fight(hero1, hero2)
+        GameTactics.FIGHTS.increment()
+        GameTactics.FIGHT_ROUNDS.increment(rounds)
         if hero1Won:
             self._remove_hero_from_map(hero2)
             return Messages.PLAYER_KILLED_OTHER_PLAYER.format(killed=str(hero2))
@@ -145,29 +119,72 @@ class GameTactics:
             return Messages.PLAYER_KILLED.format(str(hero2))
 
     def _remove_hero_from_map(self, hero: Hero) -> None:
-        coordinates: Coordinates = hero.coordinates
-        symbol: str = self._map.get_symbol(coordinates)
-        if len(symbol) == 2:
-            self._map.change_symbol(
-                coordinates, symbol.replace(hero.actor_symbol, ""))
-        else:
-            self._map.change_symbol(coordinates, MapSymbols.FREE_SPOT.value)
+        self._map.remove_actor(hero.coordinates, hero.actor_symbol)
 
     def display_map(self) -> str:
         return str(self._map)
 
+    def display_map_bytes(self) -> bytes:
+        return self._map.to_bytes()
+
+    def get_map_size(self) -> tuple:
+        return self._map.get_height(), self._map.get_width()
+
+    def get_map_tile_bytes(self) -> bytes:
+        return self._map.get_tile_bytes()
+
+    def get_map_occupied_cells(self) -> list:
+        return self._map.get_occupied_cells()
+
+    def display_map_region(self, top: int, left: int, height: int, width: int) -> str:
+        return self._map.render_region(top, left, height, width)
+
+    def get_map_region_tile_bytes(self, top: int, left: int, height: int, width: int) -> bytes:
+        return self._map.get_region_tile_bytes(top, left, height, width)
+
+    def get_map_region_occupied_cells(self, top: int, left: int, height: int, width: int) -> list:
+        return self._map.get_region_occupied_cells(top, left, height, width)
+
+    def get_map_symbols(self, cells: list) -> list:
+        return [(coordinates, self._map.get_symbol(coordinates))
+                for coordinates in (self._map.intern(x, y) for x, y in cells)]
+
+    def get_map_cells(self, changes: list) -> list:
+        return [(coordinates, self._map.get_tile(coordinates), self._map.get_actors(coordinates))
+                for coordinates, _ in changes]
+
+    def get_map_version(self) -> int:
+        return self._map.get_version()
+
+    def get_map_changes_since(self, version: int) -> list | None:
+        return self._map.get_changes_since(version)
+
     def get_other_player_symbol(self, hero: Hero) -> str:
-        symbols: str = self._map.get_symbol(hero.coordinates)
-        if len(symbols) != 2:
-            return Messages.NOT_ON_SAME_SPOT
-        other_player_symbol = symbols.replace(hero.actor_symbol, "")
-        return other_player_symbol if self._is_valid_player_symbol((int)(other_player_symbol)) else Messages.NOT_ON_SAME_SPOT
+        for actor_symbol in self._map.get_actors(hero.coordinates):
+            if actor_symbol != hero.actor_symbol:
+                return actor_symbol
+        return Messages.NOT_ON_SAME_SPOT
+
+    def get_map_objects(self) -> list:
+        return self._map.get_objects()
+
+    def get_map_catalog(self):
+        return self._map.get_catalog()
+
+    def get_map_catalog_treasures(self) -> tuple:
+        return self._map.get_catalog_treasures()
+
+    def add_restored_hero(self, hero: Hero) -> None:
+        self._restored_heroes[hero.actor_symbol] = hero
+
+    def get_restored_heroes(self) -> list:
+        return list(self._restored_heroes.values())
 
-    def _is_valid_player_symbol(self, other_player_symbol: int) -> bool:
-        return (int)(other_player_symbol) in range(1, 10)
+    def claim_restored_hero(self, actor_symbol: str) -> Hero | None:
+        return self._restored_heroes.pop(actor_symbol, None)
 
     def spawn_hero(self, hero: Hero) -> None:
-        self._map.change_symbol(hero.coordinates, hero.actor_symbol)
+        self._map.add_actor(hero.coordinates, hero.actor_symbol)
 
     def get_random_free_coordinates(self) -> Coordinates:
         return self._map.get_free_coordinates()
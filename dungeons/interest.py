@@ -0,0 +1,122 @@
+from constants import Constants
+from map import Coordinates
+
+
+class Viewport:
+
+    top: int
+    left: int
+    height: int
+    width: int
+
+    def __init__(self, top: int, left: int, height: int, width: int) -> None:
+        self.top = top
+        self.left = left
+        self.height = height
+        self.width = width
+
+    @staticmethod
+    def centered(center: Coordinates, height: int, width: int,
+                 map_height: int, map_width: int):
+        height, width = min(height, map_height), min(width, map_width)
+        top: int = min(max(center.x - height // 2, 0), map_height - height)
+        left: int = min(max(center.y - width // 2, 0), map_width - width)
+        return Viewport(top, left, height, width)
+
+    @staticmethod
+    def parse_size(argument: str) -> tuple:
+        if not argument:
+            return Constants.VIEWPORT_HEIGHT, Constants.VIEWPORT_WIDTH
+        height, width = (int(value) for value in argument.lower().split("x"))
+        if height <= 0 or width <= 0:
+            raise ValueError("Viewport size must be positive")
+        return height, width
+
+    def contains(self, coordinates: Coordinates) -> bool:
+        return (self.top <= coordinates.x < self.top + self.height and
+                self.left <= coordinates.y < self.left + self.width)
+
+    def can_scroll_from(self, previous) -> bool:
+        return (previous is not None and
+                (self.height, self.width) == (previous.height, previous.width) and
+                abs(self.top - previous.top) < self.height and
+                abs(self.left - previous.left) < self.width)
+
+    def exposed_cells(self, previous) -> list:
+        columns: range = range(self.left, self.left + self.width)
+        side_columns: list = [col for col in columns
+                              if not previous.left <= col < previous.left + previous.width]
+        cells: list = []
+        for row in range(self.top, self.top + self.height):
+            inside: bool = previous.top <= row < previous.top + previous.height
+            cells.extend((row, col) for col in (side_columns if inside else columns))
+        return cells
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Viewport):
+            return (self.top, self.left, self.height, self.width) == \
+                (other.top, other.left, other.height, other.width)
+        return False
+
+    def __ne__(self, other) -> bool:
+        return not self.__eq__(other)
+
+
+class InterestGrid:
+
+    version: int
+    _bucket_size: int
+    _buckets: dict
+    _viewports: dict
+
+    def __init__(self, bucket_size: int = Constants.INTEREST_BUCKET_SIZE) -> None:
+        self.version = 0
+        self._bucket_size = bucket_size
+        self._buckets = {}
+        self._viewports = {}
+
+    def __len__(self) -> int:
+        return len(self._viewports)
+
+    def _bucket_keys(self, viewport: Viewport) -> list:
+        size: int = self._bucket_size
+        return [(row, col)
+                for row in range(viewport.top // size,
+                                 (viewport.top + viewport.height - 1) // size + 1)
+                for col in range(viewport.left // size,
+                                 (viewport.left + viewport.width - 1) // size + 1)]
+
+    def subscribe(self, subscriber, viewport: Viewport) -> None:
+        self.unsubscribe(subscriber)
+        self._viewports[subscriber] = viewport
+        for key in self._bucket_keys(viewport):
+            self._buckets.setdefault(key, set()).add(subscriber)
+
+    def unsubscribe(self, subscriber) -> None:
+        viewport: Viewport | None = self._viewports.pop(subscriber, None)
+        if viewport is None:
+            return
+        for key in self._bucket_keys(viewport):
+            bucket: set = self._buckets[key]
+            bucket.discard(subscriber)
+            if not bucket:
+                del self._buckets[key]
+
+    def get_viewport(self, subscriber) -> Viewport | None:
+        return self._viewports.get(subscriber)
+
+    def get_subscribers(self) -> list:
+        return list(self._viewports)
+
+    def subscribers_at(self, coordinates: Coordinates) -> list:
+        bucket: set = self._buckets.get(
+            (coordinates.x // self._bucket_size, coordinates.y // self._bucket_size), ())
+        return [subscriber for subscriber in bucket
+                if self._viewports[subscriber].contains(coordinates)]
+
+    def route(self, changes: list) -> dict:
+        routed: dict = {}
+        for coordinates, symbol in changes:
+            for subscriber in self.subscribers_at(coordinates):
+                routed.setdefault(subscriber, []).append((coordinates, symbol))
+        return routed
@@ -0,0 +1,102 @@
+import struct
+import threading
+import time
+
+from client_hanler import Command, CommandType
+
+
+class InvalidJournalException(Exception):
+    pass
+
+
+class JournalEntry:
+
+    timestamp: float
+    session_id: int
+    kind: int
+    argument: str
+
+    def __init__(self, timestamp: float, session_id: int, kind: int, argument: str) -> None:
+        self.timestamp = timestamp
+        self.session_id = session_id
+        self.kind = kind
+        self.argument = argument
+
+    def to_command(self) -> Command:
+        command_type: CommandType = CommandJournal.COMMAND_TYPES[self.kind]
+        return Command(f"{command_type.value} {self.argument}".strip())
+
+
+class CommandJournal:
+
+    MAGIC: bytes = b"DGJN"
+    FORMAT_VERSION: int = 1
+    HEADER: struct.Struct = struct.Struct("!4sHQH")
+    ENTRY: struct.Struct = struct.Struct("!dIBH")
+
+    SPAWN: int = 254
+    CHECKPOINT: int = 255
+    COMMAND_TYPES: list = list(CommandType)
+    COMMAND_CODES: dict = {command_type: code for code, command_type in enumerate(COMMAND_TYPES)}
+
+    _file: object
+    _lock: threading.Lock
+
+    def __init__(self, file_name: str, seed: int, map_file_name: str) -> None:
+        self._lock = threading.Lock()
+        self._file = open(file_name, "wb")
+        encoded_name: bytes = map_file_name.encode()
+        self._file.write(CommandJournal.HEADER.pack(
+            CommandJournal.MAGIC, CommandJournal.FORMAT_VERSION, seed,
+            len(encoded_name)) + encoded_name)
+
+    def _append(self, session_id: int, kind: int, argument: str) -> None:
+        encoded_argument: bytes = argument.encode()
+        with self._lock:
+            self._file.write(CommandJournal.ENTRY.pack(
+                time.time(), session_id, kind, len(encoded_argument)) + encoded_argument)
+
+    def record_spawn(self, session_id: int) -> None:
+        self._append(session_id, CommandJournal.SPAWN, "")
+
+    def record_command(self, session_id: int, command: Command) -> None:
+        self._append(session_id, CommandJournal.COMMAND_CODES[command.commandType],
+                     command.argument)
+
+    def record_checkpoint(self, state_hash: str) -> None:
+        self._append(0, CommandJournal.CHECKPOINT, state_hash)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+    @staticmethod
+    def read(file_name: str) -> tuple:
+        with open(file_name, "rb") as f:
+            data: bytes = f.read()
+        if len(data) < CommandJournal.HEADER.size:
+            raise InvalidJournalException(f"{file_name} is not a journal")
+        magic, format_version, seed, name_length = CommandJournal.HEADER.unpack_from(data)
+        if magic != CommandJournal.MAGIC:
+            raise InvalidJournalException(f"{file_name} is not a journal")
+        if format_version != CommandJournal.FORMAT_VERSION:
+            raise InvalidJournalException(
+                f"Unsupported journal format version {format_version}")
+        offset: int = CommandJournal.HEADER.size
+        map_file_name: str = data[offset:offset + name_length].decode()
+        offset += name_length
+        entries: list = []
+        while offset + CommandJournal.ENTRY.size <= len(data):
+            timestamp, session_id, kind, argument_length = CommandJournal.ENTRY.unpack_from(
+                data, offset)
+            offset += CommandJournal.ENTRY.size
+            if offset + argument_length > len(data):
+                break
+            entries.append(JournalEntry(timestamp, session_id, kind,
+                                        data[offset:offset + argument_length].decode()))
+            offset += argument_length
+        return seed, map_file_name, entries
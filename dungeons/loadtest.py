@@ -0,0 +1,232 @@
+import argparse
+import asyncio
+import random
+import time
+
+from collections import Counter, deque
+from constants import Constants
+from protocol import BinaryFrame, BinaryFramer, FrameType, MessageCode
+
+
+class LatencyRecorder:
+
+    samples: dict
+    errors: Counter
+    replies: int
+    map_bytes: int
+
+    def __init__(self) -> None:
+        self.samples = {}
+        self.errors = Counter()
+        self.replies = 0
+        self.map_bytes = 0
+
+    def record(self, command: str, latency: float) -> None:
+        self.samples.setdefault(command, []).append(latency)
+        self.replies += 1
+
+    def all_samples(self) -> list:
+        return [latency for samples in self.samples.values() for latency in samples]
+
+    @staticmethod
+    def percentile(samples: list, percent: float) -> float:
+        if not samples:
+            return 0.0
+        ordered: list = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+    def summary(self, samples: list) -> dict:
+        return {"count": len(samples),
+                "p50_ms": self.percentile(samples, 50) * 1000,
+                "p95_ms": self.percentile(samples, 95) * 1000,
+                "p99_ms": self.percentile(samples, 99) * 1000}
+
+
+class Bot:
+
+    UNSOLICITED: set = {MessageCode.ITEM_SWAPPED}
+
+    _host: str
+    _port: int
+    _mix: list
+    _rate: float
+    _recorder: LatencyRecorder
+    _rng: random.Random
+    _pending: deque
+
+    def __init__(self, host: str, port: int, mix: list, rate: float,
+                 recorder: LatencyRecorder, seed: int) -> None:
+        self._host = host
+        self._port = port
+        self._mix = mix
+        self._rate = rate
+        self._recorder = recorder
+        self._rng = random.Random(seed)
+        self._pending = deque()
+
+    async def run(self, deadline: float) -> None:
+        while time.perf_counter() < deadline:
+            try:
+                if not await self._play(deadline):
+                    return
+            except (ConnectionError, OSError):
+                self._recorder.errors["connection"] += 1
+                await asyncio.sleep(0.1)
+            self._recorder.errors["dropped"] += len(self._pending)
+            self._pending.clear()
+
+    async def _play(self, deadline: float) -> bool:
+        reader, writer = await asyncio.open_connection(self._host, self._port)
+        try:
+            writer.write(b"binary\n")
+            buffer: bytes = b""
+            while BinaryFrame.SWITCH_LINE.encode() not in buffer:
+                data: bytes = await reader.read(Constants.BUFFER_SIZE)
+                if not data:
+                    self._recorder.errors["rejected"] += 1
+                    return False
+                buffer += data
+            framer: BinaryFramer = BinaryFramer()
+            framer.feed(buffer.split(BinaryFrame.SWITCH_LINE.encode(), 1)[1])
+            sender: asyncio.Task = asyncio.create_task(self._send(writer, deadline))
+            try:
+                await self._receive(reader, framer)
+            finally:
+                sender.cancel()
+            return True
+        finally:
+            writer.close()
+
+    async def _send(self, writer: asyncio.StreamWriter, deadline: float) -> None:
+        interval: float = 1 / self._rate
+        next_send: float = time.perf_counter() + self._rng.random() * interval
+        while next_send < deadline:
+            await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+            command: str = self._rng.choices(
+                [command for command, _ in self._mix],
+                [weight for _, weight in self._mix])[0]
+            self._pending.append((command, time.perf_counter()))
+            writer.write((command + "\n").encode())
+            next_send += interval
+        writer.write(b"quit\n")
+
+    async def _receive(self, reader: asyncio.StreamReader, framer: BinaryFramer) -> None:
+        while True:
+            data: bytes = await reader.read(65536)
+            if not data:
+                return
+            for frame_type, payload in framer.feed(data):
+                if frame_type != FrameType.MESSAGE:
+                    self._recorder.map_bytes += len(payload)
+                    continue
+                code: MessageCode = MessageCode(payload[0])
+                if code in Bot.UNSOLICITED or not self._pending:
+                    continue
+                if (code == MessageCode.PLAYER_KILLED_OTHER_PLAYER and
+                        not self._pending[0][0].startswith("fight")):
+                    continue
+                command, sent = self._pending.popleft()
+                self._recorder.record(command.split()[0], time.perf_counter() - sent)
+                if code == MessageCode.PLAYER_KILLED:
+                    self._recorder.errors["died"] += 1
+                    return
+
+
+class BotSwarm:
+
+    _host: str
+    _port: int
+    _mix: list
+    _rate: float
+    _duration: float
+
+    def __init__(self, host: str, port: int, mix: list, rate: float, duration: float) -> None:
+        self._host = host
+        self._port = port
+        self._mix = mix
+        self._rate = rate
+        self._duration = duration
+
+    async def run_stage(self, bots: int) -> dict:
+        recorder: LatencyRecorder = LatencyRecorder()
+        started: float = time.perf_counter()
+        deadline: float = started + self._duration
+        await asyncio.gather(*(
+            Bot(self._host, self._port, self._mix, self._rate, recorder, seed).run(deadline)
+            for seed in range(bots)))
+        elapsed: float = time.perf_counter() - started
+        report: dict = recorder.summary(recorder.all_samples())
+        report.update({"bots": bots,
+                       "offered_per_s": bots * self._rate,
+                       "throughput_per_s": recorder.replies / elapsed,
+                       "map_bytes": recorder.map_bytes,
+                       "errors": dict(recorder.errors),
+                       "commands": {command: recorder.summary(samples)
+                                    for command, samples in sorted(recorder.samples.items())}})
+        return report
+
+    async def run(self, ramp: list) -> list:
+        reports: list = []
+        for bots in ramp:
+            reports.append(await self.run_stage(bots))
+        return reports
+
+    @staticmethod
+    def find_collapse(reports: list, collapse_factor: float) -> dict | None:
+        if not reports:
+            return None
+        baseline_p99: float = max(reports[0]["p99_ms"], 1.0)
+        for report in reports:
+            saturated: bool = report["throughput_per_s"] < 0.9 * report["offered_per_s"]
+            if report["p99_ms"] > collapse_factor * baseline_p99 or saturated:
+                return report
+        return None
+
+
+def parse_mix(argument: str) -> list:
+    mix: list = []
+    for item in argument.split(","):
+        command, _, weight = item.partition("=")
+        mix.append((command.replace("_", " "), float(weight or 1)))
+    return mix
+
+
+def print_report(reports: list, collapse: dict | None) -> None:
+    print(f"{'bots':>6} {'offered/s':>10} {'replies/s':>10} {'p50 ms':>8} "
+          f"{'p95 ms':>8} {'p99 ms':>8}  errors")
+    for report in reports:
+        print(f"{report['bots']:>6} {report['offered_per_s']:>10.0f} "
+              f"{report['throughput_per_s']:>10.0f} {report['p50_ms']:>8.2f} "
+              f"{report['p95_ms']:>8.2f} {report['p99_ms']:>8.2f}  {report['errors']}")
+    if reports:
+        print("Per command at the last stage:")
+        for command, summary in reports[-1]["commands"].items():
+            print(f"  {command:>10}: n={summary['count']} p50={summary['p50_ms']:.2f}ms "
+                  f"p95={summary['p95_ms']:.2f}ms p99={summary['p99_ms']:.2f}ms")
+    if collapse is None:
+        print("Latency did not collapse in the tested range")
+    else:
+        print(f"Latency collapses at {collapse['bots']} bots "
+              f"({collapse['offered_per_s']:.0f} commands/s offered)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Dungeons bot swarm load generator")
+    parser.add_argument("--host", default=Constants.HOST)
+    parser.add_argument("--port", type=int, default=Constants.PORT)
+    parser.add_argument("--bots", default="1,8,32,128,512",
+                        help="comma separated bot counts, one stage per count; "
+                             "the server has no fixed player cap, so ramp until latency collapses")
+    parser.add_argument("--rate", type=float, default=10,
+                        help="commands per second sent by each bot")
+    parser.add_argument("--duration", type=float, default=10,
+                        help="seconds per stage")
+    parser.add_argument("--mix", default="up=4,down=4,left=4,right=4,backpack=1,stats=1,use_0=1,fight=1",
+                        help="command=weight list; use _ for spaces, e.g. use_0=1")
+    parser.add_argument("--collapse-factor", type=float, default=10,
+                        help="p99 growth over the first stage that counts as collapse")
+    args = parser.parse_args()
+    swarm: BotSwarm = BotSwarm(args.host, args.port, parse_mix(args.mix),
+                               args.rate, args.duration)
+    reports: list = asyncio.run(swarm.run([int(bots) for bots in args.bots.split(",")]))
+    print_report(reports, BotSwarm.find_collapse(reports, args.collapse_factor))
@@ -1,13 +1,19 @@
 import random
 
+import numpy as np
+
+from array import array
+from collections import deque
 from enum import Enum
 from constants import Constants
 from actor import Minion
-from treasure import TreasureInitializer, Treasure
+from treasure import TreasureCatalog, Treasure
 
 
 class Coordinates:
 
+    __slots__ = ("x", "y")
+
     x: int
     y: int
 
@@ -47,6 +53,22 @@ class MapSymbols(Enum):
         return symbol in MapSymbols._value2member_map_
 
 
+class Tile:
+
+    FREE_SPOT: int = 0
+    OBSTACLE: int = 1
+    TREASURE: int = 2
+    MINION: int = 3
+    SYMBOLS: tuple = (MapSymbols.FREE_SPOT.value, MapSymbols.OBSTACLE.value,
+                      MapSymbols.TREASURE.value, MapSymbols.MINION.value)
+    IDS: dict = {symbol: tile_id for tile_id, symbol in enumerate(SYMBOLS)}
+    UNKNOWN: int = 255
+
+    SYMBOL_BYTES: np.ndarray = np.frombuffer("".join(SYMBOLS).encode(), dtype=np.uint8)
+    FROM_BYTE: np.ndarray = np.full(256, UNKNOWN, dtype=np.uint8)
+    FROM_BYTE[SYMBOL_BYTES] = np.arange(len(SYMBOLS), dtype=np.uint8)
+
+
 class Direction(Enum):
     UP = 1
     DOWN = 2
@@ -66,6 +88,10 @@ class Direction(Enum):
                 return Coordinates(coordinates.x, coordinates.y + 1)
 
 
+DIRECTION_OFFSETS: dict = {Direction.UP: (-1, 0), Direction.DOWN: (1, 0),
+                           Direction.LEFT: (0, -1), Direction.RIGHT: (0, 1)}
+
+
 class NotEnoughTreasuresException(Exception):
     pass
 
@@ -74,109 +100,381 @@ class InvalidMapCoordinatesException(Exception):
     pass
 
 
+class InvalidMapFileException(Exception):
+    pass
+
+
+class WorldFullException(Exception):
+    pass
+
+
 class Map:
 
-    _map: list
-    _objects: dict
+    WIDE_PLAYER_SYMBOL: str = "@"
 
-    def __init__(self) -> None:
-        self._map = []
-        self._objects = {}
-        self._initialize_map()
+    _height: int
+    _width: int
+    _terrain: np.ndarray
+    _items: np.ndarray
+    _cell_tiles: bytearray
+    _interned: dict
+    _actors: dict
+    _occupied_cols: list
+    _objects: dict
+    _catalog: TreasureCatalog
+    _treasure_ids: np.ndarray
+    _free_cells: array
+    _free_positions: array
+    _free_count: int
+    _version: int
+    _changes: deque
+    _rendered_rows: list
+    _dirty_rows: set
+    _rendered: str | None
+    _rendered_bytes: bytes | None
+    _rng: random.Random
+
+    def __init__(self, map_file_name: str = Constants.MAP_FILE_NAME,
+                 seed: int | None = None) -> None:
+        self._rng = random.Random(seed)
+        self._initialize_map(map_file_name)
+        self._initialize_state()
         self._save_objects()
+        self._initialize_free_cells()
 
-    def _initialize_map(self) -> None:
-        with open(Constants.MAP_FILE_NAME) as f:
-            for line in f:
-                row: list = []
-                for char in line.strip():
-                    row.append(char)
-                self._map.append(row)
+    @staticmethod
+    def from_tiles(tiles: np.ndarray, objects: list, version: int,
+                   catalog: TreasureCatalog, treasure_cells: np.ndarray,
+                   treasure_indices: np.ndarray):
+        game_map: Map = Map.__new__(Map)
+        game_map._rng = random.Random()
+        game_map._load_tiles(tiles)
+        game_map._initialize_state()
+        for game_object in objects:
+            game_map._objects[game_map._key(game_object.coordinates)] = game_object
+        game_map._catalog = catalog
+        game_map._treasure_ids[treasure_cells[:, 0], treasure_cells[:, 1]] = treasure_indices
+        game_map._version = version
+        game_map._initialize_free_cells()
+        return game_map
+
+    def _initialize_state(self) -> None:
+        self._interned = {}
+        self._actors = {}
+        self._objects = {}
+        self._treasure_ids = np.full((self._height, self._width), -1, dtype=np.int32)
+        self._version = 0
+        self._changes = deque(maxlen=Constants.MAP_CHANGE_LOG_SIZE)
+        self._occupied_cols = [set() for _ in range(self._height)]
+        self._rendered_rows = [""] * self._height
+        self._dirty_rows = set(range(self._height))
+        self._rendered = None
+        self._rendered_bytes = None
+
+    def _initialize_map(self, map_file_name: str) -> None:
+        with open(map_file_name, "rb") as f:
+            lines: list = [line for line in f.read().split() if line]
+        self._height = len(lines)
+        self._width = len(lines[0]) if lines else 0
+        if any(len(line) != self._width for line in lines):
+            raise InvalidMapFileException(
+                f"Rows in {map_file_name} are not of equal width")
+        raw: np.ndarray = np.frombuffer(b"".join(lines), dtype=np.uint8)
+        tiles: np.ndarray = Tile.FROM_BYTE[raw].reshape(self._height, self._width)
+        if np.any(tiles == Tile.UNKNOWN):
+            raise InvalidMapFileException(
+                f"Unknown map symbol in {map_file_name}")
+        self._load_tiles(tiles)
+
+    def _load_tiles(self, tiles: np.ndarray) -> None:
+        self._height, self._width = tiles.shape
+        self._terrain = np.where(tiles == Tile.OBSTACLE,
+                                 Tile.OBSTACLE, Tile.FREE_SPOT).astype(np.uint8)
+        self._items = np.where(tiles >= Tile.TREASURE,
+                               tiles, Tile.FREE_SPOT).astype(np.uint8)
+        self._cell_tiles = bytearray((self._terrain | self._items).tobytes())
+
+    def _key(self, coordinates: Coordinates) -> int:
+        return coordinates.x * self._width + coordinates.y
+
+    def intern(self, x: int, y: int) -> Coordinates:
+        key: int = x * self._width + y
+        coordinates: Coordinates | None = self._interned.get(key)
+        if coordinates is None:
+            if not (0 <= x < self._height and 0 <= y < self._width):
+                raise InvalidMapCoordinatesException(
+                    "Coordinates out of map bounds")
+            coordinates = self._interned[key] = Coordinates(x, y)
+        return coordinates
+
+    def get_tile_id(self, x: int, y: int) -> int:
+        if 0 <= x < self._height and 0 <= y < self._width:
+            return self._cell_tiles[x * self._width + y]
+        return Tile.UNKNOWN
+
+    def get_height(self) -> int:
+        return self._height
+
+    def get_width(self) -> int:
+        return self._width
 
     def __str__(self) -> str:
-        result: str = ""
-        for row_index, row in enumerate(self._map):
-            for col_index, col in enumerate(row):
-                result += str(self._map[row_index][col_index])
-            result += "\n"
-        return result
+        if self._rendered is None:
+            for row_index in self._dirty_rows:
+                self._rendered_rows[row_index] = self._render_row(row_index) + "\n"
+            self._dirty_rows.clear()
+            self._rendered = "".join(self._rendered_rows)
+        return self._rendered
+
+    def _render_row(self, row_index: int, first_col: int = 0, last_col: int | None = None) -> str:
+        last_col = self._width if last_col is None else last_col
+        row: str = Tile.SYMBOL_BYTES[
+            self._terrain[row_index, first_col:last_col] |
+            self._items[row_index, first_col:last_col]].tobytes().decode()
+        occupied: list = [col for col in self._occupied_cols[row_index]
+                          if first_col <= col < last_col]
+        if not occupied:
+            return row
+        cells: list = list(row)
+        for col_index in occupied:
+            cells[col_index - first_col] = self._display_symbol(row_index, col_index)
+        return "".join(cells)
+
+    def render_region(self, top: int, left: int, height: int, width: int) -> str:
+        top, left = max(top, 0), max(left, 0)
+        bottom: int = min(top + height, self._height)
+        right: int = min(left + width, self._width)
+        return "".join(self._render_row(row_index, left, right) + "\n"
+                       for row_index in range(top, bottom))
+
+    def _display_symbol(self, x: int, y: int) -> str:
+        key: int = x * self._width + y
+        actors: dict | None = self._actors.get(key)
+        tile: str = Tile.SYMBOLS[self._cell_tiles[key]]
+        if not actors:
+            return tile
+        symbol: str = "".join(reversed(actors))
+        if len(symbol) != len(actors):
+            symbol = Map.WIDE_PLAYER_SYMBOL
+        return symbol + tile if tile == MapSymbols.TREASURE.value else symbol
+
+    def get_tile_bytes(self) -> bytes:
+        return (self._terrain | self._items).tobytes()
+
+    def get_occupied_cells(self) -> list:
+        return [(coordinates, self.get_tile(coordinates), self.get_actors(coordinates))
+                for coordinates in (self.intern(*divmod(key, self._width))
+                                    for key in self._actors)]
+
+    def get_region_tile_bytes(self, top: int, left: int, height: int, width: int) -> bytes:
+        return (self._terrain[top:top + height, left:left + width] |
+                self._items[top:top + height, left:left + width]).tobytes()
+
+    def get_region_occupied_cells(self, top: int, left: int, height: int, width: int) -> list:
+        return [(coordinates, self.get_tile(coordinates), self.get_actors(coordinates))
+                for row_index in range(top, min(top + height, self._height))
+                for coordinates in (self.intern(row_index, col_index)
+                                    for col_index in self._occupied_cols[row_index]
+                                    if left <= col_index < left + width)]
+
+    def _tile_mask(self, tile_symbol: str) -> np.ndarray:
+        return (self._terrain | self._items) == Tile.IDS[tile_symbol]
+
+    def find_tiles(self, tile_symbol: str) -> list:
+        return [self.intern(int(x), int(y))
+                for x, y in np.argwhere(self._tile_mask(tile_symbol))]
+
+    def count_tiles(self, tile_symbol: str) -> int:
+        return int(np.count_nonzero(self._tile_mask(tile_symbol)))
+
+    def to_bytes(self) -> bytes:
+        if self._rendered_bytes is None:
+            self._rendered_bytes = str(self).encode()
+        return self._rendered_bytes
+
+    def _initialize_free_cells(self) -> None:
+        free: np.ndarray = ((self._terrain | self._items) == Tile.FREE_SPOT).ravel()
+        free_cells: np.ndarray = np.flatnonzero(free).astype(np.int32)
+        free_positions: np.ndarray = np.full(self._height * self._width, -1, dtype=np.int32)
+        free_positions[free_cells] = np.arange(len(free_cells), dtype=np.int32)
+        self._free_cells = array("i", free_cells.tobytes())
+        self._free_positions = array("i", free_positions.tobytes())
+        self._free_count = len(self._free_cells)
+        for key in self._actors:
+            self._update_free_cell(key)
+
+    def _update_free_cell(self, key: int) -> None:
+        is_free: bool = (self._cell_tiles[key] == Tile.FREE_SPOT and
+                         key not in self._actors)
+        index: int = self._free_positions[key]
+        if is_free and index < 0:
+            if self._free_count == len(self._free_cells):
+                self._free_cells.append(key)
+            else:
+                self._free_cells[self._free_count] = key
+            self._free_positions[key] = self._free_count
+            self._free_count += 1
+        elif not is_free and index >= 0:
+            self._free_count -= 1
+            last: int = self._free_cells[self._free_count]
+            self._free_cells[index] = last
+            self._free_positions[last] = index
+            self._free_positions[key] = -1
+
+    def _mark_changed(self, coordinates: Coordinates, key: int) -> None:
+        self._update_free_cell(key)
+        self._dirty_rows.add(coordinates.x)
+        self._rendered = None
+        self._rendered_bytes = None
+        self._version += 1
+        self._changes.append((self._version, coordinates))
 
     def _save_objects(self) -> None:
-        minion_coordinates: set = set()
-        treasures_coordinates: set = set()
-        for row, line in enumerate(self._map):
-            for col, symbol in enumerate(line):
-                if str(symbol) == MapSymbols.MINION.value:
-                    minion_coordinates.add(Coordinates(row, col))
-                if str(symbol) == MapSymbols.TREASURE.value:
-                    treasures_coordinates.add(Coordinates(row, col))
+        minion_coordinates: set = set(self.find_tiles(MapSymbols.MINION.value))
         self._initialize_mionions(minion_coordinates)
-        self._initialize_treasures(treasures_coordinates)
+        self._initialize_treasures(np.argwhere(self._tile_mask(MapSymbols.TREASURE.value)))
 
     def _initialize_mionions(self, minion_coordinates: set) -> None:
         for level, coordinate in enumerate(minion_coordinates):
             minion: Minion = Minion(
                 level % Constants.MINION_MAX_LEVEL + 1, coordinate)
-            self._objects[coordinate] = minion
+            self._objects[self._key(coordinate)] = minion
 
-    def _initialize_treasures(self, treasure_coordinates: set) -> None:
-        num_of_treasures_in_file: int = self._total_num_of_items_in_file()
-        if num_of_treasures_in_file < len(treasure_coordinates):
+    def _initialize_treasures(self, treasure_cells: np.ndarray) -> None:
+        self._catalog = TreasureCatalog.load(Constants.TREASURES_FILE_NAME)
+        if len(self._catalog) < len(treasure_cells):
             raise NotEnoughTreasuresException(
                 "Not enough treasures in {file_name} to generate in map", Constants.TREASURES_FILE_NAME)
-        with open(Constants.TREASURES_FILE_NAME) as f:
-            next(f)
-            lines = f.readlines()
-            random.shuffle(lines)
-            for line, coordinate in zip(lines, treasure_coordinates):
-                treasure: Treasure = TreasureInitializer.Factory(line.strip())
-                treasure.coordinates = coordinate
-                self._objects[coordinate] = treasure
-
-    def _total_num_of_items_in_file(self) -> int:
-        with open(Constants.TREASURES_FILE_NAME) as f:
-            return len(f.readlines()) - 1
+        order: list = list(range(len(self._catalog)))
+        self._rng.shuffle(order)
+        self._treasure_ids[treasure_cells[:, 0], treasure_cells[:, 1]] = \
+            order[:len(treasure_cells)]
 
     def _validate_coordinates(self, coordinates: Coordinates) -> bool:
         x: int = coordinates.x
         y: int = coordinates.y
-        return x >= 0 and y >= 0 and x < Constants.MAP_HEIGHT and y < Constants.MAP_WIDTH
+        return x >= 0 and y >= 0 and x < self._height and y < self._width
 
     def _is_coorinate_empty(self, coordinates: Coordinates) -> bool:
-        x: int = coordinates.x
-        y: int = coordinates.y
         return (self._validate_coordinates(coordinates) and
-                self._map[x][y] != MapSymbols.MINION.value and
-                self._map[x][y] != MapSymbols.TREASURE.value and
-                self._map[x][y] != MapSymbols.OBSTACLE.value)
+                self._cell_tiles[self._key(coordinates)] == Tile.FREE_SPOT)
 
     def get_symbol(self, coordinates: Coordinates) -> str:
+        if self._validate_coordinates(coordinates):
+            return self._display_symbol(coordinates.x, coordinates.y)
+        else:
+            raise InvalidMapCoordinatesException(
+                "Coordinates out of map bounds")
+
+    def get_tile(self, coordinates: Coordinates) -> str:
         x: int = coordinates.x
         y: int = coordinates.y
         if self._validate_coordinates(coordinates):
-            return self._map[x][y]
+            return Tile.SYMBOLS[self._cell_tiles[x * self._width + y]]
         else:
             raise InvalidMapCoordinatesException(
                 "Coordinates out of map bounds")
 
+    def set_item(self, coordinates: Coordinates, symbol: str | None) -> None:
+        x: int = coordinates.x
+        y: int = coordinates.y
+        self._items[x, y] = Tile.FREE_SPOT if symbol is None else Tile.IDS[symbol]
+        key: int = x * self._width + y
+        self._cell_tiles[key] = self._terrain[x, y] | self._items[x, y]
+        self._mark_changed(coordinates, key)
+
+    def get_actors(self, coordinates: Coordinates) -> list:
+        return list(reversed(self._actors.get(self._key(coordinates), ())))
+
+    def add_actor(self, coordinates: Coordinates, actor_symbol: str) -> None:
+        key: int = coordinates.x * self._width + coordinates.y
+        actors: dict | None = self._actors.get(key)
+        if actors is None:
+            actors = self._actors[key] = {}
+            self._occupied_cols[coordinates.x].add(coordinates.y)
+        actors[actor_symbol] = None
+        self._mark_changed(coordinates, key)
+
+    def remove_actor(self, coordinates: Coordinates, actor_symbol: str) -> None:
+        key: int = coordinates.x * self._width + coordinates.y
+        actors: dict | None = self._actors.get(key)
+        if actors is None or actor_symbol not in actors:
+            return
+        del actors[actor_symbol]
+        if not actors:
+            del self._actors[key]
+            self._occupied_cols[coordinates.x].discard(coordinates.y)
+        self._mark_changed(coordinates, key)
+
     def change_symbol(self, coordinates: Coordinates, symbol: str) -> None:
         x: int = coordinates.x
         y: int = coordinates.y
-        if self._validate_coordinates(coordinates):
-            self._map[x][y] = symbol
+        if not self._validate_coordinates(coordinates):
+            return
+        key: int = x * self._width + y
+        if key in self._actors:
+            del self._actors[key]
+            self._occupied_cols[x].discard(y)
+        if MapSymbols.is_valid_map_symbol(symbol):
+            tile_id: int = Tile.IDS[symbol]
+            self._terrain[x, y] = Tile.OBSTACLE if tile_id == Tile.OBSTACLE else Tile.FREE_SPOT
+            self._items[x, y] = tile_id if tile_id >= Tile.TREASURE else Tile.FREE_SPOT
+            self._cell_tiles[key] = tile_id
+            self._mark_changed(coordinates, key)
+        else:
+            self.add_actor(coordinates, symbol)
+
+    def get_version(self) -> int:
+        return self._version
+
+    def get_changes_since(self, version: int) -> list | None:
+        if version == self._version:
+            return []
+        if not self._changes or self._changes[0][0] > version + 1:
+            return None
+        changed: dict = {}
+        for change_version, coordinates in reversed(self._changes):
+            if change_version <= version:
+                break
+            changed.setdefault(coordinates, self.get_symbol(coordinates))
+        return list(changed.items())
+
+    def get_objects(self) -> list:
+        return list(self._objects.values())
+
+    def get_catalog(self) -> TreasureCatalog:
+        return self._catalog
+
+    def get_catalog_treasures(self) -> tuple:
+        cells: np.ndarray = np.argwhere(self._treasure_ids >= 0)
+        return cells, self._treasure_ids[cells[:, 0], cells[:, 1]]
 
     def get_object(self, coordinates: Coordinates):
-        return self._objects[coordinates]
+        key: int = coordinates.x * self._width + coordinates.y
+        game_object = self._objects.get(key)
+        if game_object is not None:
+            return game_object
+        index: int = int(self._treasure_ids[coordinates.x, coordinates.y])
+        if index < 0:
+            raise KeyError(coordinates)
+        treasure: Treasure = self._catalog.materialize(index, coordinates)
+        self._treasure_ids[coordinates.x, coordinates.y] = -1
+        self._objects[key] = treasure
+        return treasure
 
     def add_object_to_map(self, coordinates: Coordinates, object) -> None:
-        self._objects[coordinates] = object
+        self._treasure_ids[coordinates.x, coordinates.y] = -1
+        self._objects[self._key(coordinates)] = object
 
     def remove_object(self, coordinates: Coordinates) -> None:
-        del self._objects[coordinates]
+        self._treasure_ids[coordinates.x, coordinates.y] = -1
+        self._objects.pop(self._key(coordinates), None)
 
     def get_free_coordinates(self) -> Coordinates:
-        while True:
-            coordinates: Coordinates = Coordinates.generate_random_coordinates(
-                Constants.MAP_HEIGHT - 1, Constants.MAP_WIDTH - 1)
-            if self.get_symbol(coordinates) == MapSymbols.FREE_SPOT.value:
-                return coordinates
+        if self._free_count == 0:
+            raise WorldFullException("No free coordinates left on map")
+        key: int = self._free_cells[self._rng.randrange(self._free_count)]
+        return self.intern(*divmod(key, self._width))
+
+    def count_free_cells(self) -> int:
+        return self._free_count
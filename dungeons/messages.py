@@ -24,3 +24,4 @@ class Messages:
     NOT_ON_SAME_SPOT: str = "Not on same coordinates"
     INVALID_ARGUMENT: str = "Invalid argument"
     UNKNOWN_COMMAND: str = "Unknown command"
+    WORLD_FULL: str = "World is full, try again later"
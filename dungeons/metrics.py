@@ -0,0 +1,143 @@
+import bisect
+import threading
+
+
+class MetricCounter:
+
+    __slots__ = ("name", "labels", "value")
+
+    name: str
+    labels: tuple
+    value: float
+
+    def __init__(self, name: str, labels: tuple) -> None:
+        self.name = name
+        self.labels = labels
+        self.value = 0
+
+    def increment(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def samples(self) -> list:
+        return [(self.name, self.labels, self.value)]
+
+
+class MetricGauge:
+
+    __slots__ = ("name", "labels", "_read")
+
+    name: str
+    labels: tuple
+
+    def __init__(self, name: str, labels: tuple, read) -> None:
+        self.name = name
+        self.labels = labels
+        self._read = read
+
+    def samples(self) -> list:
+        return [(self.name, self.labels, self._read())]
+
+
+class MetricHistogram:
+
+    BOUNDS: tuple = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001,
+                     0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+    __slots__ = ("name", "labels", "counts", "total")
+
+    name: str
+    labels: tuple
+    counts: list
+    total: float
+
+    def __init__(self, name: str, labels: tuple) -> None:
+        self.name = name
+        self.labels = labels
+        self.counts = [0] * (len(MetricHistogram.BOUNDS) + 1)
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(MetricHistogram.BOUNDS, value)] += 1
+        self.total += value
+
+    def percentile(self, percent: float) -> float:
+        count: int = sum(self.counts)
+        if not count:
+            return 0.0
+        rank: float = count * percent / 100
+        seen: int = 0
+        for bound, bucket in zip(MetricHistogram.BOUNDS, self.counts):
+            seen += bucket
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def samples(self) -> list:
+        samples: list = []
+        seen: int = 0
+        for bound, bucket in zip(MetricHistogram.BOUNDS + ("+Inf",), self.counts):
+            seen += bucket
+            samples.append((self.name + "_bucket", self.labels + (("le", str(bound)),), seen))
+        samples.append((self.name + "_sum", self.labels, self.total))
+        samples.append((self.name + "_count", self.labels, seen))
+        return samples
+
+
+class MetricsRegistry:
+
+    PREFIX: str = "dungeons_"
+
+    _metrics: dict
+    _help: dict
+    _lock: threading.Lock
+
+    def __init__(self) -> None:
+        self._metrics = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def _get(self, metric_class, name: str, description: str, labels: dict, *args,
+             replace: bool = False):
+        key: tuple = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            metric = None if replace else self._metrics.get(key)
+            if metric is None:
+                metric = self._metrics[key] = metric_class(MetricsRegistry.PREFIX + name,
+                                                           key[1], *args)
+                self._help.setdefault(metric.name, (description, metric_class))
+        return metric
+
+    def counter(self, name: str, description: str, **labels) -> MetricCounter:
+        return self._get(MetricCounter, name, description, labels)
+
+    def histogram(self, name: str, description: str, **labels) -> MetricHistogram:
+        return self._get(MetricHistogram, name, description, labels)
+
+    def gauge(self, name: str, description: str, read, **labels) -> MetricGauge:
+        return self._get(MetricGauge, name, description, labels, read, replace=True)
+
+    def get(self, name: str, **labels):
+        return self._metrics.get((name, tuple(sorted(labels.items()))))
+
+    def render(self) -> str:
+        types: dict = {MetricCounter: "counter", MetricGauge: "gauge",
+                       MetricHistogram: "histogram"}
+        with self._lock:
+            metrics: list = sorted(self._metrics.values(), key=lambda metric: metric.name)
+            descriptions: dict = dict(self._help)
+        lines: list = []
+        described: set = set()
+        for metric in metrics:
+            if metric.name not in described:
+                described.add(metric.name)
+                description, metric_class = descriptions[metric.name]
+                lines.append(f"# HELP {metric.name} {description}")
+                lines.append(f"# TYPE {metric.name} {types[metric_class]}")
+            for name, labels, value in metric.samples():
+                label_text: str = ",".join(f'{label}="{label_value}"'
+                                           for label, label_value in labels)
+                lines.append(f"{name}{{{label_text}}} {value}" if labels else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS: MetricsRegistry = MetricsRegistry()
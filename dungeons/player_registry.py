@@ -0,0 +1,53 @@
+import heapq
+
+from constants import Constants
+from map import WorldFullException
+
+
+class PlayerRegistry:
+
+    _capacity: int
+    _free_ids: list
+    _next_id: int
+    _connections: dict
+    _heroes: dict
+
+    def __init__(self, capacity: int = Constants.MAX_PLAYERS) -> None:
+        self._capacity = capacity
+        self.reset()
+
+    def reset(self) -> None:
+        self._free_ids = []
+        self._next_id = 1
+        self._connections = {}
+        self._heroes = {}
+
+    def acquire(self) -> int:
+        if self._free_ids:
+            return heapq.heappop(self._free_ids)
+        if self._next_id > self._capacity:
+            raise WorldFullException("No free player ids left")
+        player_id: int = self._next_id
+        self._next_id += 1
+        return player_id
+
+    def register(self, hero, connection) -> None:
+        self._heroes[hero.actor_symbol] = hero
+        self._connections[hero.actor_symbol] = connection
+
+    def release(self, hero) -> None:
+        self._heroes.pop(hero.actor_symbol, None)
+        self._connections.pop(hero.actor_symbol, None)
+        heapq.heappush(self._free_ids, int(hero.actor_symbol))
+
+    def get_connection(self, actor_symbol: str):
+        return self._connections.get(actor_symbol)
+
+    def get_hero(self, actor_symbol: str):
+        return self._heroes.get(actor_symbol)
+
+    def free_count(self) -> int:
+        return self._capacity - self._next_id + 1 + len(self._free_ids)
+
+    def __len__(self) -> int:
+        return len(self._heroes)
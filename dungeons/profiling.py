@@ -0,0 +1,190 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+
+from collections import Counter
+from constants import Constants
+from client_hanler import ClientHandler
+
+
+class StackSampler:
+
+    _interval: float
+    _scope_code: object
+    _ignored: set
+    _stop: threading.Event
+    _thread: threading.Thread
+    samples: Counter
+
+    def __init__(self, interval: float = Constants.PROFILE_SAMPLE_INTERVAL,
+                 scope_code=None) -> None:
+        self._interval = interval
+        self._scope_code = scope_code
+        self._ignored = {threading.get_ident()}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self.samples = Counter()
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        self._ignored.add(threading.get_ident())
+        while not self._stop.wait(self._interval):
+            self.sample()
+
+    def sample(self) -> None:
+        for ident, frame in sys._current_frames().items():
+            if ident in self._ignored:
+                continue
+            stack: list = []
+            while frame is not None:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            stack.reverse()
+            if self._scope_code is not None:
+                if self._scope_code not in stack:
+                    continue
+                stack = stack[stack.index(self._scope_code):]
+            self.samples[tuple(stack)] += 1
+
+    @staticmethod
+    def _label(code) -> str:
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def collapsed(self) -> str:
+        return "".join(f"{';'.join(map(StackSampler._label, stack))} {count}\n"
+                       for stack, count in self.samples.most_common())
+
+    def create_stats(self) -> None:
+        functions: dict = {}
+        for stack, count in self.samples.items():
+            keys: list = [(code.co_filename, code.co_firstlineno, code.co_name) for code in stack]
+            for key in set(keys):
+                functions.setdefault(key, [0, 0, {}])[1] += count
+            functions[keys[-1]][0] += count
+            for caller, callee in zip(keys, keys[1:]):
+                callers: dict = functions[callee][2]
+                callers[caller] = callers.get(caller, 0) + count
+        self.stats = {
+            key: (inclusive, inclusive, own * self._interval, inclusive * self._interval,
+                  {caller: (calls, calls, calls * self._interval, calls * self._interval)
+                   for caller, calls in callers.items()})
+            for key, (own, inclusive, callers) in functions.items()}
+
+
+class DispatchProfiler:
+
+    _profiles: dict
+    _lock: threading.Lock
+    _original = None
+
+    def __init__(self) -> None:
+        self._profiles = {}
+        self._lock = threading.Lock()
+
+    def install(self) -> None:
+        original = self._original = ClientHandler._dispatch_command
+
+        def profiled_dispatch(handler: ClientHandler, command) -> bool:
+            profile: cProfile.Profile = self._profile_for_thread()
+            profile.enable()
+            try:
+                return original(handler, command)
+            finally:
+                profile.disable()
+
+        ClientHandler._dispatch_command = profiled_dispatch
+
+    def uninstall(self) -> None:
+        ClientHandler._dispatch_command = self._original
+
+    def _profile_for_thread(self) -> cProfile.Profile:
+        ident: int = threading.get_ident()
+        profile: cProfile.Profile | None = self._profiles.get(ident)
+        if profile is None:
+            with self._lock:
+                profile = self._profiles.setdefault(ident, cProfile.Profile())
+        return profile
+
+    def stats(self) -> pstats.Stats | None:
+        profiles: list = list(self._profiles.values())
+        if not profiles:
+            return None
+        stats: pstats.Stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        return stats
+
+
+class Profiler:
+
+    SCOPES: tuple = ("server", "dispatch")
+    MODES: tuple = ("sample", "cprofile")
+
+    _directory: str
+    _busy: threading.Lock
+
+    def __init__(self, directory: str = Constants.PROFILE_DIRECTORY) -> None:
+        self._directory = directory
+        self._busy = threading.Lock()
+
+    def handle_command(self, arguments: list) -> str:
+        if not arguments:
+            raise ValueError("usage: profile SECONDS [server|dispatch] [sample|cprofile]")
+        seconds: float = float(arguments[0])
+        scope: str = arguments[1] if len(arguments) > 1 else "server"
+        mode: str = arguments[2] if len(arguments) > 2 else "sample"
+        if not 0 < seconds <= Constants.MAX_PROFILE_SECONDS:
+            raise ValueError(f"seconds must be in (0, {Constants.MAX_PROFILE_SECONDS}]")
+        if scope not in Profiler.SCOPES or mode not in Profiler.MODES:
+            raise ValueError(f"scope is one of {Profiler.SCOPES}, mode one of {Profiler.MODES}")
+        if mode == "cprofile" and scope != "dispatch":
+            raise ValueError("cprofile only hooks the dispatch scope; use sample for the server")
+        if not self._busy.acquire(blocking=False):
+            return "A profile capture is already running\n"
+        try:
+            return self.capture(seconds, scope, mode)
+        finally:
+            self._busy.release()
+
+    def capture(self, seconds: float, scope: str, mode: str) -> str:
+        scope_code = ClientHandler._dispatch_command.__code__ if scope == "dispatch" else None
+        sampler: StackSampler = StackSampler(scope_code=scope_code)
+        dispatch_profiler: DispatchProfiler | None = (DispatchProfiler() if mode == "cprofile"
+                                                      else None)
+        if dispatch_profiler is not None:
+            dispatch_profiler.install()
+        sampler.start()
+        try:
+            time.sleep(seconds)
+        finally:
+            sampler.stop()
+            if dispatch_profiler is not None:
+                dispatch_profiler.uninstall()
+        stats: pstats.Stats | None = (dispatch_profiler.stats() if dispatch_profiler is not None
+                                      else None)
+        if stats is None and sampler.samples:
+            stats = pstats.Stats(sampler)
+        os.makedirs(self._directory, exist_ok=True)
+        prefix: str = os.path.join(self._directory,
+                                   f"{time.strftime('%Y%m%d-%H%M%S')}-{scope}-{mode}")
+        with open(prefix + ".collapsed", "w") as f:
+            f.write(sampler.collapsed())
+        report: str = (f"Captured {sum(sampler.samples.values())} samples over {seconds:g}s\n"
+                       f"Collapsed stacks: {prefix}.collapsed\n")
+        if stats is None:
+            return report + "Nothing ran in the profiled scope\n"
+        stats.dump_stats(prefix + ".pstats")
+        summary: io.StringIO = io.StringIO()
+        stats.stream = summary
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(Constants.PROFILE_SUMMARY_LINES)
+        return report + f"Profile: {prefix}.pstats\n" + summary.getvalue()
@@ -0,0 +1,288 @@
+import re
+import string
+import struct
+
+from enum import Enum
+from constants import Constants
+from messages import Messages
+from map import Tile
+
+
+class MapFrame:
+
+    KEYFRAME: str = "KEYFRAME {frame}\n{map}"
+    DELTA: str = "DELTA {frame} {cells}\n"
+    VIEW: str = "VIEW {frame} {top},{left}\n{map}"
+    SCROLL: str = "SCROLL {frame} {top},{left} {cells}\n"
+    CELL_SEPARATOR: str = ";"
+    FIELD_SEPARATOR: str = ","
+
+    @staticmethod
+    def encode_keyframe(frame: int, rendered_map: str) -> str:
+        return MapFrame.KEYFRAME.format(frame=frame, map=rendered_map)
+
+    @staticmethod
+    def encode_view(frame: int, top: int, left: int, rendered_region: str) -> str:
+        return MapFrame.VIEW.format(frame=frame, top=top, left=left, map=rendered_region)
+
+    @staticmethod
+    def _encode_cells(changes: list) -> str:
+        return MapFrame.CELL_SEPARATOR.join(
+            MapFrame.FIELD_SEPARATOR.join((str(coordinates.x), str(coordinates.y), symbol))
+            for coordinates, symbol in changes)
+
+    @staticmethod
+    def _decode_cells(text: str) -> list:
+        cells: list = []
+        for cell in (text.split(MapFrame.CELL_SEPARATOR) if text else ()):
+            x, y, symbol = cell.split(MapFrame.FIELD_SEPARATOR)
+            cells.append((int(x), int(y), symbol))
+        return cells
+
+    @staticmethod
+    def encode_delta(frame: int, changes: list) -> str:
+        return MapFrame.DELTA.format(frame=frame, cells=MapFrame._encode_cells(changes))
+
+    @staticmethod
+    def encode_scroll(frame: int, top: int, left: int, changes: list) -> str:
+        return MapFrame.SCROLL.format(frame=frame, top=top, left=left,
+                                      cells=MapFrame._encode_cells(changes))
+
+    @staticmethod
+    def decode_delta(line: str) -> tuple:
+        tokens: list = line.strip().split(" ", 2)
+        return int(tokens[1]), MapFrame._decode_cells(tokens[2] if len(tokens) == 3 else "")
+
+    @staticmethod
+    def decode_scroll(line: str) -> tuple:
+        tokens: list = line.strip().split(" ", 3)
+        top, left = (int(value) for value in tokens[2].split(MapFrame.FIELD_SEPARATOR))
+        return int(tokens[1]), top, left, MapFrame._decode_cells(
+            tokens[3] if len(tokens) == 4 else "")
+
+
+class LineFramer:
+
+    _buffer: bytearray
+    _discarding: bool
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+        self._discarding = False
+
+    def feed(self, data: bytes) -> list:
+        if self._discarding:
+            newline: int = data.find(b"\n")
+            if newline < 0:
+                return []
+            data = data[newline + 1:]
+            self._discarding = False
+        self._buffer += data
+        *lines, rest = self._buffer.split(b"\n")
+        if len(rest) > Constants.MAX_LINE_LENGTH:
+            lines.append(rest[:Constants.MAX_LINE_LENGTH])
+            rest = b""
+            self._discarding = True
+        self._buffer = bytearray(rest)
+        return [decoded for decoded in
+                (line.decode(errors="replace").strip() for line in lines)
+                if decoded]
+
+
+class FrameType(Enum):
+    KEYFRAME = 1
+    DELTA = 2
+    MESSAGE = 3
+    VIEW = 4
+    SCROLL = 5
+
+
+class MessageCode(Enum):
+    TEXT = 0
+    WEAPON_EQUIPPED_SUCCESSFULLY = 1
+    SPELL_LEARNT_SUCCESSFULLY = 2
+    LEVEL_NOT_ENOUGH = 3
+    HEALTH_INCREASE_MESSAGE = 4
+    MANA_INCREASE_MESSAGE = 5
+    POTION_NOT_VALID = 6
+    BACKPACK_FULL = 7
+    BACKPACK_EMPTY = 8
+    BACKPACK_ITEM_REMOVED = 9
+    BACKPACK_ITEM_ADDED = 10
+    ITEM_NOT_FOUND_IN_BACKPACK = 11
+    INVALID_MOVE = 12
+    SUCCESSFUL_MOVE = 13
+    MINION_KILLED = 14
+    PLAYER_KILLED = 15
+    PLAYER_KILLED_OTHER_PLAYER = 16
+    OPPONENT_BACKPACK_FULL = 17
+    ITEM_SWAPPED = 18
+    NOT_ON_SAME_SPOT = 19
+    INVALID_ARGUMENT = 20
+    UNKNOWN_COMMAND = 21
+    WORLD_FULL = 22
+
+
+class BinaryFrame:
+
+    HEADER: struct.Struct = struct.Struct("!BI")
+    KEYFRAME_HEADER: struct.Struct = struct.Struct("!IHHI")
+    DELTA_HEADER: struct.Struct = struct.Struct("!II")
+    VIEW_HEADER: struct.Struct = struct.Struct("!IHHHHI")
+    SCROLL_HEADER: struct.Struct = struct.Struct("!IHHI")
+    CELL: struct.Struct = struct.Struct("!HHBH")
+    OCCUPANT: struct.Struct = struct.Struct("!H")
+    MESSAGE_HEADER: struct.Struct = struct.Struct("!B")
+    ARGUMENT_SEPARATOR: str = "\x1f"
+    SWITCH_LINE: str = "BINARY\n"
+
+    _TEMPLATES: dict = {code: getattr(Messages, code.name)
+                        for code in MessageCode if code != MessageCode.TEXT}
+    _FIXED_CODES: dict = {template: code for code, template in _TEMPLATES.items()
+                          if "{" not in template}
+    _PATTERNS: list = [(code, re.compile("".join(
+        re.escape(literal) + ("(.*)" if field is not None else "")
+        for literal, field, _, _ in string.Formatter().parse(template)), re.DOTALL))
+        for code, template in _TEMPLATES.items() if "{" in template]
+
+    @staticmethod
+    def _frame(frame_type: FrameType, payload: bytes) -> bytes:
+        return BinaryFrame.HEADER.pack(frame_type.value, len(payload)) + payload
+
+    @staticmethod
+    def _encode_cell(row: int, col: int, tile_symbol: str, occupants: list) -> bytes:
+        return (BinaryFrame.CELL.pack(row, col, Tile.IDS[tile_symbol], len(occupants)) +
+                b"".join(BinaryFrame.OCCUPANT.pack(int(occupant)) for occupant in occupants))
+
+    @staticmethod
+    def _encode_cells(cells: list) -> bytes:
+        return b"".join(BinaryFrame._encode_cell(coordinates.x, coordinates.y, tile_symbol, occupants)
+                        for coordinates, tile_symbol, occupants in cells)
+
+    @staticmethod
+    def encode_keyframe(frame: int, height: int, width: int, tiles: bytes,
+                        occupied_cells: list) -> bytes:
+        payload: bytes = (BinaryFrame.KEYFRAME_HEADER.pack(frame, height, width,
+                                                           len(occupied_cells)) +
+                          tiles + BinaryFrame._encode_cells(occupied_cells))
+        return BinaryFrame._frame(FrameType.KEYFRAME, payload)
+
+    @staticmethod
+    def encode_view(frame: int, top: int, left: int, height: int, width: int,
+                    tiles: bytes, occupied_cells: list) -> bytes:
+        payload: bytes = (BinaryFrame.VIEW_HEADER.pack(frame, top, left, height, width,
+                                                       len(occupied_cells)) +
+                          tiles + BinaryFrame._encode_cells(occupied_cells))
+        return BinaryFrame._frame(FrameType.VIEW, payload)
+
+    @staticmethod
+    def encode_delta(frame: int, cells: list) -> bytes:
+        payload: bytes = (BinaryFrame.DELTA_HEADER.pack(frame, len(cells)) +
+                          BinaryFrame._encode_cells(cells))
+        return BinaryFrame._frame(FrameType.DELTA, payload)
+
+    @staticmethod
+    def encode_scroll(frame: int, top: int, left: int, cells: list) -> bytes:
+        payload: bytes = (BinaryFrame.SCROLL_HEADER.pack(frame, top, left, len(cells)) +
+                          BinaryFrame._encode_cells(cells))
+        return BinaryFrame._frame(FrameType.SCROLL, payload)
+
+    @staticmethod
+    def encode_message(text: str) -> bytes:
+        code: MessageCode = BinaryFrame._FIXED_CODES.get(text)
+        arguments: tuple = ()
+        if code is None:
+            code = MessageCode.TEXT
+            arguments = (text,)
+            for pattern_code, pattern in BinaryFrame._PATTERNS:
+                match: re.Match | None = pattern.fullmatch(text)
+                if match is not None:
+                    code = pattern_code
+                    arguments = match.groups()
+                    break
+        payload: bytes = (BinaryFrame.MESSAGE_HEADER.pack(code.value) +
+                          BinaryFrame.ARGUMENT_SEPARATOR.join(arguments).encode())
+        return BinaryFrame._frame(FrameType.MESSAGE, payload)
+
+    @staticmethod
+    def _decode_cells(payload: bytes, offset: int, count: int) -> list:
+        cells: list = []
+        for _ in range(count):
+            row, col, tile_id, num_occupants = BinaryFrame.CELL.unpack_from(
+                payload, offset)
+            offset += BinaryFrame.CELL.size
+            occupants: list = [BinaryFrame.OCCUPANT.unpack_from(
+                payload, offset + index * BinaryFrame.OCCUPANT.size)[0]
+                for index in range(num_occupants)]
+            offset += num_occupants * BinaryFrame.OCCUPANT.size
+            cells.append((row, col, tile_id, occupants))
+        return cells
+
+    @staticmethod
+    def decode_keyframe(payload: bytes) -> tuple:
+        frame, height, width, num_cells = BinaryFrame.KEYFRAME_HEADER.unpack_from(
+            payload)
+        offset: int = BinaryFrame.KEYFRAME_HEADER.size
+        tiles: bytes = payload[offset:offset + height * width]
+        cells: list = BinaryFrame._decode_cells(
+            payload, offset + height * width, num_cells)
+        return frame, height, width, tiles, cells
+
+    @staticmethod
+    def decode_view(payload: bytes) -> tuple:
+        frame, top, left, height, width, num_cells = BinaryFrame.VIEW_HEADER.unpack_from(
+            payload)
+        offset: int = BinaryFrame.VIEW_HEADER.size
+        tiles: bytes = payload[offset:offset + height * width]
+        cells: list = BinaryFrame._decode_cells(
+            payload, offset + height * width, num_cells)
+        return frame, top, left, height, width, tiles, cells
+
+    @staticmethod
+    def decode_delta(payload: bytes) -> tuple:
+        frame, num_cells = BinaryFrame.DELTA_HEADER.unpack_from(payload)
+        return frame, BinaryFrame._decode_cells(
+            payload, BinaryFrame.DELTA_HEADER.size, num_cells)
+
+    @staticmethod
+    def decode_scroll(payload: bytes) -> tuple:
+        frame, top, left, num_cells = BinaryFrame.SCROLL_HEADER.unpack_from(payload)
+        return frame, top, left, BinaryFrame._decode_cells(
+            payload, BinaryFrame.SCROLL_HEADER.size, num_cells)
+
+    @staticmethod
+    def decode_message(payload: bytes) -> tuple:
+        code: MessageCode = MessageCode(
+            BinaryFrame.MESSAGE_HEADER.unpack_from(payload)[0])
+        arguments: list = payload[BinaryFrame.MESSAGE_HEADER.size:].decode().split(
+            BinaryFrame.ARGUMENT_SEPARATOR)
+        if code == MessageCode.TEXT:
+            return code, arguments[0]
+        text: str = "".join(
+            literal + (arguments.pop(0) if field is not None else "")
+            for literal, field, _, _ in string.Formatter().parse(BinaryFrame._TEMPLATES[code]))
+        return code, text
+
+
+class BinaryFramer:
+
+    _buffer: bytearray
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> list:
+        self._buffer += data
+        frames: list = []
+        offset: int = 0
+        while len(self._buffer) - offset >= BinaryFrame.HEADER.size:
+            frame_type, length = BinaryFrame.HEADER.unpack_from(
+                self._buffer, offset)
+            end: int = offset + BinaryFrame.HEADER.size + length
+            if len(self._buffer) < end:
+                break
+            frames.append((FrameType(frame_type),
+                           bytes(self._buffer[offset + BinaryFrame.HEADER.size:end])))
+            offset = end
+        del self._buffer[:offset]
+        return frames
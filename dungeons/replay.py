@@ -0,0 +1,102 @@
+import argparse
+import sys
+import time
+
+from client_hanler import ClientHandler
+from event_log import EVENT_LOG
+from game_tactics import GameTactics, WorldFullException
+from journal import CommandJournal, JournalEntry
+from snapshot import WorldSnapshot
+
+
+class NullConnection:
+
+    bytes_sent: int
+
+    def __init__(self) -> None:
+        self.bytes_sent = 0
+
+    def sendall(self, data: bytes) -> None:
+        self.bytes_sent += len(data)
+
+    def shutdown(self, how: int) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class JournalReplay:
+
+    _seed: int
+    _map_file_name: str
+    _entries: list
+    game: GameTactics
+    commands: int
+    checkpoints: int
+    mismatches: list
+    elapsed: float
+
+    def __init__(self, journal_file_name: str) -> None:
+        self._seed, self._map_file_name, self._entries = CommandJournal.read(journal_file_name)
+        self.commands = 0
+        self.checkpoints = 0
+        self.mismatches = []
+        self.elapsed = 0.0
+
+    def run(self) -> str:
+        ClientHandler.CLIENTS.clear()
+        ClientHandler.HANDLERS.clear()
+        ClientHandler.PLAYERS.reset()
+        self.game = GameTactics(self._map_file_name, seed=self._seed)
+        handlers: dict = {}
+        logging: bool = EVENT_LOG.enabled
+        EVENT_LOG.enabled = False
+        started: float = time.perf_counter()
+        try:
+            for entry in self._entries:
+                self._apply(entry, handlers)
+        finally:
+            EVENT_LOG.enabled = logging
+        self.elapsed = time.perf_counter() - started
+        return self.state_hash()
+
+    def _apply(self, entry: JournalEntry, handlers: dict) -> None:
+        if entry.kind == CommandJournal.CHECKPOINT:
+            self.checkpoints += 1
+            state_hash: str = self.state_hash()
+            if state_hash != entry.argument:
+                self.mismatches.append((self.commands, entry.argument, state_hash))
+        elif entry.kind == CommandJournal.SPAWN:
+            try:
+                handlers[entry.session_id] = ClientHandler(NullConnection(), self.game)
+            except WorldFullException:
+                pass
+        else:
+            self.commands += 1
+            handler: ClientHandler | None = handlers.get(entry.session_id)
+            if handler is not None and handler.is_connected():
+                handler._handle_command(entry.to_command())
+                ClientHandler._flush_all()
+
+    def state_hash(self) -> str:
+        return WorldSnapshot.state_hash(self.game, list(ClientHandler.CLIENTS.values()))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay a Dungeons command journal")
+    parser.add_argument("journal")
+    parser.add_argument("--expect", help="state hash the replay must end with")
+    args = parser.parse_args()
+    replay: JournalReplay = JournalReplay(args.journal)
+    final_hash: str = replay.run()
+    rate: float = replay.commands / replay.elapsed if replay.elapsed else 0.0
+    print(f"Replayed {replay.commands} commands in {replay.elapsed:.3f}s "
+          f"({rate:.0f} commands/s)")
+    print(f"Checkpoints verified: {replay.checkpoints - len(replay.mismatches)}"
+          f"/{replay.checkpoints}")
+    for position, expected, actual in replay.mismatches:
+        print(f"Mismatch after {position} commands: expected {expected}, got {actual}")
+    print(f"State hash: {final_hash}")
+    if replay.mismatches or (args.expect and args.expect != final_hash):
+        sys.exit(1)
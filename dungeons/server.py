@@ -1,24 +1,197 @@
+import argparse
+import asyncio
+import os
+import random
 import socket
 import threading
+import time
 
+from admin import AdminServer
 from constants import Constants
-from client_hanler import ClientHandler
-from game_tactics import GameTactics
+from event_log import EVENT_LOG
+from client_hanler import ClientHandler, SocketConnection, StreamConnection, Command, CommandType
+from game_tactics import GameTactics, WorldFullException
+from journal import CommandJournal
+from simulation import Simulation, TickSimulation
+from snapshot import WorldSnapshot
+from tracing import TRACER
 
 
-def run_server(game):
+def format_address(peername) -> str:
+    if isinstance(peername, tuple):
+        return f"{peername[0]}:{peername[1]}"
+    return str(peername)
+
+
+def schedule_periodic(periodic_tasks: list, run_on_game_thread) -> None:
+    def run(interval: float, task) -> None:
+        while True:
+            time.sleep(interval)
+            run_on_game_thread(task)
+
+    for interval, task in periodic_tasks:
+        threading.Thread(target=run, args=(interval, task), daemon=True).start()
+
+
+def snapshot_task(game, file_name: str):
+    def save() -> None:
+        WorldSnapshot.save(game, list(ClientHandler.CLIENTS.values()), file_name)
+    return save
+
+
+def checkpoint_task(game):
+    def checkpoint() -> None:
+        ClientHandler.JOURNAL.record_checkpoint(
+            WorldSnapshot.state_hash(game, list(ClientHandler.CLIENTS.values())))
+    return checkpoint
+
+
+def run_server(game, periodic_tasks: list = ()):
+    def run_locked(task) -> None:
+        with ClientHandler.GAME_LOCK:
+            task()
+
+    schedule_periodic(periodic_tasks, run_locked)
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         s.bind((Constants.HOST, Constants.PORT))
         s.listen()
-        print(f"Server is listening on {Constants.HOST}:{Constants.PORT}")
+        EVENT_LOG.event("listening", host=Constants.HOST, port=Constants.PORT, mode="threaded")
 
         while True:
             conn, addr = s.accept()
-            print(f"Connected by {addr}")
-            client_handler = ClientHandler(conn, game)
+            EVENT_LOG.event("connected", address=format_address(addr))
+            connection: SocketConnection = SocketConnection(conn)
+            try:
+                with ClientHandler.GAME_LOCK:
+                    client_handler = ClientHandler(connection, game)
+            except WorldFullException:
+                connection.close()
+                continue
             threading.Thread(target=client_handler.handle_client).start()
 
 
+def run_queued_server(game, tick_rate: float = 0, periodic_tasks: list = ()):
+    simulation: Simulation = TickSimulation(tick_rate) if tick_rate > 0 else Simulation()
+    simulation.start()
+    schedule_periodic(periodic_tasks, simulation.submit_task)
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind((Constants.HOST, Constants.PORT))
+        s.listen()
+        EVENT_LOG.event("listening", host=Constants.HOST, port=Constants.PORT, mode="queued")
+
+        while True:
+            conn, addr = s.accept()
+            EVENT_LOG.event("connected", address=format_address(addr))
+            client_handler = ClientHandler(SocketConnection(conn), game, simulation)
+            threading.Thread(target=client_handler.handle_client_queued).start()
+
+
+def run_async_server(game, periodic_tasks: list = ()):
+    asyncio.run(_serve(game, periodic_tasks))
+
+
+async def serve_connection(game, reader: asyncio.StreamReader,
+                           writer: asyncio.StreamWriter) -> None:
+    EVENT_LOG.event("connected", address=format_address(writer.get_extra_info("peername")))
+    connection: StreamConnection = StreamConnection(writer)
+    try:
+        client_handler = ClientHandler(connection, game)
+    except WorldFullException:
+        connection.close()
+        return
+    try:
+        await client_handler.handle_client_async(reader)
+    except ConnectionError:
+        if client_handler.is_connected():
+            client_handler._handle_command(Command(CommandType.QUIT.value))
+            ClientHandler._flush_all()
+    finally:
+        connection.close()
+
+
+async def _serve(game, periodic_tasks: list = ()):
+    schedule_periodic(periodic_tasks, asyncio.get_running_loop().call_soon_threadsafe)
+
+    async def on_connect(reader: asyncio.StreamReader,
+                         writer: asyncio.StreamWriter) -> None:
+        await serve_connection(game, reader, writer)
+
+    server = await asyncio.start_server(on_connect, Constants.HOST, Constants.PORT,
+                                        backlog=Constants.ASYNC_BACKLOG)
+    EVENT_LOG.event("listening", host=Constants.HOST, port=Constants.PORT, mode="async")
+    async with server:
+        await server.serve_forever()
+
+
 if __name__ == '__main__':
-    game: GameTactics = GameTactics()
-    run_server(game)
+    parser = argparse.ArgumentParser(description="Dungeons game server")
+    parser.add_argument("--mode", choices=["threaded", "async", "queued"],
+                        help="default threaded; rooms always run async")
+    parser.add_argument("--map", action="append", default=[],
+                        help="map file; repeat to give each room its own map")
+    parser.add_argument("--rooms", type=int, default=0,
+                        help="run N rooms, each in its own worker process")
+    parser.add_argument("--tick-rate", type=float, default=0,
+                        help="with --mode queued, apply input and broadcast at this many ticks per second")
+    parser.add_argument("--snapshot",
+                        help="restore the world from this file on start and save it there periodically")
+    parser.add_argument("--snapshot-interval", type=float, default=Constants.SNAPSHOT_INTERVAL,
+                        help="seconds between snapshots")
+    parser.add_argument("--admin-port", type=int,
+                        help=f"serve metrics and profiling on this localhost port "
+                             f"(default {Constants.ADMIN_PORT}); 0 disables it")
+    parser.add_argument("--profile-dir", default=Constants.PROFILE_DIRECTORY,
+                        help="directory the admin profile and trace commands write captures to")
+    parser.add_argument("--log-file", help="write the event log here instead of stdout")
+    parser.add_argument("--log-format", choices=["text", "json"], default="text")
+    parser.add_argument("--log-sample", type=float, default=1.0,
+                        help="fraction of command records to keep; other events are always kept")
+    parser.add_argument("--log-max-bytes", type=int, default=Constants.LOG_MAX_BYTES,
+                        help="rotate the log file once it would grow past this size")
+    parser.add_argument("--log-backups", type=int, default=Constants.LOG_BACKUPS)
+    parser.add_argument("--trace", action="store_true",
+                        help="record trace spans from the start; dump them with the admin trace command")
+    parser.add_argument("--journal",
+                        help="with --mode queued or async, record every applied command to this file for replay.py")
+    args = parser.parse_args()
+    if args.journal and args.snapshot:
+        parser.error("--journal replays from the map file and cannot start from a snapshot")
+    if args.journal and args.mode not in ("queued", "async"):
+        parser.error("--journal needs --mode queued or async, where commands apply in one order")
+    if args.rooms > 0:
+        unsupported: list = [flag for flag, value in (
+            ("--mode", args.mode not in (None, "async")), ("--snapshot", args.snapshot),
+            ("--journal", args.journal), ("--admin-port", args.admin_port),
+            ("--trace", args.trace)) if value]
+        if unsupported:
+            parser.error(f"--rooms does not support {', '.join(unsupported)}")
+    EVENT_LOG.configure(args.log_file, args.log_format == "json", args.log_sample,
+                        args.log_max_bytes, args.log_backups)
+    map_file_names: list = args.map or [Constants.MAP_FILE_NAME]
+    if args.rooms > 0:
+        from sharding import RoomSupervisor
+        RoomSupervisor(args.rooms, map_file_names).run()
+    periodic_tasks: list = []
+    if args.snapshot and os.path.exists(args.snapshot):
+        game: GameTactics = WorldSnapshot.load(args.snapshot)
+        EVENT_LOG.event("restored", snapshot=args.snapshot)
+    elif args.journal:
+        seed: int = random.randrange(2 ** 63)
+        game: GameTactics = GameTactics(map_file_names[0], seed=seed)
+        ClientHandler.JOURNAL = CommandJournal(args.journal, seed, map_file_names[0])
+        periodic_tasks.append((Constants.JOURNAL_CHECKPOINT_INTERVAL, checkpoint_task(game)))
+    else:
+        game: GameTactics = GameTactics(map_file_names[0])
+    if args.snapshot:
+        periodic_tasks.append((args.snapshot_interval, snapshot_task(game, args.snapshot)))
+    if args.trace:
+        TRACER.enable()
+    admin_port: int = Constants.ADMIN_PORT if args.admin_port is None else args.admin_port
+    if admin_port:
+        AdminServer(admin_port, args.profile_dir).start()
+    if args.mode == "async":
+        run_async_server(game, periodic_tasks)
+    elif args.mode == "queued":
+        run_queued_server(game, args.tick_rate, periodic_tasks)
+    else:
+        run_server(game, periodic_tasks)
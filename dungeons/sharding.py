@@ -0,0 +1,126 @@
+import asyncio
+import multiprocessing
+import socket
+import threading
+
+from constants import Constants
+from event_log import EVENT_LOG
+from game_tactics import GameTactics
+
+
+class RoomWorker:
+
+    _room_id: int
+    _map_file_name: str
+    _channel: socket.socket
+
+    def __init__(self, room_id: int, map_file_name: str, channel: socket.socket) -> None:
+        self._room_id = room_id
+        self._map_file_name = map_file_name
+        self._channel = channel
+
+    def run(self) -> None:
+        EVENT_LOG.bind(room=self._room_id)
+        asyncio.run(self._serve())
+
+    async def _serve(self) -> None:
+        game: GameTactics = GameTactics(self._map_file_name)
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        closed: asyncio.Future = loop.create_future()
+        self._channel.setblocking(False)
+
+        def on_handoff() -> None:
+            try:
+                message, fds, _, _ = socket.recv_fds(self._channel, 1, 1)
+            except BlockingIOError:
+                return
+            if not message:
+                loop.remove_reader(self._channel.fileno())
+                closed.set_result(None)
+                return
+            for fd in fds:
+                loop.create_task(self._serve_handoff(game, socket.socket(fileno=fd)))
+
+        loop.add_reader(self._channel.fileno(), on_handoff)
+        EVENT_LOG.event("room_started", map=self._map_file_name)
+        await closed
+
+    async def _serve_handoff(self, game: GameTactics, conn: socket.socket) -> None:
+        from server import serve_connection
+
+        conn.setblocking(False)
+        reader, writer = await asyncio.open_connection(sock=conn)
+        try:
+            await serve_connection(game, reader, writer)
+        finally:
+            self._channel.send(RoomSupervisor.CLOSED)
+
+
+def _run_room(room_id: int, map_file_name: str, channel: socket.socket,
+              supervisor_channels: list) -> None:
+    for supervisor_channel in supervisor_channels:
+        supervisor_channel.close()
+    RoomWorker(room_id, map_file_name, channel).run()
+
+
+class RoomSupervisor:
+
+    HANDOFF: bytes = b"h"
+    CLOSED: bytes = b"c"
+
+    _channels: list
+    _workers: list
+    _connections: list
+    _lock: threading.Lock
+
+    def __init__(self, rooms: int, map_file_names: list) -> None:
+        self._channels = []
+        self._workers = []
+        self._connections = [0] * rooms
+        self._lock = threading.Lock()
+        for room_id in range(rooms):
+            supervisor_end, worker_end = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+            worker: multiprocessing.Process = multiprocessing.Process(
+                target=_run_room, daemon=True,
+                args=(room_id, map_file_names[room_id % len(map_file_names)], worker_end,
+                      self._channels + [supervisor_end]))
+            worker.start()
+            worker_end.close()
+            self._channels.append(supervisor_end)
+            self._workers.append(worker)
+
+    def run(self, port: int = Constants.PORT) -> None:
+        for room_id in range(len(self._channels)):
+            threading.Thread(target=self._watch_room, args=(room_id,), daemon=True).start()
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            s.bind((Constants.HOST, port))
+            s.listen(Constants.ASYNC_BACKLOG)
+            EVENT_LOG.event("listening", host=Constants.HOST, port=s.getsockname()[1],
+                            mode="rooms", rooms=len(self._channels))
+            while True:
+                conn, _ = s.accept()
+                self._assign(conn)
+
+    def stop(self) -> None:
+        for channel in self._channels:
+            channel.close()
+        for worker in self._workers:
+            worker.join(1)
+
+    def _assign(self, conn: socket.socket) -> int:
+        with self._lock:
+            room_id: int = min(range(len(self._connections)),
+                               key=self._connections.__getitem__)
+            self._connections[room_id] += 1
+        socket.send_fds(self._channels[room_id], [RoomSupervisor.HANDOFF], [conn.fileno()])
+        conn.close()
+        return room_id
+
+    def _watch_room(self, room_id: int) -> None:
+        while True:
+            notifications: bytes = self._channels[room_id].recv(Constants.BUFFER_SIZE)
+            if not notifications:
+                return
+            with self._lock:
+                self._connections[room_id] -= notifications.count(RoomSupervisor.CLOSED)
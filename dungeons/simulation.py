@@ -0,0 +1,131 @@
+import queue
+import threading
+import time
+import traceback
+
+from constants import Constants
+from event_log import EVENT_LOG
+from client_hanler import ClientHandler, Command
+from game_tactics import WorldFullException
+from metrics import METRICS, MetricHistogram
+
+
+class Simulation:
+
+    _queue: queue.Queue
+    _batch_size: int
+    _thread: threading.Thread
+    _running: bool
+
+    def __init__(self, batch_size: int = Constants.SIMULATION_BATCH_SIZE) -> None:
+        self._queue = queue.Queue()
+        self._batch_size = batch_size
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        METRICS.gauge("queue_depth", "Commands waiting for the game thread", self.queue_depth)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._running = False
+        self.submit_task(lambda: None)
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def submit(self, handler: ClientHandler, command: Command | None) -> None:
+        self._queue.put((handler, command))
+
+    def submit_task(self, task) -> None:
+        self._queue.put((None, task))
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def _next_batch(self) -> list:
+        batch: list = [self._queue.get()]
+        while len(batch) < self._batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while self._running:
+            self.run_batch(self._next_batch())
+
+    def run_batch(self, batch: list) -> None:
+        for handler, command in batch:
+            try:
+                self._apply(handler, command)
+            except Exception:
+                EVENT_LOG.event("error", traceback=traceback.format_exc())
+        ClientHandler._flush_all()
+
+    def _apply(self, handler: ClientHandler | None, command: Command | None) -> None:
+        if handler is None:
+            command()
+        elif command is None:
+            try:
+                handler._spawn_player()
+            except WorldFullException:
+                handler._close_input()
+        elif handler.is_connected():
+            handler._handle_command(command)
+
+
+class TickSimulation(Simulation):
+
+    _tick_interval: float
+    _tick_seconds: MetricHistogram
+    ticks: int
+    overruns: int
+    last_tick_duration: float
+    max_tick_duration: float
+
+    def __init__(self, tick_rate: float = Constants.TICK_RATE) -> None:
+        super().__init__()
+        self._tick_interval = 1 / tick_rate
+        self.ticks = 0
+        self.overruns = 0
+        self.last_tick_duration = 0.0
+        self.max_tick_duration = 0.0
+        self._tick_seconds = METRICS.histogram("tick_seconds", "Time spent running a tick")
+        METRICS.gauge("ticks", "Ticks run", lambda: self.ticks)
+        METRICS.gauge("tick_overruns", "Ticks that ran past their deadline", lambda: self.overruns)
+
+    def _drain(self) -> list:
+        batch: list = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                return batch
+
+    def _run(self) -> None:
+        next_tick: float = time.perf_counter()
+        while self._running:
+            self.tick()
+            next_tick += self._tick_interval
+            now: float = time.perf_counter()
+            if now > next_tick:
+                self.overruns += 1
+                next_tick = now
+            else:
+                time.sleep(next_tick - now)
+
+    def tick(self) -> None:
+        started: float = time.perf_counter()
+        self.run_batch(self._drain())
+        self.ticks += 1
+        self.last_tick_duration = time.perf_counter() - started
+        self._tick_seconds.observe(self.last_tick_duration)
+        self.max_tick_duration = max(self.max_tick_duration, self.last_tick_duration)
+
+    def get_metrics(self) -> dict:
+        return {"ticks": self.ticks,
+                "overruns": self.overruns,
+                "last_tick_duration": self.last_tick_duration,
+                "max_tick_duration": self.max_tick_duration,
+                "tick_interval": self._tick_interval}
@@ -0,0 +1,212 @@
+import hashlib
+import os
+import struct
+import threading
+
+import numpy as np
+
+from actor import Hero, Minion
+from game_tactics import GameTactics
+from map import Map, Coordinates
+from treasure import Weapon, Spell, Potion, Treasure, TreasureType, TreasureCatalog
+
+
+class InvalidSnapshotException(Exception):
+    pass
+
+
+class WorldSnapshot:
+
+    MAGIC: bytes = b"DGSN"
+    FORMAT_VERSION: int = 2
+    HEADER: struct.Struct = struct.Struct("!4sHIHHIIIII")
+    OBJECT: struct.Struct = struct.Struct("!HHB")
+    MINION: struct.Struct = struct.Struct("!BddddB")
+    TREASURE: struct.Struct = struct.Struct("!BIiHH")
+    HERO: struct.Struct = struct.Struct("!IHHHBiddddBBB")
+    CATALOG_ROW: np.dtype = np.dtype([("type", "u1"), ("name", ">u4"), ("points", ">i4"),
+                                      ("level", ">u2"), ("min_mana", ">u2")])
+    CATALOG_CELL: np.dtype = np.dtype([("row", ">u2"), ("col", ">u2"), ("index", ">u4")])
+    STRING_SEPARATOR: str = "\0"
+
+    KIND_MINION: int = 0
+    KIND_TREASURE: int = 1
+
+    @staticmethod
+    def capture(game: GameTactics, heroes: list) -> bytes:
+        catalog: TreasureCatalog = game.get_map_catalog()
+        strings: dict = {name: index for index, name in enumerate(catalog.names)}
+
+        def string_index(value: str) -> int:
+            return strings.setdefault(value, len(strings))
+
+        def pack_treasure(treasure: Treasure) -> bytes:
+            return WorldSnapshot.TREASURE.pack(
+                treasure._treasure_type.value, string_index(treasure._name),
+                treasure._points, getattr(treasure, "_level", 0),
+                getattr(treasure, "_min_mana", 0))
+
+        catalog_rows: np.ndarray = np.empty(len(catalog), dtype=WorldSnapshot.CATALOG_ROW)
+        catalog_rows["type"] = catalog.types
+        catalog_rows["name"] = catalog.name_ids
+        catalog_rows["points"] = catalog.points
+        catalog_rows["level"] = catalog.levels
+        catalog_rows["min_mana"] = catalog.min_mana
+        treasure_cells, treasure_indices = game.get_map_catalog_treasures()
+        catalog_cells: np.ndarray = np.empty(len(treasure_cells), dtype=WorldSnapshot.CATALOG_CELL)
+        catalog_cells["row"] = treasure_cells[:, 0]
+        catalog_cells["col"] = treasure_cells[:, 1]
+        catalog_cells["index"] = treasure_indices
+
+        objects: list = []
+        for game_object in game.get_map_objects():
+            coordinates: Coordinates = game_object.coordinates
+            if isinstance(game_object, Minion):
+                stats = game_object._stats
+                objects.append(WorldSnapshot.OBJECT.pack(
+                    coordinates.x, coordinates.y, WorldSnapshot.KIND_MINION) +
+                    WorldSnapshot.MINION.pack(
+                        game_object._level, stats._health, stats._mana,
+                        stats._attack, stats._defense, game_object.is_alive()))
+            else:
+                objects.append(WorldSnapshot.OBJECT.pack(
+                    coordinates.x, coordinates.y, WorldSnapshot.KIND_TREASURE) +
+                    pack_treasure(game_object))
+
+        all_heroes: list = heroes + game.get_restored_heroes()
+        records: list = []
+        for hero in all_heroes:
+            stats = hero._stats
+            items: list = hero._backpack._backpack
+            records.append(WorldSnapshot.HERO.pack(
+                string_index(hero.actor_symbol), hero.coordinates.x, hero.coordinates.y,
+                hero._level, hero.is_alive(), hero._experience, stats._health,
+                stats._mana, stats._attack, stats._defense, hero._weapon is not None,
+                hero._spell is not None, len(items)))
+            for treasure in (hero._weapon, hero._spell, *items):
+                if treasure is not None:
+                    records.append(pack_treasure(treasure))
+
+        string_table: bytes = WorldSnapshot.STRING_SEPARATOR.join(strings).encode()
+        height, width = game.get_map_size()
+        return b"".join((
+            WorldSnapshot.HEADER.pack(WorldSnapshot.MAGIC, WorldSnapshot.FORMAT_VERSION,
+                                      game.get_map_version(), height, width,
+                                      len(string_table), len(catalog_rows), len(catalog_cells),
+                                      len(objects), len(all_heroes)),
+            game.get_map_tile_bytes(), string_table, catalog_rows.tobytes(),
+            catalog_cells.tobytes(), *objects, *records))
+
+    @staticmethod
+    def _stat(value: float) -> int | float:
+        return int(value) if value.is_integer() else value
+
+    @staticmethod
+    def state_hash(game: GameTactics, heroes: list) -> str:
+        ordered: list = sorted(heroes, key=lambda hero: (len(hero.actor_symbol), hero.actor_symbol))
+        return hashlib.sha256(WorldSnapshot.capture(game, ordered)).hexdigest()
+
+    @staticmethod
+    def write(data: bytes, file_name: str) -> None:
+        temporary_file_name: str = file_name + ".tmp"
+        with open(temporary_file_name, "wb") as f:
+            f.write(data)
+        os.replace(temporary_file_name, file_name)
+
+    @staticmethod
+    def save(game: GameTactics, heroes: list, file_name: str) -> threading.Thread:
+        data: bytes = WorldSnapshot.capture(game, heroes)
+        writer: threading.Thread = threading.Thread(
+            target=WorldSnapshot.write, args=(data, file_name), daemon=True)
+        writer.start()
+        return writer
+
+    @staticmethod
+    def load(file_name: str) -> GameTactics:
+        with open(file_name, "rb") as f:
+            view: bytes = f.read()
+        if len(view) < WorldSnapshot.HEADER.size:
+            raise InvalidSnapshotException(f"{file_name} is not a snapshot")
+        return WorldSnapshot._parse(view, file_name)
+
+    @staticmethod
+    def _parse(view: bytes, file_name: str) -> GameTactics:
+        (magic, format_version, version, height, width, string_table_size,
+         num_catalog_rows, num_catalog_cells, num_objects,
+         num_heroes) = WorldSnapshot.HEADER.unpack_from(view)
+        if magic != WorldSnapshot.MAGIC:
+            raise InvalidSnapshotException(f"{file_name} is not a snapshot")
+        if format_version != WorldSnapshot.FORMAT_VERSION:
+            raise InvalidSnapshotException(
+                f"Unsupported snapshot format version {format_version}")
+        offset: int = WorldSnapshot.HEADER.size
+        tiles: np.ndarray = np.frombuffer(
+            view, dtype=np.uint8, count=height * width,
+            offset=offset).reshape(height, width)
+        offset += height * width
+        strings: list = view[offset:offset + string_table_size].decode().split(
+            WorldSnapshot.STRING_SEPARATOR)
+        offset += string_table_size
+        catalog_rows: np.ndarray = np.frombuffer(
+            view, dtype=WorldSnapshot.CATALOG_ROW, count=num_catalog_rows, offset=offset)
+        offset += catalog_rows.nbytes
+        catalog_cells: np.ndarray = np.frombuffer(
+            view, dtype=WorldSnapshot.CATALOG_CELL, count=num_catalog_cells, offset=offset)
+        offset += catalog_cells.nbytes
+        catalog: TreasureCatalog = TreasureCatalog(
+            catalog_rows["type"].astype(np.uint8), catalog_rows["name"].astype(np.uint32),
+            strings, catalog_rows["points"].astype(np.int32),
+            catalog_rows["level"].astype(np.int32), catalog_rows["min_mana"].astype(np.int32))
+
+        def unpack(record: struct.Struct) -> tuple:
+            nonlocal offset
+            values: tuple = record.unpack_from(view, offset)
+            offset += record.size
+            return values
+
+        def unpack_treasure(coordinates) -> Treasure:
+            treasure_type, name_index, points, level, min_mana = unpack(
+                WorldSnapshot.TREASURE)
+            name: str = strings[name_index]
+            match TreasureType(treasure_type):
+                case TreasureType.WEAPON:
+                    return Weapon(name, points, level, coordinates)
+                case TreasureType.SPELL:
+                    return Spell(name, points, level, min_mana, coordinates)
+                case potion_type:
+                    return Potion(name, points, coordinates, potion_type)
+
+        objects: list = []
+        for _ in range(num_objects):
+            row, col, kind = unpack(WorldSnapshot.OBJECT)
+            coordinates: Coordinates = Coordinates(row, col)
+            if kind == WorldSnapshot.KIND_MINION:
+                level, health, mana, attack, defense, alive = unpack(WorldSnapshot.MINION)
+                health, mana, attack, defense = map(WorldSnapshot._stat, (health, mana, attack, defense))
+                minion: Minion = Minion(level, coordinates)
+                minion._stats._health, minion._stats._mana = health, mana
+                minion._stats._attack, minion._stats._defense = attack, defense
+                minion._alive = bool(alive)
+                objects.append(minion)
+            else:
+                objects.append(unpack_treasure(coordinates))
+
+        treasure_cells: np.ndarray = np.stack(
+            (catalog_cells["row"], catalog_cells["col"]), axis=1).astype(np.intp)
+        game: GameTactics = GameTactics(game_map=Map.from_tiles(
+            tiles, objects, version, catalog, treasure_cells,
+            catalog_cells["index"].astype(np.int32)))
+        for _ in range(num_heroes):
+            (symbol_index, row, col, level, alive, experience, health, mana, attack,
+             defense, has_weapon, has_spell, num_items) = unpack(WorldSnapshot.HERO)
+            health, mana, attack, defense = map(WorldSnapshot._stat, (health, mana, attack, defense))
+            hero: Hero = Hero(strings[symbol_index], Coordinates(row, col))
+            hero._level, hero._alive, hero._experience = level, bool(alive), experience
+            hero._stats._health, hero._stats._mana = health, mana
+            hero._stats._attack, hero._stats._defense = attack, defense
+            hero._weapon = unpack_treasure(None) if has_weapon else None
+            hero._spell = unpack_treasure(None) if has_spell else None
+            for _ in range(num_items):
+                hero.add_to_backpack(unpack_treasure(None))
+            game.add_restored_hero(hero)
+        return game
@@ -3,6 +3,8 @@ from constants import Constants
 
 class Stats:
 
+    __slots__ = ("_health", "_mana", "_attack", "_defense")
+
     _health: int
     _mana: int
     _attack: int
@@ -1,11 +1,50 @@
+import asyncio
+import copy
+import io
+import json
+import os
+import pstats
+import random
+import socket
+import tempfile
+import threading
+import time
 import unittest
 
+import numpy as np
+
 from actor import Hero, Minion
-from map import Coordinates, Map, MapSymbols
+from map import (Coordinates, Map, MapSymbols, Tile, WorldFullException, InvalidMapFileException,
+                 InvalidMapCoordinatesException)
 from constants import Constants
 from messages import Messages
 from game_tactics import Direction, GameTactics
-from treasure import Weapon, Spell, Potion, TreasureType, TreasureInitializer, Treasure
+from treasure import Weapon, Spell, Potion, TreasureType, TreasureInitializer, Treasure, TreasureCatalog
+from combat import CombatEngine
+from balance_simulator import BalanceSimulator, FighterBatch
+from client_hanler import ClientHandler, Command, CommandType, SocketConnection
+from simulation import Simulation, TickSimulation
+from interest import InterestGrid, Viewport
+from journal import CommandJournal
+from replay import JournalReplay
+from loadtest import BotSwarm, LatencyRecorder, parse_mix
+from benchmarks import run_suite, compare
+from metrics import METRICS, MetricsRegistry, MetricHistogram
+from admin import AdminServer
+from profiling import Profiler, StackSampler
+from tracing import Tracer
+from event_log import EVENT_LOG, EventLog
+from player_registry import PlayerRegistry
+from server import serve_connection
+from sharding import RoomSupervisor
+from snapshot import WorldSnapshot, InvalidSnapshotException
+from protocol import MapFrame, LineFramer, BinaryFrame, BinaryFramer, FrameType, MessageCode
+
+LOG_STREAM: io.StringIO = io.StringIO()
+
+
+def setUpModule() -> None:
+    EVENT_LOG.configure(stream=LOG_STREAM)
 
 
 class HeroAndTreasureTest(unittest.TestCase):
@@ -170,6 +209,28 @@ class TreasureInitialierTest(unittest.TestCase):
         self.assertEqual(spell._points, expected_points)
 
 
+class TreasureCatalogTest(unittest.TestCase):
+
+    def test_parse_columns(self):
+        catalog: TreasureCatalog = TreasureCatalog.parse(
+            ["WEAPON;Sword;10;1", "SPELL;Fire;25;2;20", "MANA_POTION;Mana;20", ""])
+        self.assertEqual(len(catalog), 3)
+        self.assertEqual(catalog.types.tolist(), [TreasureType.WEAPON.value,
+                                                  TreasureType.SPELL.value,
+                                                  TreasureType.MANA_POTION.value])
+        self.assertEqual(catalog.levels.tolist(), [1, 2, 0])
+        self.assertEqual(catalog.min_mana.tolist(), [0, 20, 0])
+        spell: Spell = catalog.materialize(1, Coordinates(2, 3))
+        self.assertIsInstance(spell, Spell)
+        self.assertEqual(str(spell), str(Spell("Fire", 25, 2, 20, None)))
+        self.assertEqual(spell.coordinates, Coordinates(2, 3))
+        self.assertEqual(str(catalog.materialize(2, None)),
+                         str(Potion("Mana", 20, None, TreasureType.MANA_POTION)))
+
+    def test_load_is_cached(self):
+        self.assertIs(TreasureCatalog.load(), TreasureCatalog.load())
+
+
 class MinionTest (unittest.TestCase):
 
     def setUp(self) -> None:
@@ -193,6 +254,98 @@ class MinionTest (unittest.TestCase):
         self.assertEqual(actual, expected)
 
 
+def random_hero(rng: random.Random, symbol: str) -> Hero:
+    hero: Hero = Hero(symbol, Coordinates(1, 1))
+    for _ in range(rng.randint(0, 6)):
+        hero.increase_xp(Constants.XP_PER_LEVEL)
+    if rng.random() < 0.7:
+        hero._weapon = Weapon("weapon", rng.randint(0, 60), 1, None)
+    if rng.random() < 0.7:
+        hero._spell = Spell("spell", rng.randint(0, 60), 1,
+                            rng.randint(0, 80), None)
+    potion_type: TreasureType = rng.choice(
+        [TreasureType.HEALTH_POTION, TreasureType.MANA_POTION])
+    hero.drink_potion(Potion("potion", rng.randint(0, 500), None, potion_type))
+    hero._stats._defense += rng.randint(0, 200)
+    return hero
+
+
+class CombatEngineTest(unittest.TestCase):
+
+    def _reference_fight(self, attacker, defender) -> tuple:
+        rounds: int = 0
+        while True:
+            rounds += 1
+            defender.take_damage(attacker.attack())
+            if not defender.is_alive():
+                return True, rounds
+            attacker.take_damage(defender.attack())
+            if not attacker.is_alive():
+                return False, rounds
+
+    def _assert_same_outcome(self, attacker, defender) -> None:
+        expected_attacker, expected_defender = copy.deepcopy((attacker, defender))
+        expected: tuple = self._reference_fight(expected_attacker, expected_defender)
+        actual: tuple = CombatEngine.fight(attacker, defender)
+
+        self.assertEqual(actual, expected)
+        for actual_actor, expected_actor in ((attacker, expected_attacker),
+                                             (defender, expected_defender)):
+            self.assertEqual(actual_actor.is_alive(), expected_actor.is_alive())
+            for stat in ("_health", "_mana", "_attack", "_defense"):
+                self.assertEqual(getattr(actual_actor._stats, stat),
+                                 getattr(expected_actor._stats, stat))
+
+    def test_hero_against_minion_matches_reference_loop(self):
+        rng: random.Random = random.Random(7)
+        for _ in range(300):
+            hero: Hero = random_hero(rng, "1")
+            minion: Minion = Minion(rng.randint(1, Constants.MINION_MAX_LEVEL),
+                                    Coordinates(1, 2))
+            self._assert_same_outcome(hero, minion)
+
+    def test_hero_against_hero_matches_reference_loop(self):
+        rng: random.Random = random.Random(11)
+        for _ in range(300):
+            self._assert_same_outcome(random_hero(rng, "1"),
+                                      random_hero(rng, "2"))
+
+
+class BalanceSimulatorTest(unittest.TestCase):
+
+    def _batch(self, actors: list) -> FighterBatch:
+        profiles: list = [actor.damage_profile() for actor in actors]
+        return FighterBatch([actor._stats._health for actor in actors],
+                            [actor._stats._mana for actor in actors],
+                            [actor._stats._defense for actor in actors],
+                            [base for base, _, _ in profiles],
+                            [points for _, points, _ in profiles],
+                            [float("inf") if mana is None else mana
+                             for _, _, mana in profiles])
+
+    def test_vectorized_fights_match_combat_engine(self):
+        rng: random.Random = random.Random(3)
+        attackers: list = []
+        defenders: list = []
+        for index in range(200):
+            attackers.append(random_hero(rng, "1"))
+            defenders.append(random_hero(rng, "2")
+                             if index % 2 else Minion(rng.randint(1, 3), None))
+        attacker_won, rounds = BalanceSimulator.simulate(
+            self._batch(attackers), self._batch(defenders))
+
+        for index, (attacker, defender) in enumerate(zip(attackers, defenders)):
+            expected: tuple = CombatEngine.fight(attacker, defender)
+            self.assertEqual((bool(attacker_won[index]), int(rounds[index])), expected)
+
+    def test_minion_batch_stats(self):
+        minions: FighterBatch = FighterBatch.minions(np.array([1, 2, 3]))
+        for index, level in enumerate([1, 2, 3]):
+            minion: Minion = Minion(level, None)
+            self.assertEqual(minions.health[index], minion._stats._health)
+            self.assertEqual(minions.base_damage[index], minion.attack())
+
+
 class MapTest(unittest.TestCase):
 
     def setUp(self) -> None:
@@ -207,6 +360,80 @@ class MapTest(unittest.TestCase):
                              "#T..TT.#.T..M.##....\n")
         self.assertEqual(actual_map, expected_map)
 
+    def test_rendering_cached_until_symbol_changes(self):
+        rendered: str = self.map.__str__()
+        self.assertIs(self.map.__str__(), rendered)
+        self.assertEqual(self.map.to_bytes(), rendered.encode())
+
+        self.map.change_symbol(Coordinates(4, 2), "1")
+        expected_last_row: str = "#T1.TT.#.T..M.##....\n"
+        self.assertTrue(self.map.__str__().endswith(expected_last_row))
+        self.assertEqual(self.map.to_bytes(), self.map.__str__().encode())
+
+    def test_tile_ids_and_interned_coordinates(self):
+        self.assertEqual(self.map.get_tile_id(0, 0), Tile.OBSTACLE)
+        self.assertEqual(self.map.get_tile_id(0, 6), Tile.TREASURE)
+        self.assertEqual(self.map.get_tile_id(-1, 0), Tile.UNKNOWN)
+        self.assertEqual(self.map.get_tile_id(0, self.map.get_width()), Tile.UNKNOWN)
+        self.assertIs(self.map.intern(2, 3), self.map.intern(2, 3))
+        self.assertEqual(self.map.intern(2, 3), Coordinates(2, 3))
+        with self.assertRaises(AttributeError):
+            Coordinates(0, 0).z = 1
+
+    def test_treasures_materialized_on_first_access(self):
+        cells, indices = self.map.get_catalog_treasures()
+        self.assertEqual(len(cells), self.map.count_tiles(MapSymbols.TREASURE.value))
+        self.assertEqual(len(set(indices.tolist())), len(indices))
+        self.assertFalse(any(isinstance(game_object, Treasure)
+                             for game_object in self.map.get_objects()))
+
+        coordinates: Coordinates = Coordinates(int(cells[0][0]), int(cells[0][1]))
+        treasure: Treasure = self.map.get_object(coordinates)
+        self.assertIs(self.map.get_object(coordinates), treasure)
+        self.assertEqual(treasure.coordinates, coordinates)
+        self.assertEqual(len(self.map.get_catalog_treasures()[0]), len(cells) - 1)
+        self.map.remove_object(coordinates)
+        with self.assertRaises(KeyError):
+            self.map.get_object(coordinates)
+
+    def test_actor_layer_over_treasure(self):
+        treasure_coordinates: Coordinates = Coordinates(1, 3)
+        self.map.add_actor(treasure_coordinates, "1")
+        self.map.add_actor(treasure_coordinates, "2")
+        self.map.add_actor(treasure_coordinates, "3")
+
+        self.assertEqual(self.map.get_symbol(treasure_coordinates), "321T")
+        self.assertEqual(self.map.get_tile(treasure_coordinates),
+                         MapSymbols.TREASURE.value)
+        self.assertEqual(self.map.get_actors(treasure_coordinates), ["3", "2", "1"])
+
+        self.map.remove_actor(treasure_coordinates, "2")
+        self.map.remove_actor(treasure_coordinates, "3")
+        self.map.remove_actor(treasure_coordinates, "1")
+        self.assertEqual(self.map.get_symbol(treasure_coordinates),
+                         MapSymbols.TREASURE.value)
+        self.assertTrue(self.map.__str__().startswith(
+            "#.#.#.T###.####...M.\n#..T...T"))
+
+    def test_free_cells_follow_map_changes(self):
+        free_cells: int = self.map.count_free_cells()
+        self.map.add_actor(Coordinates(0, 1), "1")
+        self.assertEqual(self.map.count_free_cells(), free_cells - 1)
+        self.map.set_item(Coordinates(0, 1), MapSymbols.TREASURE.value)
+        self.map.remove_actor(Coordinates(0, 1), "1")
+        self.assertEqual(self.map.count_free_cells(), free_cells - 1)
+        self.map.set_item(Coordinates(0, 1), None)
+        self.assertEqual(self.map.count_free_cells(), free_cells)
+
+    def test_get_free_coordinates_on_full_map(self):
+        while self.map.count_free_cells() > 0:
+            coordinates: Coordinates = self.map.get_free_coordinates()
+            self.assertEqual(self.map.get_symbol(coordinates),
+                             MapSymbols.FREE_SPOT.value)
+            self.map.add_actor(coordinates, "1")
+        with self.assertRaises(WorldFullException):
+            self.map.get_free_coordinates()
+
     def test_change_coordinate(self):
         empty_coordinates: Coordinates = Coordinates(0, 1)
         symbol: str = "1"
@@ -232,6 +459,1118 @@ class MapTest(unittest.TestCase):
         treasure = self.map.get_object(treasure_coordinates)
         self.assertTrue(isinstance(treasure, Treasure))
 
+    def test_interned_coordinates_are_shared_and_bounded(self):
+        coordinates: Coordinates = self.map.get_free_coordinates()
+        self.map.add_actor(coordinates, "1")
+        cells: list = self.map.get_region_occupied_cells(coordinates.x, coordinates.y, 1, 1)
+        self.assertIs(cells[0][0], self.map.intern(coordinates.x, coordinates.y))
+        with self.assertRaises(InvalidMapCoordinatesException):
+            self.map.intern(self.map.get_height(), 0)
+        self.assertLessEqual(len(self.map._interned),
+                             self.map.get_height() * self.map.get_width())
+
+    def test_get_changes_since_version(self):
+        version: int = self.map.get_version()
+        self.map.change_symbol(Coordinates(0, 1), "1")
+        self.map.change_symbol(Coordinates(0, 1), MapSymbols.FREE_SPOT.value)
+        self.map.change_symbol(Coordinates(1, 1), "1")
+
+        changes: list = self.map.get_changes_since(version)
+        expected: list = [(Coordinates(1, 1), "1"),
+                          (Coordinates(0, 1), MapSymbols.FREE_SPOT.value)]
+        self.assertEqual(changes, expected)
+        self.assertEqual(self.map.get_changes_since(self.map.get_version()), [])
+
+    def test_get_changes_since_expired_version(self):
+        for _ in range(Constants.MAP_CHANGE_LOG_SIZE + 1):
+            self.map.change_symbol(Coordinates(0, 1), "1")
+        self.assertIsNone(self.map.get_changes_since(0))
+
+
+class LargeMapTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        rows: list = ["." * 300 for _ in range(200)]
+        rows[0] = "#" * 300
+        rows[150] = "." * 10 + "TM" + "." * 288
+        self.map_file = tempfile.NamedTemporaryFile(
+            "w", suffix=".txt", delete=False)
+        self.map_file.write("\n".join(rows))
+        self.map_file.close()
+        self.map: Map = Map(self.map_file.name)
+
+    def tearDown(self) -> None:
+        os.remove(self.map_file.name)
+
+    def test_dimensions_from_map_file(self):
+        self.assertEqual(self.map.get_height(), 200)
+        self.assertEqual(self.map.get_width(), 300)
+        self.assertEqual(self.map.get_symbol(Coordinates(199, 299)),
+                         MapSymbols.FREE_SPOT.value)
+
+    def test_bulk_tile_queries(self):
+        self.assertEqual(self.map.count_tiles(MapSymbols.OBSTACLE.value), 300)
+        self.assertEqual(self.map.find_tiles(MapSymbols.MINION.value),
+                         [Coordinates(150, 11)])
+        self.assertEqual(self.map.count_free_cells(), 200 * 300 - 302)
+
+    def test_render_region(self):
+        self.map.add_actor(Coordinates(151, 10), "1")
+        expected: str = "..TM\n..1.\n"
+        self.assertEqual(self.map.render_region(150, 8, 2, 4), expected)
+
+    def test_invalid_map_file(self):
+        with open(self.map_file.name, "w") as f:
+            f.write("...\n..\n")
+        with self.assertRaises(InvalidMapFileException):
+            Map(self.map_file.name)
+
+
+class MapFrameTest(unittest.TestCase):
+
+    def test_encode_and_decode_delta(self):
+        changes: list = [(Coordinates(0, 1), "1"), (Coordinates(4, 19), "21")]
+        line: str = MapFrame.encode_delta(7, changes)
+        self.assertEqual(line, "DELTA 7 0,1,1;4,19,21\n")
+        self.assertEqual(MapFrame.decode_delta(line),
+                         (7, [(0, 1, "1"), (4, 19, "21")]))
+
+    def test_encode_keyframe(self):
+        self.assertEqual(MapFrame.encode_keyframe(3, "#.\n"),
+                         "KEYFRAME 3\n#.\n")
+
+    def test_encode_and_decode_scroll(self):
+        line: str = MapFrame.encode_scroll(8, 2, 5, [(Coordinates(2, 9), "#")])
+        self.assertEqual(line, "SCROLL 8 2,5 2,9,#\n")
+        self.assertEqual(MapFrame.decode_scroll(line), (8, 2, 5, [(2, 9, "#")]))
+
+
+class LineFramerTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.framer: LineFramer = LineFramer()
+
+    def test_split_pipelined_commands(self):
+        lines: list = self.framer.feed(b"up\nup\nright\n")
+        self.assertEqual(lines, ["up", "up", "right"])
+
+    def test_command_split_across_segments(self):
+        self.assertEqual(self.framer.feed(b"use "), [])
+        self.assertEqual(self.framer.feed(b"1\nlef"), ["use 1"])
+        self.assertEqual(self.framer.feed(b"t\r\n\n"), ["left"])
+
+    def test_line_too_long_is_cut(self):
+        lines: list = self.framer.feed(b"a" * (Constants.MAX_LINE_LENGTH + 1))
+        self.assertEqual(lines, ["a" * Constants.MAX_LINE_LENGTH])
+        self.assertEqual(self.framer.feed(b"left\n"), [])
+        self.assertEqual(self.framer.feed(b"up\n"), ["up"])
+
+    def test_rest_of_cut_line_is_discarded_until_newline(self):
+        self.framer.feed(b"a" * (Constants.MAX_LINE_LENGTH + 1))
+        self.assertEqual(self.framer.feed(b"b" * Constants.MAX_LINE_LENGTH), [])
+        self.assertEqual(self.framer.feed(b"fight\nstats\nup"), ["stats"])
+        self.assertEqual(self.framer.feed(b"\n"), ["up"])
+
+
+class BinaryFrameTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.framer: BinaryFramer = BinaryFramer()
+
+    def test_message_with_arguments_round_trip(self):
+        text: str = Messages.LEVEL_NOT_ENOUGH.format(treasure="Sword", level=2)
+        data: bytes = BinaryFrame.encode_message(text)
+
+        frames: list = self.framer.feed(data[:3])
+        self.assertEqual(frames, [])
+        frames = self.framer.feed(data[3:])
+        self.assertEqual(frames[0][0], FrameType.MESSAGE)
+        self.assertEqual(BinaryFrame.decode_message(frames[0][1]),
+                         (MessageCode.LEVEL_NOT_ENOUGH, text))
+
+    def test_fixed_and_free_text_messages(self):
+        data: bytes = (BinaryFrame.encode_message(Messages.INVALID_MOVE) +
+                       BinaryFrame.encode_message("Backpack\n0. Sword"))
+        frames: list = self.framer.feed(data)
+        self.assertEqual(len(frames[0][1]), 1)
+        self.assertEqual(BinaryFrame.decode_message(frames[0][1]),
+                         (MessageCode.INVALID_MOVE, Messages.INVALID_MOVE))
+        self.assertEqual(BinaryFrame.decode_message(frames[1][1]),
+                         (MessageCode.TEXT, "Backpack\n0. Sword"))
+
+    def test_keyframe_one_byte_per_tile(self):
+        tiles: bytes = bytes([0, 0, 1, 2])
+        occupied_cells: list = [(Coordinates(0, 1), ".", ["1"]),
+                                (Coordinates(1, 1), "T", ["2"])]
+        frames: list = self.framer.feed(
+            BinaryFrame.encode_keyframe(4, 2, 2, tiles, occupied_cells))
+        frame, height, width, tiles, cells = BinaryFrame.decode_keyframe(
+            frames[0][1])
+        self.assertEqual((frame, height, width), (4, 2, 2))
+        self.assertEqual(tiles, bytes([0, 0, 1, 2]))
+        self.assertEqual(cells, [(0, 1, 0, [1]), (1, 1, 2, [2])])
+
+    def test_delta_cells(self):
+        cells: list = [(Coordinates(3, 7), ".", ["2", "1"]),
+                       (Coordinates(0, 1), ".", [])]
+        frames: list = self.framer.feed(BinaryFrame.encode_delta(9, cells))
+        self.assertEqual(frames[0][0], FrameType.DELTA)
+        self.assertEqual(BinaryFrame.decode_delta(frames[0][1]),
+                         (9, [(3, 7, 0, [2, 1]), (0, 1, 0, [])]))
+
+    def test_view_carries_region_origin(self):
+        frames: list = self.framer.feed(BinaryFrame.encode_view(
+            5, 10, 20, 1, 2, bytes([1, 0]), [(Coordinates(10, 21), ".", ["3"])]))
+        self.assertEqual(frames[0][0], FrameType.VIEW)
+        self.assertEqual(BinaryFrame.decode_view(frames[0][1]),
+                         (5, 10, 20, 1, 2, bytes([1, 0]), [(10, 21, 0, [3])]))
+
+    def test_cell_holds_more_than_255_occupants(self):
+        occupants: list = [str(player_id) for player_id in range(1, 301)]
+        frames: list = self.framer.feed(BinaryFrame.encode_delta(
+            2, [(Coordinates(1, 1), ".", occupants)]))
+        self.assertEqual(BinaryFrame.decode_delta(frames[0][1]),
+                         (2, [(1, 1, 0, list(range(1, 301)))]))
+
+    def test_scroll_carries_origin_and_cells(self):
+        frames: list = self.framer.feed(BinaryFrame.encode_scroll(
+            6, 10, 21, [(Coordinates(10, 23), ".", ["4"])]))
+        self.assertEqual(frames[0][0], FrameType.SCROLL)
+        self.assertEqual(BinaryFrame.decode_scroll(frames[0][1]),
+                         (6, 10, 21, [(10, 23, 0, [4])]))
+
+
+class AsyncServerTest(unittest.TestCase):
+
+    def tearDown(self) -> None:
+        ClientHandler.CLIENTS.clear()
+        ClientHandler.HANDLERS.clear()
+        ClientHandler.PLAYERS.reset()
+
+    def test_killed_player_is_disconnected_and_cannot_move(self):
+        game: GameTactics = GameTactics()
+
+        async def run() -> tuple:
+            server = await asyncio.start_server(
+                lambda reader, writer: serve_connection(game, reader, writer),
+                Constants.HOST, 0)
+            port: int = server.sockets[0].getsockname()[1]
+            async with server:
+                clients: list = []
+                for _ in range(2):
+                    reader, writer = await asyncio.open_connection(Constants.HOST, port)
+                    await reader.readline()
+                    clients.append((reader, writer))
+                first: Hero = ClientHandler.PLAYERS.get_hero("1")
+                second: Hero = ClientHandler.PLAYERS.get_hero("2")
+                game._remove_hero_from_map(second)
+                second.coordinates = first.coordinates
+                game.spawn_hero(second)
+                connections: list = [ClientHandler.PLAYERS.get_connection(symbol)
+                                     for symbol in ("1", "2")]
+                clients[1][1].write(b"fight\n")
+                await clients[1][1].drain()
+                while first.is_alive() and second.is_alive():
+                    await asyncio.sleep(0.01)
+                loser: int = 0 if not first.is_alive() else 1
+                try:
+                    clients[loser][1].write(b"up\nup\n")
+                    await clients[loser][1].drain()
+                except ConnectionError:
+                    pass
+                tail: bytes = await asyncio.wait_for(clients[loser][0].read(), 1)
+                await asyncio.sleep(0.05)
+                ClientHandler.HANDLERS[connections[1 - loser]]._disconnect_player(
+                    connections[loser])
+                actors: list = [symbol for cell in game._map._actors.values() for symbol in cell]
+                clients[1 - loser][1].close()
+                await asyncio.sleep(0.05)
+                return tail, actors, str(2 - loser)
+
+        tail, actors, winner = asyncio.run(run())
+        self.assertIn(b"died", tail)
+        self.assertEqual(actors, [winner])
+        self.assertEqual(len(ClientHandler.CLIENTS), 0)
+
+
+class ThreadedServerTest(unittest.TestCase):
+
+    def tearDown(self) -> None:
+        ClientHandler.CLIENTS.clear()
+        ClientHandler.HANDLERS.clear()
+        ClientHandler.PLAYERS.reset()
+
+    def _connect(self, game: GameTactics) -> tuple:
+        server_end, client_end = socket.socketpair()
+        self.addCleanup(client_end.close)
+        client_end.settimeout(2)
+        with ClientHandler.GAME_LOCK:
+            handler: ClientHandler = ClientHandler(SocketConnection(server_end), game)
+        threading.Thread(target=handler.handle_client, daemon=True).start()
+        return handler, client_end
+
+    def test_client_that_never_reads_does_not_hold_the_game_lock(self):
+        self.addCleanup(setattr, Constants, "MAX_WRITE_BUFFER", Constants.MAX_WRITE_BUFFER)
+        Constants.MAX_WRITE_BUFFER = 16384
+        game: GameTactics = GameTactics()
+        idle, idle_end = self._connect(game)
+        active, active_end = self._connect(game)
+        idle_end.sendall(b"stats\n" * 5000)
+        active_end.sendall(b"stats\n")
+        received: bytes = b""
+        while b"Level=" not in received:
+            received += active_end.recv(65536)
+        self.assertTrue(ClientHandler.GAME_LOCK.acquire(timeout=2))
+        ClientHandler.GAME_LOCK.release()
+        for _ in range(200):
+            if not idle.is_connected():
+                break
+            time.sleep(0.01)
+        self.assertFalse(idle.is_connected())
+        self.assertTrue(active.is_connected())
+
+
+class RoomSupervisorTest(unittest.TestCase):
+
+    def test_players_are_spread_across_rooms(self):
+        supervisor: RoomSupervisor = RoomSupervisor(2, [Constants.MAP_FILE_NAME])
+        self.addCleanup(supervisor.stop)
+        rooms: list = []
+        clients: list = []
+        with socket.create_server((Constants.HOST, 0)) as listener:
+            for _ in range(2):
+                client: socket.socket = socket.create_connection(listener.getsockname())
+                self.addCleanup(client.close)
+                client.settimeout(5)
+                conn, _ = listener.accept()
+                rooms.append(supervisor._assign(conn))
+                clients.append(client)
+        self.assertEqual(rooms, [0, 1])
+        for client in clients:
+            self.assertTrue(client.recv(4096).startswith(
+                b"Welcome to Dungeons! Your player symbol is 1\n"))
+            client.close()
+        for channel in supervisor._channels:
+            channel.settimeout(5)
+            self.assertEqual(channel.recv(Constants.BUFFER_SIZE), RoomSupervisor.CLOSED)
+
+    def test_room_events_carry_the_room_and_address(self):
+        directory: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        file_name: str = os.path.join(directory.name, "events.log")
+        self.addCleanup(EVENT_LOG.configure, stream=LOG_STREAM)
+        EVENT_LOG.configure(file_name, json_lines=True)
+        supervisor: RoomSupervisor = RoomSupervisor(1, [Constants.MAP_FILE_NAME])
+        self.addCleanup(supervisor.stop)
+        with socket.create_server((Constants.HOST, 0)) as listener:
+            client: socket.socket = socket.create_connection(listener.getsockname())
+            self.addCleanup(client.close)
+            client.settimeout(5)
+            conn, _ = listener.accept()
+            supervisor._assign(conn)
+        client.recv(4096)
+        address: str = "{}:{}".format(*client.getsockname())
+        records: list = []
+        for _ in range(200):
+            with open(file_name) as f:
+                records = [json.loads(line) for line in f]
+            if any(record["event"] == "connected" for record in records):
+                break
+            time.sleep(0.01)
+        connected: dict = next(record for record in records if record["event"] == "connected")
+        self.assertEqual((connected["room"], connected["address"]), (0, address))
+
+
+class SimulationTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.game: GameTactics = GameTactics()
+        self.simulation: Simulation = Simulation()
+        self.server_end, self.client_end = socket.socketpair()
+        self.client_end.settimeout(1)
+        self.handler: ClientHandler = ClientHandler(
+            self.server_end, self.game, self.simulation)
+
+    def tearDown(self) -> None:
+        ClientHandler.CLIENTS.clear()
+        ClientHandler.HANDLERS.clear()
+        ClientHandler.PLAYERS.reset()
+        self.server_end.close()
+        self.client_end.close()
+
+    def _run_queued(self) -> None:
+        self.simulation.run_batch(self.simulation._next_batch())
+
+    def test_spawn_and_commands_applied_by_simulation(self):
+        self.assertFalse(self.handler.is_connected())
+        self._run_queued()
+        self.assertTrue(self.handler.is_connected())
+        welcome: str = self.client_end.recv(4096).decode()
+        self.assertTrue(welcome.startswith("Welcome to Dungeons!"))
+
+        self.simulation.submit(self.handler, Command("stats"))
+        self.simulation.submit(self.handler, Command("backpack"))
+        self.assertEqual(self.simulation.queue_depth(), 2)
+        self._run_queued()
+        reply: str = self.client_end.recv(4096).decode()
+        self.assertEqual(reply, self.handler.player.display_stats() + "\n" +
+                         Messages.BACKPACK_EMPTY + "\n\n")
+
+    def _connect_queued(self) -> tuple:
+        server_end, client_end = socket.socketpair()
+        self.addCleanup(client_end.close)
+        handler: ClientHandler = ClientHandler(SocketConnection(server_end), self.game,
+                                               self.simulation)
+        threading.Thread(target=handler.handle_client_queued, daemon=True).start()
+        return handler, client_end
+
+    @staticmethod
+    def _receive_until(client_end: socket.socket, marker: bytes) -> bytes:
+        client_end.settimeout(2)
+        received: bytes = b""
+        while marker not in received:
+            received += client_end.recv(65536)
+        return received
+
+    def test_client_that_never_reads_does_not_stall_the_simulation(self):
+        self.addCleanup(setattr, Constants, "MAX_WRITE_BUFFER", Constants.MAX_WRITE_BUFFER)
+        Constants.MAX_WRITE_BUFFER = 16384
+        idle, _ = self._connect_queued()
+        active, active_end = self._connect_queued()
+        self.simulation.start()
+        self.addCleanup(self.simulation.stop)
+        self._receive_until(active_end, b"Welcome")
+        for _ in range(5000):
+            self.simulation.submit(idle, Command("stats"))
+        self.simulation.submit(active, Command("stats"))
+        self.assertIn(b"Level=", self._receive_until(active_end, b"Level="))
+        for _ in range(200):
+            if not idle.is_connected():
+                break
+            time.sleep(0.01)
+        self.assertFalse(idle.is_connected())
+        self.assertTrue(active.is_connected())
+
+    def test_commands_after_quit_are_dropped(self):
+        self._run_queued()
+        self.client_end.recv(4096)
+        self.simulation.submit(self.handler, Command(CommandType.QUIT.value))
+        self.simulation.submit(self.handler, Command("stats"))
+        self._run_queued()
+
+        self.assertFalse(self.handler.is_connected())
+        self.assertEqual(self.client_end.recv(4096), b"Goodbye\n")
+        self.assertEqual(self.client_end.recv(4096), b"")
+        self.assertEqual(self.game._map.get_actors(self.handler.player.coordinates), [])
+
+
+class TickSimulationTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.game: GameTactics = GameTactics()
+        self.simulation: TickSimulation = TickSimulation(tick_rate=10)
+        self.ends: list = [socket.socketpair() for _ in range(2)]
+        self.handlers: list = [ClientHandler(server_end, self.game, self.simulation)
+                               for server_end, _ in self.ends]
+        for _, client_end in self.ends:
+            client_end.settimeout(1)
+        self.simulation.tick()
+        for _, client_end in self.ends:
+            client_end.recv(4096)
+
+    def tearDown(self) -> None:
+        ClientHandler.CLIENTS.clear()
+        ClientHandler.HANDLERS.clear()
+        ClientHandler.PLAYERS.reset()
+        for server_end, client_end in self.ends:
+            server_end.close()
+            client_end.close()
+
+    def test_one_update_per_client_per_tick(self):
+        for _ in range(5):
+            self.simulation.submit(self.handlers[0], Command("stats"))
+        self.simulation.submit(self.handlers[0], Command("delta"))
+        self.simulation.submit(self.handlers[1], Command("delta"))
+        self.simulation.tick()
+        self.ends[0][1].recv(65536)
+        self.ends[1][1].recv(65536)
+
+        self.game.spawn_hero(Hero("8", Coordinates(1, 1)))
+        self.handlers[0]._send_updated_map()
+        self.game.spawn_hero(Hero("9", Coordinates(1, 2)))
+        self.handlers[0]._send_updated_map()
+        self.simulation.tick()
+        update: bytes = self.ends[1][1].recv(65536)
+        self.assertEqual(update.count(b"DELTA"), 1)
+        _, cells = MapFrame.decode_delta(update.decode())
+        symbols: dict = {(x, y): symbol for x, y, symbol in cells}
+        self.assertIn("8", symbols[(1, 1)])
+        self.assertIn("9", symbols[(1, 2)])
+
+        self.assertEqual(self.simulation.get_metrics()["ticks"], 3)
+        self.assertEqual(self.simulation.get_metrics()["overruns"], 0)
+        self.assertGreater(self.simulation.max_tick_duration, 0)
+
+    def test_ticks_advance_while_a_client_is_not_reading(self):
+        self.addCleanup(setattr, Constants, "MAX_WRITE_BUFFER", Constants.MAX_WRITE_BUFFER)
+        Constants.MAX_WRITE_BUFFER = 16384
+        simulation: TickSimulation = TickSimulation(tick_rate=50)
+        server_end, client_end = socket.socketpair()
+        self.addCleanup(client_end.close)
+        idle: ClientHandler = ClientHandler(SocketConnection(server_end), self.game, simulation)
+        threading.Thread(target=idle.handle_client_queued, daemon=True).start()
+        simulation.start()
+        self.addCleanup(simulation.stop)
+        for _ in range(5000):
+            simulation.submit(idle, Command("stats"))
+        time.sleep(0.1)
+        ticks: int = simulation.ticks
+        time.sleep(0.2)
+        self.assertGreaterEqual(simulation.ticks - ticks, 5)
+        self.assertFalse(idle.is_connected())
+
+
+class InterestGridTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.grid: InterestGrid = InterestGrid(bucket_size=4)
+
+    def test_viewport_centered_and_clamped_to_map(self):
+        self.assertEqual(Viewport.centered(Coordinates(5, 10), 3, 5, 20, 40),
+                         Viewport(4, 8, 3, 5))
+        self.assertEqual(Viewport.centered(Coordinates(0, 39), 3, 5, 20, 40),
+                         Viewport(0, 35, 3, 5))
+        self.assertEqual(Viewport.centered(Coordinates(1, 1), 50, 50, 4, 6),
+                         Viewport(0, 0, 4, 6))
+
+    def test_parse_size(self):
+        self.assertEqual(Viewport.parse_size("7x9"), (7, 9))
+        self.assertEqual(Viewport.parse_size(""),
+                         (Constants.VIEWPORT_HEIGHT, Constants.VIEWPORT_WIDTH))
+        for argument in ("0x3", "abc", "3"):
+            with self.assertRaises(ValueError):
+                Viewport.parse_size(argument)
+
+    def test_changes_routed_only_to_subscribers_in_view(self):
+        self.grid.subscribe("a", Viewport(0, 0, 3, 3))
+        self.grid.subscribe("b", Viewport(2, 2, 5, 5))
+        changes: list = [(Coordinates(0, 0), "1"), (Coordinates(2, 2), "2"),
+                         (Coordinates(10, 10), "3")]
+        self.assertEqual(self.grid.route(changes),
+                         {"a": [(Coordinates(0, 0), "1"), (Coordinates(2, 2), "2")],
+                          "b": [(Coordinates(2, 2), "2")]})
+
+        self.grid.subscribe("a", Viewport(8, 8, 3, 3))
+        self.assertEqual(self.grid.subscribers_at(Coordinates(0, 0)), [])
+        self.assertEqual(self.grid.subscribers_at(Coordinates(10, 10)), ["a"])
+        self.grid.unsubscribe("a")
+        self.grid.unsubscribe("b")
+        self.assertEqual(len(self.grid), 0)
+        self.assertEqual(self.grid._buckets, {})
+
+
+class ViewportTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.game: GameTactics = GameTactics()
+        self.ends: list = [socket.socketpair() for _ in range(2)]
+        self.handlers: list = []
+        for server_end, client_end in self.ends:
+            client_end.settimeout(0.2)
+            self.handlers.append(ClientHandler(server_end, self.game))
+        for handler, (_, client_end) in zip(self.handlers, self.ends):
+            self.game._remove_hero_from_map(handler.player)
+            self._drain(client_end)
+        self._place(self.handlers[0], Coordinates(0, 0))
+        self._place(self.handlers[1], Coordinates(0, self.game.get_map_size()[1] - 1))
+
+    def tearDown(self) -> None:
+        ClientHandler.CLIENTS.clear()
+        ClientHandler.HANDLERS.clear()
+        ClientHandler.PLAYERS.reset()
+        ClientHandler.INTEREST = InterestGrid()
+        for server_end, client_end in self.ends:
+            server_end.close()
+            client_end.close()
+
+    def _place(self, handler: ClientHandler, coordinates: Coordinates) -> None:
+        handler.player.coordinates = coordinates
+        self.game.spawn_hero(handler.player)
+
+    @staticmethod
+    def _drain(client_end: socket.socket) -> bytes:
+        received: bytes = b""
+        try:
+            while True:
+                received += client_end.recv(65536)
+        except TimeoutError:
+            return received
+
+    def test_viewport_keyframe_and_filtered_deltas(self):
+        for handler in self.handlers:
+            handler._handle_data(b"delta\nviewport 3x3\n")
+        first: str = self._drain(self.ends[0][1]).decode()
+        self.assertIn("VIEW ", first)
+        self.assertTrue(first.endswith(
+            self.game.display_map_region(0, 0, 3, 3)))
+        self._drain(self.ends[1][1])
+
+        self.game.spawn_hero(Hero("8", Coordinates(1, 1)))
+        self.handlers[0]._send_updated_map()
+        ClientHandler._flush_all()
+        _, cells = MapFrame.decode_delta(self._drain(self.ends[0][1]).decode())
+        self.assertEqual(cells, [(1, 1, "8")])
+        self.assertEqual(self._drain(self.ends[1][1]), b"")
+
+    def test_moving_scrolls_the_view_by_the_exposed_strip(self):
+        handler: ClientHandler = self.handlers[0]
+        handler._handle_data(b"delta\nviewport 3x3\n")
+        self._drain(self.ends[0][1])
+        self.game._remove_hero_from_map(handler.player)
+        self._place(handler, Coordinates(0, 2))
+        ClientHandler._flush_all()
+        frame, top, left, cells = MapFrame.decode_scroll(self._drain(self.ends[0][1]).decode())
+        self.assertEqual((frame, top, left), (self.game.get_map_version(), 0, 1))
+        expected: list = [(coordinates.x, coordinates.y, symbol) for coordinates, symbol in
+                          self.game.get_map_symbols([(0, 2), (0, 3), (1, 3), (2, 3)])]
+        self.assertEqual(sorted(cells), sorted(expected))
+
+        handler._handle_data(b"resync\n")
+        self.assertTrue(self._drain(self.ends[0][1]).decode().startswith("VIEW "))
+
+    def test_viewport_off_restores_full_map(self):
+        self.handlers[0]._handle_data(b"viewport 3x3\n")
+        self.assertEqual(self._drain(self.ends[0][1]).decode(),
+                         self.game.display_map_region(0, 0, 3, 3))
+        self.handlers[0]._handle_data(b"viewport 3\n")
+        self.assertEqual(self._drain(self.ends[0][1]).decode(),
+                         Messages.INVALID_ARGUMENT + "\n")
+        self.handlers[0]._handle_data(b"viewport off\n")
+        self.assertEqual(self._drain(self.ends[0][1]).decode(),
+                         self.game.display_map())
+
+
+class WorldSnapshotTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.game: GameTactics = GameTactics()
+        self.hero: Hero = Hero("3", self.game.get_random_free_coordinates())
+        self.game.spawn_hero(self.hero)
+        self.hero._weapon = Weapon("Sword", 10, 1, None)
+        self.hero._spell = Spell("Fireball", 20, 2, 30, None)
+        self.hero.add_to_backpack(Potion("Elixir", 15, None, TreasureType.MANA_POTION))
+        self.hero.increase_xp(20)
+        minion: Minion = self.game._map.get_object(
+            self.game._map.find_tiles(MapSymbols.MINION.value)[0])
+        minion.take_damage(40)
+        self.snapshot_file = tempfile.NamedTemporaryFile(suffix=".snap", delete=False)
+        self.snapshot_file.close()
+
+    def tearDown(self) -> None:
+        os.remove(self.snapshot_file.name)
+
+    def test_restore_round_trip(self):
+        WorldSnapshot.save(self.game, [self.hero], self.snapshot_file.name).join()
+        restored: GameTactics = WorldSnapshot.load(self.snapshot_file.name)
+
+        self.assertEqual(restored.get_map_tile_bytes(), self.game.get_map_tile_bytes())
+        self.assertEqual(restored.get_map_version(), self.game.get_map_version())
+        self.assertIsNone(restored.get_map_changes_since(0))
+        restored_minions: dict = {minion.coordinates: minion
+                                  for minion in restored.get_map_objects()}
+        for minion in self.game.get_map_objects():
+            restored_minion: Minion = restored_minions.pop(minion.coordinates)
+            self.assertEqual(str(restored_minion), str(minion))
+            self.assertEqual(str(restored_minion._stats), str(minion._stats))
+        self.assertEqual(restored_minions, {})
+        for coordinates in self.game._map.find_tiles(MapSymbols.TREASURE.value):
+            self.assertEqual(str(restored._map.get_object(coordinates)),
+                             str(self.game._map.get_object(coordinates)))
+
+        hero: Hero = restored.claim_restored_hero("3")
+        self.assertEqual(str(hero), str(self.hero))
+        self.assertEqual(hero.coordinates, self.hero.coordinates)
+        self.assertEqual(hero.display_backpack(), self.hero.display_backpack())
+        self.assertEqual(hero._experience, self.hero._experience)
+        self.assertIsNone(restored.claim_restored_hero("3"))
+
+    def test_unclaimed_heroes_survive_another_snapshot(self):
+        WorldSnapshot.save(self.game, [self.hero], self.snapshot_file.name).join()
+        restored: GameTactics = WorldSnapshot.load(self.snapshot_file.name)
+        WorldSnapshot.write(WorldSnapshot.capture(restored, []), self.snapshot_file.name)
+        again: GameTactics = WorldSnapshot.load(self.snapshot_file.name)
+        self.assertEqual(str(again.claim_restored_hero("3")), str(self.hero))
+
+    def test_fractional_stats_round_trip(self):
+        self.hero._stats._health, self.hero._stats._attack = 87.5, 52.25
+        WorldSnapshot.save(self.game, [self.hero], self.snapshot_file.name).join()
+        hero: Hero = WorldSnapshot.load(self.snapshot_file.name).claim_restored_hero("3")
+        self.assertEqual((hero._stats._health, hero._stats._attack), (87.5, 52.25))
+        self.assertIsInstance(hero._stats._mana, int)
+
+    def test_rejects_unknown_files_and_versions(self):
+        data: bytes = WorldSnapshot.capture(self.game, [])
+        for corrupted in (b"", b"XXXX" + data[4:],
+                          data[:4] + (WorldSnapshot.FORMAT_VERSION + 1).to_bytes(2, "big") + data[6:]):
+            WorldSnapshot.write(corrupted, self.snapshot_file.name)
+            with self.assertRaises(InvalidSnapshotException):
+                WorldSnapshot.load(self.snapshot_file.name)
+
+
+class JournalReplayTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.journal_file = tempfile.NamedTemporaryFile(suffix=".journal", delete=False)
+        self.journal_file.close()
+        self.game: GameTactics = GameTactics(seed=1234)
+        ClientHandler.JOURNAL = CommandJournal(self.journal_file.name, 1234,
+                                               Constants.MAP_FILE_NAME)
+        self.ends: list = [socket.socketpair() for _ in range(2)]
+
+    def tearDown(self) -> None:
+        ClientHandler.JOURNAL = None
+        ClientHandler.CLIENTS.clear()
+        ClientHandler.HANDLERS.clear()
+        ClientHandler.PLAYERS.reset()
+        for server_end, client_end in self.ends:
+            server_end.close()
+            client_end.close()
+        os.remove(self.journal_file.name)
+
+    def _state_hash(self) -> str:
+        return WorldSnapshot.state_hash(self.game, list(ClientHandler.CLIENTS.values()))
+
+    def test_seeded_maps_are_identical(self):
+        other: GameTactics = GameTactics(seed=1234)
+        self.assertEqual(WorldSnapshot.capture(other, []),
+                         WorldSnapshot.capture(self.game, []))
+        self.assertEqual(other.get_random_free_coordinates(),
+                         self.game.get_random_free_coordinates())
+
+    def test_replay_reproduces_state(self):
+        handlers: list = [ClientHandler(server_end, self.game) for server_end, _ in self.ends]
+        moves: list = [b"up\n", b"down\n", b"left\n", b"right\n"]
+        rng: random.Random = random.Random(7)
+        for _ in range(40):
+            connected: list = [handler for handler in handlers if handler.is_connected()]
+            if connected:
+                rng.choice(connected)._handle_data(
+                    b"".join(rng.choices(moves, k=3)) + b"use 0\nstats\n")
+        ClientHandler.JOURNAL.record_checkpoint(self._state_hash())
+        for handler, data in zip(handlers, (b"quit\n", b"")):
+            if handler.is_connected():
+                handler._handle_data(data)
+        expected: str = self._state_hash()
+        ClientHandler.JOURNAL.close()
+        ClientHandler.JOURNAL = None
+
+        seed, map_file_name, entries = CommandJournal.read(self.journal_file.name)
+        self.assertEqual((seed, map_file_name), (1234, Constants.MAP_FILE_NAME))
+        replay: JournalReplay = JournalReplay(self.journal_file.name)
+        self.assertEqual(replay.run(), expected)
+        self.assertEqual(replay.checkpoints, 1)
+        self.assertEqual(replay.mismatches, [])
+        self.assertEqual(replay.commands, len(entries) - 3)
+
+
+class LoadTestTest(unittest.TestCase):
+
+    def tearDown(self) -> None:
+        ClientHandler.CLIENTS.clear()
+        ClientHandler.HANDLERS.clear()
+        ClientHandler.PLAYERS.reset()
+
+    def test_percentiles_and_mix(self):
+        samples: list = [index / 1000 for index in range(1, 101)]
+        self.assertEqual(LatencyRecorder.percentile(samples, 50), 0.051)
+        self.assertEqual(LatencyRecorder.percentile(samples, 99), 0.1)
+        self.assertEqual(LatencyRecorder.percentile([], 99), 0.0)
+        self.assertEqual(parse_mix("up=3,use_0=1,stats"),
+                         [("up", 3.0), ("use 0", 1.0), ("stats", 1.0)])
+
+    def test_collapse_detection(self):
+        reports: list = [{"bots": 1, "p99_ms": 2.0, "throughput_per_s": 10, "offered_per_s": 10},
+                         {"bots": 2, "p99_ms": 3.0, "throughput_per_s": 20, "offered_per_s": 20},
+                         {"bots": 4, "p99_ms": 30.0, "throughput_per_s": 40, "offered_per_s": 40}]
+        self.assertEqual(BotSwarm.find_collapse(reports, 10)["bots"], 4)
+        reports[2]["p99_ms"] = 3.0
+        self.assertIsNone(BotSwarm.find_collapse(reports, 10))
+        reports[2]["throughput_per_s"] = 20
+        self.assertEqual(BotSwarm.find_collapse(reports, 10)["bots"], 4)
+
+    def test_swarm_against_async_server(self):
+        game: GameTactics = GameTactics()
+
+        async def run() -> dict:
+            server = await asyncio.start_server(
+                lambda reader, writer: serve_connection(game, reader, writer),
+                Constants.HOST, 0)
+            port: int = server.sockets[0].getsockname()[1]
+            async with server:
+                swarm: BotSwarm = BotSwarm(Constants.HOST, port, parse_mix("stats=1,backpack=1"),
+                                           rate=100, duration=0.3)
+                return await swarm.run_stage(2)
+
+        report: dict = asyncio.run(run())
+        self.assertGreater(report["count"], 0)
+        self.assertEqual(set(report["commands"]), {"stats", "backpack"})
+        self.assertGreater(report["p99_ms"], 0)
+        self.assertNotIn("rejected", report["errors"])
+
+
+class BenchmarkSuiteTest(unittest.TestCase):
+
+    def test_suite_expands_parameter_grid(self):
+        grid: dict = {"size": [16], "players": [1, 2], "occupancy": [0.0, 0.5]}
+        results: dict = run_suite(["move_terrain", "spawn", "fight_hero", "catalog_load"],
+                                  grid, repeat=1, scale=0.01)
+        self.assertEqual(set(results), {"move_terrain[size=16,players=1]",
+                                        "move_terrain[size=16,players=2]",
+                                        "spawn[size=16,occupancy=0.0]",
+                                        "spawn[size=16,occupancy=0.5]",
+                                        "fight_hero", "catalog_load"})
+        self.assertTrue(all(rate > 0 for rate in results.values()))
+
+    def test_compare_flags_slowdowns_only(self):
+        baseline: dict = {"render": 100.0, "spawn": 100.0, "retired": 5.0}
+        results: dict = {"render": 79.0, "spawn": 95.0, "new": 1.0}
+        self.assertEqual(compare(results, baseline, 0.2), [("render", 100.0, 79.0)])
+
+
+class MetricsTest(unittest.TestCase):
+
+    def tearDown(self) -> None:
+        ClientHandler.CLIENTS.clear()
+        ClientHandler.HANDLERS.clear()
+        ClientHandler.PLAYERS.reset()
+
+    def test_histogram_buckets_and_render(self):
+        registry: MetricsRegistry = MetricsRegistry()
+        histogram: MetricHistogram = registry.histogram("latency", "Latency", command="up")
+        for value in (0.00002, 0.0003, 0.0003, 5.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.percentile(50), 0.0005)
+        self.assertEqual(histogram.percentile(100), float("inf"))
+        registry.counter("frames", "Frames").increment(3)
+        registry.gauge("players", "Players", lambda: 7)
+        text: str = registry.render()
+        self.assertIn('dungeons_latency_bucket{command="up",le="0.0005"} 3', text)
+        self.assertIn('dungeons_latency_count{command="up"} 4', text)
+        self.assertIn("dungeons_frames 3", text)
+        self.assertIn("dungeons_players 7", text)
+        self.assertIs(registry.histogram("latency", "Latency", command="up"), histogram)
+
+    def test_render_while_other_threads_register(self):
+        registry: MetricsRegistry = MetricsRegistry()
+        done: threading.Event = threading.Event()
+
+        def register() -> None:
+            for index in range(2000):
+                registry.gauge("queue_depth", "Queue depth", lambda: 0, room=str(index))
+            done.set()
+
+        threading.Thread(target=register).start()
+        while not done.is_set():
+            registry.render()
+        self.assertEqual(registry.render().count("dungeons_queue_depth{"), 2000)
+
+    def test_handler_and_fights_update_metrics(self):
+        server_end, client_end = socket.socketpair()
+        self.addCleanup(server_end.close)
+        self.addCleanup(client_end.close)
+        stats: MetricHistogram = METRICS.get("command_seconds", command="stats")
+        handled: int = sum(stats.counts)
+        map_bytes: float = METRICS.get("map_bytes_sent").value
+        rounds: float = METRICS.get("fight_rounds").value
+        game: GameTactics = GameTactics()
+        handler: ClientHandler = ClientHandler(server_end, game)
+        handler._handle_data(b"stats\n")
+        self.assertEqual(sum(stats.counts), handled + 1)
+        self.assertGreater(METRICS.get("map_bytes_sent").value, map_bytes)
+        self.assertEqual(METRICS.get("connections").samples()[0][2], 1)
+        self.assertEqual(METRICS.get("free_player_ids").samples()[0][2],
+                         Constants.MAX_PLAYERS - 1)
+        coordinates: Coordinates = game.get_random_free_coordinates()
+        first: Hero = Hero("a", coordinates)
+        second: Hero = Hero("b", coordinates)
+        game.heroes_fight(first, second)
+        self.assertGreater(METRICS.get("fight_rounds").value, rounds)
+
+    def test_admin_server_answers_text_and_http(self):
+        admin: AdminServer = AdminServer(0)
+        admin.start()
+        self.addCleanup(admin.server_close)
+        self.addCleanup(admin.shutdown)
+        port: int = admin.server_address[1]
+
+        def request(data: bytes) -> bytes:
+            with socket.create_connection((Constants.HOST, port), timeout=1) as conn:
+                conn.sendall(data)
+                response: bytes = b""
+                while chunk := conn.recv(65536):
+                    response += chunk
+                return response
+
+        self.assertIn(b"# TYPE dungeons_command_seconds histogram", request(b"metrics\n"))
+        http: bytes = request(b"GET /metrics HTTP/1.0\r\nHost: localhost\r\n\r\n")
+        self.assertTrue(http.startswith(b"HTTP/1.0 200 OK"))
+        self.assertIn(b"dungeons_connections", http)
+        self.assertIn(b"Unknown admin command", request(b"nope\n"))
+
+
+class ProfilerTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+        self.profiler: Profiler = Profiler(self.directory.name)
+        self.server_end, self.client_end = socket.socketpair()
+        self.client_end.setblocking(False)
+        self.handler: ClientHandler = ClientHandler(self.server_end, GameTactics())
+        self.stop: threading.Event = threading.Event()
+
+    def tearDown(self) -> None:
+        self.stop.set()
+        ClientHandler.CLIENTS.clear()
+        ClientHandler.HANDLERS.clear()
+        ClientHandler.PLAYERS.reset()
+        self.server_end.close()
+        self.client_end.close()
+        self.directory.cleanup()
+
+    def _drive_commands(self) -> None:
+        while not self.stop.is_set():
+            self.handler._handle_command(Command("stats"))
+            ClientHandler._flush_all()
+            try:
+                self.client_end.recv(65536)
+            except BlockingIOError:
+                pass
+
+    def _capture(self, *arguments: str) -> str:
+        worker: threading.Thread = threading.Thread(target=self._drive_commands, daemon=True)
+        worker.start()
+        try:
+            return self.profiler.handle_command(list(arguments))
+        finally:
+            self.stop.set()
+            worker.join()
+
+    def _written(self, suffix: str) -> str:
+        names: list = [name for name in os.listdir(self.directory.name) if name.endswith(suffix)]
+        self.assertEqual(len(names), 1)
+        with open(os.path.join(self.directory.name, names[0]), "rb") as f:
+            return f.read().decode(errors="replace")
+
+    def test_dispatch_cprofile_capture_is_scoped_and_removed(self):
+        original = ClientHandler._dispatch_command
+        report: str = self._capture("0.2", "dispatch", "cprofile")
+        self.assertIs(ClientHandler._dispatch_command, original)
+        self.assertIn("display_stats", report)
+        self.assertIn("display_stats", self._written(".pstats"))
+        for line in self._written(".collapsed").splitlines():
+            self.assertTrue(line.startswith("_dispatch_command (client_hanler.py:"))
+
+    def test_server_sampling_writes_loadable_stats(self):
+        report: str = self._capture("0.2")
+        self.assertIn("_drive_commands", self._written(".collapsed"))
+        pstats_path: str = report.split("Profile: ")[1].split("\n")[0]
+        self.assertGreater(pstats.Stats(pstats_path).total_calls, 0)
+
+    def test_rejects_invalid_requests(self):
+        for arguments in ([], ["0"], ["1", "server", "cprofile"], ["1", "everything"]):
+            with self.assertRaises(ValueError):
+                self.profiler.handle_command(arguments)
+        sampler: StackSampler = StackSampler(scope_code=ClientHandler._dispatch_command.__code__)
+        sampler.sample()
+        self.assertEqual(sampler.collapsed(), "")
+
+
+class TracerTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tracer: Tracer = Tracer(buffer_size=64)
+        self.server_end, self.client_end = socket.socketpair()
+        self.client_end.setblocking(False)
+
+    def tearDown(self) -> None:
+        self.tracer.disable()
+        ClientHandler.CLIENTS.clear()
+        ClientHandler.HANDLERS.clear()
+        ClientHandler.PLAYERS.reset()
+        self.server_end.close()
+        self.client_end.close()
+
+    def test_spans_nest_inside_command_and_dump_as_chrome_trace(self):
+        handler: ClientHandler = ClientHandler(self.server_end, GameTactics())
+        self.tracer.enable()
+        handler._handle_data(b"left\n")
+        self.tracer.disable()
+        events: list = self.tracer.events()
+        spans: dict = {event["name"]: event for event in events if event["ph"] == "X"}
+        command: dict = spans["ClientHandler._handle_command"]
+        move: dict = spans["GameTactics.move_hero"]
+        self.assertEqual(command["args"], {"player": "1", "command": "left"})
+        self.assertEqual(move["args"], {"direction": "LEFT"})
+        self.assertGreaterEqual(move["ts"], command["ts"])
+        self.assertLessEqual(move["ts"] + move["dur"], command["ts"] + command["dur"])
+        self.assertIn("Command.__init__", spans)
+        self.assertEqual(spans["ClientHandler._flush"]["args"]["session"], handler.session_id)
+        self.assertIn("thread_name", [event["name"] for event in events if event["ph"] == "M"])
+
+        with tempfile.TemporaryDirectory() as directory:
+            file_name: str = os.path.join(directory, "trace.json")
+            self.assertEqual(self.tracer.dump(file_name), len(spans))
+            with open(file_name) as f:
+                self.assertIn("traceEvents", json.load(f))
+
+    def test_disable_restores_methods_and_ring_buffer_is_bounded(self):
+        original = GameTactics.move_hero
+        flush_all = ClientHandler.__dict__["_flush_all"]
+        self.tracer.enable()
+        self.assertIsNot(GameTactics.move_hero, original)
+        for _ in range(100):
+            Command("stats")
+        self.tracer.disable()
+        self.assertIs(GameTactics.move_hero, original)
+        self.assertIs(ClientHandler.__dict__["_flush_all"], flush_all)
+        self.assertEqual(len([event for event in self.tracer.events() if event["ph"] == "X"]), 64)
+        Command("stats")
+        self.assertEqual(len([event for event in self.tracer.events() if event["ph"] == "X"]), 64)
+
+    def test_finished_threads_are_retired_into_a_bounded_ring(self):
+        self.tracer.enable()
+        for _ in range(3):
+            worker: threading.Thread = threading.Thread(
+                target=lambda: [Command("stats") for _ in range(50)])
+            worker.start()
+            worker.join()
+        Command("stats")
+        self.tracer.disable()
+        self.assertEqual(list(self.tracer._buffers), [threading.current_thread()])
+        self.assertEqual(len([event for event in self.tracer.events() if event["ph"] == "X"]), 65)
+
+
+class EventLogTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+        self.file_name: str = os.path.join(self.directory.name, "events.log")
+
+    def tearDown(self) -> None:
+        EVENT_LOG.configure(stream=LOG_STREAM)
+        ClientHandler.CLIENTS.clear()
+        ClientHandler.HANDLERS.clear()
+        ClientHandler.PLAYERS.reset()
+        self.directory.cleanup()
+
+    def _read(self, file_name: str) -> list:
+        with open(file_name) as f:
+            return f.read().splitlines()
+
+    def test_json_and_text_records(self):
+        log: EventLog = EventLog()
+        log.configure(self.file_name, json_lines=True)
+        log.command("1", "up", "", "Invalid move", 0.0005)
+        log.event("connected", address="127.0.0.1:5000")
+        log.flush()
+        command, connected = [json.loads(line) for line in self._read(self.file_name)]
+        self.assertEqual(command["event"], "command")
+        self.assertEqual(command["outcome"], "Invalid move")
+        self.assertAlmostEqual(command["latency_ms"], 0.5)
+        self.assertEqual(connected["address"], "127.0.0.1:5000")
+        log.configure(self.file_name)
+        log.command("2", "use", "0", "Backpack empty", 0.001)
+        log.flush()
+        self.assertTrue(self._read(self.file_name)[-1].endswith(
+            'command player=2 command=use argument=0 outcome="Backpack empty" latency_ms=1.000'))
+        stream: io.StringIO = io.StringIO()
+        log.configure(stream=stream)
+        log.event("listening", port=6968)
+        log.flush()
+        self.assertTrue(stream.getvalue().endswith(" listening port=6968\n"))
+
+    def test_sampling_keeps_events_and_rotation_bounds_files(self):
+        log: EventLog = EventLog()
+        log.configure(self.file_name, sample_rate=0.0, max_bytes=200, backups=2)
+        for index in range(20):
+            log.command("1", "up", "", "", 0.0)
+            log.event("connected", index=index)
+        log.flush()
+        self.assertEqual(sorted(os.listdir(self.directory.name)),
+                         ["events.log", "events.log.1", "events.log.2"])
+        self.assertTrue(all(os.path.getsize(os.path.join(self.directory.name, name)) <= 200
+                            for name in os.listdir(self.directory.name)))
+        lines: list = self._read(self.file_name)
+        self.assertTrue(lines[-1].endswith("connected index=19"))
+        self.assertFalse(any(" command " in line for line in lines))
+
+    def test_handler_logs_command_outcome(self):
+        EVENT_LOG.configure(self.file_name, json_lines=True)
+        server_end, client_end = socket.socketpair()
+        self.addCleanup(server_end.close)
+        self.addCleanup(client_end.close)
+        handler: ClientHandler = ClientHandler(server_end, GameTactics())
+        handler._handle_data(b"use x\n")
+        EVENT_LOG.flush()
+        record: dict = json.loads(self._read(self.file_name)[-1])
+        self.assertEqual((record["player"], record["command"], record["argument"], record["outcome"]),
+                         ("1", "use", "x", Messages.INVALID_ARGUMENT))
+
+
+class PlayerRegistryTest(unittest.TestCase):
+
+    def tearDown(self) -> None:
+        ClientHandler.CLIENTS.clear()
+        ClientHandler.HANDLERS.clear()
+        ClientHandler.PLAYERS.reset()
+
+    def test_ids_are_reused_lowest_first_up_to_capacity(self):
+        registry: PlayerRegistry = PlayerRegistry(capacity=3)
+        heroes: list = [Hero(str(registry.acquire()), None) for _ in range(3)]
+        self.assertEqual([hero.actor_symbol for hero in heroes], ["1", "2", "3"])
+        with self.assertRaises(WorldFullException):
+            registry.acquire()
+        for hero in heroes:
+            registry.register(hero, hero.actor_symbol + "-conn")
+        self.assertIs(registry.get_hero("2"), heroes[1])
+        self.assertEqual(registry.get_connection("3"), "3-conn")
+        registry.release(heroes[2])
+        registry.release(heroes[0])
+        self.assertEqual((len(registry), registry.free_count()), (1, 2))
+        self.assertIsNone(registry.get_connection("3"))
+        self.assertEqual([registry.acquire(), registry.acquire()], [1, 3])
+
+    def test_more_than_nine_players_with_multi_character_ids(self):
+        game: GameTactics = GameTactics()
+        connections: list = []
+        handlers: list = []
+        for _ in range(12):
+            server_end, client_end = socket.socketpair()
+            client_end.setblocking(False)
+            self.addCleanup(server_end.close)
+            self.addCleanup(client_end.close)
+            connections.append(client_end)
+            handlers.append(ClientHandler(server_end, game))
+        self.assertEqual([handler.player.actor_symbol for handler in handlers],
+                         [str(player_id) for player_id in range(1, 13)])
+        handlers[2]._handle_command(Command(CommandType.QUIT.value))
+        server_end, client_end = socket.socketpair()
+        self.addCleanup(server_end.close)
+        self.addCleanup(client_end.close)
+        self.assertEqual(ClientHandler(server_end, game).player.actor_symbol, "3")
+
+        attacker: Hero = handlers[10].player
+        defender: Hero = handlers[11].player
+        game._remove_hero_from_map(attacker)
+        attacker.coordinates = defender.coordinates
+        game.spawn_hero(attacker)
+        self.assertEqual(game._map.get_symbol(defender.coordinates), Map.WIDE_PLAYER_SYMBOL)
+        rows: list = str(game._map).splitlines()
+        self.assertEqual({len(row) for row in rows}, {game.get_map_size()[1]})
+        handlers[10]._handle_command(Command("fight"))
+        self.assertEqual(len(ClientHandler.CLIENTS), 11)
+        self.assertFalse(attacker.is_alive() and defender.is_alive())
+
 
 class GameTacticsTest(unittest.TestCase):
 
@@ -525,6 +1864,31 @@ class GameTacticsTest(unittest.TestCase):
         other_player_symbol = self.game.get_other_player_symbol(hero1)
         self.assertEqual(other_player_symbol, hero_symbol2)
 
+    def test_get_other_player_symbol_three_players_on_same_spot(self):
+        coordinates: Coordinates = Coordinates(1, 1)
+        heroes: list = [Hero(str(symbol), coordinates) for symbol in range(1, 4)]
+        for hero in heroes:
+            self.game.spawn_hero(hero)
+
+        self.assertEqual(self.game._map.get_symbol(coordinates), "321")
+        self.assertEqual(self.game.get_other_player_symbol(heroes[2]), "2")
+        self.assertEqual(self.game.get_other_player_symbol(heroes[0]), "3")
+
+    def test_move_hero_to_treasure_with_full_backpack(self):
+        free_coordinates: Coordinates = Coordinates(0, 5)
+        hero: Hero = Hero("1", free_coordinates)
+        for _ in range(Constants.MAX_CAPACITY_OF_BACKPACK):
+            hero.add_to_backpack(Weapon("weapon", 10, 1, free_coordinates))
+        self.game.spawn_hero(hero)
+
+        acutal_msg: str = self.game.move_hero(hero, Direction.RIGHT)
+        self.assertEqual(acutal_msg, Messages.BACKPACK_FULL)
+        self.assertEqual(self.game._map.get_symbol(Coordinates(0, 6)), "1T")
+
+        self.game.move_hero(hero, Direction.LEFT)
+        self.assertEqual(self.game._map.get_symbol(Coordinates(0, 6)),
+                         MapSymbols.TREASURE.value)
+
     def test_get_other_player_symbol_not_on_same_coordiantes(self):
         hero_symbol1: str = "1"
         free_coordinates1: Coordinates = Coordinates(1, 1)
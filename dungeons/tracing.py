@@ -0,0 +1,169 @@
+import json
+import os
+import threading
+import time
+
+from collections import deque
+from constants import Constants
+from client_hanler import ClientHandler, Command
+from game_tactics import GameTactics
+from map import Map
+
+
+class Tracer:
+
+    TARGETS: list = [
+        (Command, "__init__", None),
+        (ClientHandler, "_handle_command",
+         lambda handler, command: {"player": handler.player.actor_symbol,
+                                   "command": command.commandType.value}),
+        (ClientHandler, "_flush_all", None),
+        (ClientHandler, "_flush",
+         lambda handler: {"session": handler.session_id, "queued": len(handler._outbox),
+                          "map_pending": handler._map_pending}),
+        (GameTactics, "move_hero", lambda game, hero, direction: {"direction": direction.name}),
+        (GameTactics, "_fight_with_minion", None),
+        (GameTactics, "heroes_fight", None),
+        (GameTactics, "swap_item", None),
+        (Map, "__str__", None),
+    ]
+
+    _buffer_size: int
+    _local: threading.local
+    _buffers: dict
+    _retired: deque
+    _originals: list
+    _lock: threading.Lock
+    enabled: bool
+
+    def __init__(self, buffer_size: int = Constants.TRACE_BUFFER_SIZE) -> None:
+        self._buffer_size = buffer_size
+        self._local = threading.local()
+        self._buffers = {}
+        self._retired = deque(maxlen=buffer_size)
+        self._originals = []
+        self._lock = threading.Lock()
+        self.enabled = False
+
+    def _buffer(self) -> deque:
+        try:
+            return self._local.buffer
+        except AttributeError:
+            buffer: deque = deque(maxlen=self._buffer_size)
+            with self._lock:
+                self._retire_finished_threads()
+                self._buffers[threading.current_thread()] = buffer
+            self._local.buffer = buffer
+            return buffer
+
+    def _retire_finished_threads(self) -> None:
+        for thread in [thread for thread in self._buffers if not thread.is_alive()]:
+            self._retired.extend((thread.native_id, thread.name, span)
+                                 for span in self._buffers.pop(thread))
+
+    def _wrap(self, owner: type, function, describe):
+        name: str = f"{owner.__name__}.{function.__name__}"
+
+        def traced(*args, **kwargs):
+            details: dict | None = describe(*args, **kwargs) if describe else None
+            started: int = time.perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self._buffer().append((name, started, time.perf_counter_ns() - started, details))
+
+        traced.__name__ = function.__name__
+        traced.__wrapped__ = function
+        return traced
+
+    def enable(self) -> None:
+        with self._lock:
+            if self.enabled:
+                return
+            for owner, attribute, describe in Tracer.TARGETS:
+                function = owner.__dict__[attribute]
+                wrapped = function.__func__ if isinstance(function, staticmethod) else function
+                traced = self._wrap(owner, wrapped, describe)
+                self._originals.append((owner, attribute, function))
+                setattr(owner, attribute,
+                        staticmethod(traced) if isinstance(function, staticmethod) else traced)
+            self.enabled = True
+
+    def disable(self) -> None:
+        with self._lock:
+            for owner, attribute, function in reversed(self._originals):
+                setattr(owner, attribute, function)
+            self._originals.clear()
+            self.enabled = False
+
+    def clear(self) -> None:
+        with self._lock:
+            for buffer in self._buffers.values():
+                buffer.clear()
+            self._retired.clear()
+
+    def events(self) -> list:
+        pid: int = os.getpid()
+        with self._lock:
+            self._retire_finished_threads()
+            spans: list = list(self._retired) + [
+                (thread.native_id, thread.name, span)
+                for thread, buffer in self._buffers.items() for span in list(buffer)]
+        events: list = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                         "args": {"name": thread_name}}
+                        for tid, thread_name in dict.fromkeys((tid, thread_name)
+                                                              for tid, thread_name, _ in spans)]
+        for tid, _, (name, started, duration, args) in spans:
+            event: dict = {"name": name, "ph": "X", "pid": pid, "tid": tid,
+                           "ts": started / 1000, "dur": duration / 1000}
+            if args:
+                event["args"] = args
+            events.append(event)
+        return events
+
+    def dump(self, file_name: str) -> int:
+        events: list = self.events()
+        with open(file_name, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return sum(1 for event in events if event["ph"] == "X")
+
+
+class TraceCommand:
+
+    _tracer: Tracer
+    _directory: str
+
+    def __init__(self, tracer: Tracer, directory: str = Constants.PROFILE_DIRECTORY) -> None:
+        self._tracer = tracer
+        self._directory = directory
+
+    def handle_command(self, arguments: list) -> str:
+        action: str = arguments[0] if arguments else "dump"
+        if action == "on":
+            self._tracer.enable()
+            return "Tracing enabled\n"
+        if action == "off":
+            self._tracer.disable()
+            return "Tracing disabled\n"
+        if action == "dump":
+            return self._dump()
+        seconds: float = float(action)
+        if not 0 < seconds <= Constants.MAX_PROFILE_SECONDS:
+            raise ValueError(f"seconds must be in (0, {Constants.MAX_PROFILE_SECONDS}]")
+        was_enabled: bool = self._tracer.enabled
+        self._tracer.clear()
+        self._tracer.enable()
+        time.sleep(seconds)
+        if not was_enabled:
+            self._tracer.disable()
+        return self._dump()
+
+    def _dump(self) -> str:
+        os.makedirs(self._directory, exist_ok=True)
+        file_name: str = os.path.join(self._directory,
+                                      f"{time.strftime('%Y%m%d-%H%M%S')}-trace.json")
+        spans: int = self._tracer.dump(file_name)
+        return f"Wrote {spans} spans to {file_name}\n"
+
+
+TRACER: Tracer = Tracer()
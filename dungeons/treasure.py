@@ -1,3 +1,5 @@
+import numpy as np
+
 from enum import Enum
 from messages import Messages
 from constants import Constants
@@ -12,6 +14,8 @@ class TreasureType(Enum):
 
 class Treasure:
 
+    __slots__ = ("_treasure_type", "_name", "_points", "coordinates")
+
     _treasure_type: TreasureType
     _name: str
     _points: int
@@ -31,6 +35,8 @@ class Treasure:
 
 class Weapon(Treasure):
 
+    __slots__ = ("_level",)
+
     _level: int
 
     def __init__(self, name: str, points: int, level: int, coordinates) -> None:
@@ -51,6 +57,8 @@ class Weapon(Treasure):
 
 class Spell(Treasure):
 
+    __slots__ = ("_level", "_min_mana")
+
     _level: int
     _min_mana: int
 
@@ -73,6 +81,9 @@ class Spell(Treasure):
 
 
 class Potion(Treasure):
+
+    __slots__ = ()
+
     def __init__(self, name: str, points: int, coordinates, treasure_type: TreasureType) -> None:
         super().__init__(treasure_type, name, points, coordinates)
 
@@ -98,3 +109,69 @@ class TreasureInitializer:
                 return Potion((tokens[Constants.NAME_INDEX]),
                               (int)(tokens[Constants.POINTS_INDEX]),
                               None, TreasureType[treasure_type])
+
+
+class TreasureCatalog:
+
+    _CACHE: dict = {}
+
+    types: np.ndarray
+    name_ids: np.ndarray
+    names: list
+    points: np.ndarray
+    levels: np.ndarray
+    min_mana: np.ndarray
+
+    def __init__(self, types: np.ndarray, name_ids: np.ndarray, names: list,
+                 points: np.ndarray, levels: np.ndarray, min_mana: np.ndarray) -> None:
+        self.types = types
+        self.name_ids = name_ids
+        self.names = names
+        self.points = points
+        self.levels = levels
+        self.min_mana = min_mana
+
+    @staticmethod
+    def load(file_name: str = Constants.TREASURES_FILE_NAME):
+        catalog: TreasureCatalog | None = TreasureCatalog._CACHE.get(file_name)
+        if catalog is None:
+            with open(file_name) as f:
+                next(f)
+                catalog = TreasureCatalog.parse(f.read().splitlines())
+            TreasureCatalog._CACHE[file_name] = catalog
+        return catalog
+
+    @staticmethod
+    def parse(lines: list):
+        rows: list = [line.strip().split(Constants.TREASURE_LINE_SPLITTER)
+                      for line in lines if line.strip()]
+        names: dict = {}
+
+        def column(index: int) -> list:
+            return [int(tokens[index]) if len(tokens) > index else 0 for tokens in rows]
+
+        return TreasureCatalog(
+            np.array([TreasureType[tokens[Constants.TYPE_INDEX]].value for tokens in rows],
+                     dtype=np.uint8),
+            np.array([names.setdefault(tokens[Constants.NAME_INDEX], len(names))
+                      for tokens in rows], dtype=np.uint32),
+            list(names),
+            np.array(column(Constants.POINTS_INDEX), dtype=np.int32),
+            np.array(column(Constants.LEVEL_INDEX), dtype=np.int32),
+            np.array(column(Constants.MIN_MANA_INDEX), dtype=np.int32))
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def materialize(self, index: int, coordinates) -> Treasure:
+        treasure_type: TreasureType = TreasureType(int(self.types[index]))
+        name: str = self.names[self.name_ids[index]]
+        points: int = int(self.points[index])
+        match treasure_type:
+            case TreasureType.WEAPON:
+                return Weapon(name, points, int(self.levels[index]), coordinates)
+            case TreasureType.SPELL:
+                return Spell(name, points, int(self.levels[index]),
+                             int(self.min_mana[index]), coordinates)
+            case _:
+                return Potion(name, points, coordinates, treasure_type)